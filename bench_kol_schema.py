@@ -0,0 +1,118 @@
+"""
+KOL 解码微基准：字典路径（_extract_rows + 推断类型建表） vs 列式路径（_extract_frame）。
+
+用法：
+    python bench_kol_schema.py                      # 随机生成 5000 条 KOL
+    python bench_kol_schema.py --records kols.json  # 使用录制的接口返回（kols 列表或整页响应列表）
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from typing import Any, Callable, Dict, List
+
+import polars as pl
+
+from collect_xsh_user import _extract_frame, _extract_rows
+
+TAGS = ["美食", "探店", "cos", "二次元", "穿搭", "美妆", "旅行", "宠物", "游戏", "母婴"]
+
+
+def synthetic_kols(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """按接口 kols 条目的结构随机生成 n 条记录（含部分缺失字段和多余字段）。"""
+
+    rnd = random.Random(seed)
+    out = []
+    for i in range(n):
+        it = {
+            "userId": f"{i:024x}",
+            "name": f"博主{i}",
+            "redId": str(100000000 + i),
+            "location": rnd.choice(["上海", "北京", "广州", "杭州", ""]),
+            "personalTags": rnd.sample(TAGS, rnd.randint(0, 3)),
+            "picturePrice": rnd.randint(100, 20000),
+            "videoPrice": rnd.randint(100, 30000),
+            "businessNoteCount": rnd.randint(0, 200),
+            "contentTags": rnd.sample(TAGS, rnd.randint(0, 4)),
+            "featureTags": rnd.sample(TAGS, rnd.randint(0, 2)),
+            "gender": rnd.choice(["男", "女"]),
+            "tradeType": "不限",
+            "fansNum": rnd.randint(1000, 2_000_000),
+            "clickMidNum": rnd.randint(0, 50000),
+            "videoClickMidNum": rnd.randint(0, 50000),
+            "headPhoto": "https://example.invalid/avatar.jpg",
+            "kolType": [1, 2],
+        }
+        if i % 17 == 0:
+            it.pop("picturePrice")
+            it.pop("contentTags")
+        out.append(it)
+    return out
+
+
+def load_records(path: str) -> List[Dict[str, Any]]:
+    """读取录制文件：kols 条目列表，或 {"data": {"kols": [...]}} 整页响应的列表。"""
+
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    if isinstance(raw, dict):
+        raw = [raw]
+    kols: List[Dict[str, Any]] = []
+    for rec in raw:
+        if "data" in rec:
+            kols.extend((rec.get("data") or {}).get("kols") or [])
+        else:
+            kols.append(rec)
+    return kols
+
+
+def dict_path(page: List[Dict[str, Any]]) -> pl.DataFrame:
+    """改造前的做法：逐条 .get() 拼字典，再让 Polars 推断类型。"""
+    return pl.DataFrame(_extract_rows(page), strict=False)
+
+
+def _run(
+    fn: Callable[[List[Dict[str, Any]]], pl.DataFrame],
+    pages: List[List[Dict[str, Any]]],
+    repeat: int,
+) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        frames = [fn(p) for p in pages]
+        pl.concat(frames, how="diagonal_relaxed")
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", help="录制的 kols JSON 文件")
+    parser.add_argument("-n", type=int, default=5000, help="随机生成的记录数")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    kols = load_records(args.records) if args.records else synthetic_kols(args.n)
+    ps = args.page_size
+    pages = [kols[i : i + ps] for i in range(0, len(kols), ps)]
+
+    t_dict = _run(dict_path, pages, args.repeat)
+    t_frame = _run(_extract_frame, pages, args.repeat)
+    print(f"records={len(kols)} pages={len(pages)} repeat={args.repeat} (best)")
+    print(f"dict  path: {t_dict * 1000:8.1f} ms  {len(kols) / t_dict:10.0f} rows/s")
+    print(f"frame path: {t_frame * 1000:8.1f} ms  {len(kols) / t_frame:10.0f} rows/s")
+
+    # 按整批解码（例如从断点文件/录制文件一次性读入）时的对比
+    t_dict_all = _run(dict_path, [kols], args.repeat)
+    t_frame_all = _run(_extract_frame, [kols], args.repeat)
+    print(
+        f"single batch: dict {t_dict_all * 1000:.1f} ms, frame {t_frame_all * 1000:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+订单展平微基准：逐条展平 + csv.DictWriter（改造前）
+vs 列式展平 flatten_orders + 列式写出。
+另测按 List[Struct] 解码 orderVos 再 explode + unnest（nested unnest）作对照。
+
+用法：
+    python bench_orders_flatten.py                        # 随机生成约 10 万条订单
+    python bench_orders_flatten.py -n 20000 --repeat 5
+    python bench_orders_flatten.py --records xhs_tasks_all.json  # 使用导出的任务列表
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+import polars as pl
+
+from order_store import (
+    ORDER_SCHEMA,
+    TASK_SCHEMA,
+    flatten_orders,
+    order_row,
+    write_orders,
+)
+from pgy_mock_server import make_task
+
+
+def synthetic_tasks(n_orders: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """按订单任务接口的结构随机生成任务，订单总数为 n_orders（每个任务 1~3 单）。"""
+
+    tasks, total = [], 0
+    while total < n_orders:
+        task = make_task(len(tasks), seed)
+        task["orderVos"] = task["orderVos"][: n_orders - total]
+        total += len(task["orderVos"])
+        tasks.append(task)
+    return tasks
+
+
+def load_records(path: str) -> List[Dict[str, Any]]:
+    """读取 xhs_tasks_all.json（任务列表）。"""
+
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def loop_flatten(tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """改造前的做法：逐个订单拼字典。"""
+
+    return [order_row(t, o) for t in tasks for o in t.get("orderVos") or []]
+
+
+def nested_flatten(tasks: List[Dict[str, Any]]) -> pl.DataFrame:
+    """orderVos 按 List[Struct] 解码后 explode + unnest。"""
+
+    schema = {**TASK_SCHEMA, "orderVos": pl.List(pl.Struct(ORDER_SCHEMA))}
+    return (
+        pl.DataFrame(tasks, schema=schema, strict=False)
+        .explode("orderVos")
+        .unnest("orderVos")
+    )
+
+
+def loop_write(rows: List[Dict[str, Any]], path: str) -> None:
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def _best(fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", help="任务列表 JSON（xhs_tasks_all.json）")
+    parser.add_argument("-n", type=int, default=100_000, help="随机生成的订单数")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tasks = load_records(args.records) if args.records else synthetic_tasks(args.n)
+    rows = loop_flatten(tasks)
+    frame = flatten_orders(tasks)
+    if len(rows) != frame.height:
+        raise SystemExit(f"行数不一致：逐条 {len(rows)}，列式 {frame.height}")
+
+    out = tempfile.mkdtemp(prefix="orders_bench_")
+    csv_path = os.path.join(out, "orders.csv")
+    parquet_path = os.path.join(out, "orders.parquet")
+    timings = {
+        "loop flatten": _best(lambda: loop_flatten(tasks), args.repeat),
+        "loop csv write": _best(lambda: loop_write(rows, csv_path), args.repeat),
+        "frame flatten": _best(lambda: flatten_orders(tasks), args.repeat),
+        "nested unnest": _best(lambda: nested_flatten(tasks), args.repeat),
+        "frame csv write": _best(lambda: write_orders(frame, csv_path), args.repeat),
+        "frame parquet": _best(lambda: write_orders(frame, parquet_path), args.repeat),
+    }
+    loop_total = timings["loop flatten"] + timings["loop csv write"]
+    frame_total = timings["frame flatten"] + timings["frame csv write"]
+
+    print(f"tasks={len(tasks)} orders={len(rows)} repeat={args.repeat} (best)")
+    for name, t in timings.items():
+        print(f"{name:<16}{t * 1000:9.1f} ms  {len(rows) / t:12.0f} rows/s")
+    print(
+        f"flatten + csv: loop {loop_total * 1000:.1f} ms, "
+        f"frame {frame_total * 1000:.1f} ms ({loop_total / frame_total:.1f}x)"
+    )
+    print(
+        f"其中展平 {timings['loop flatten'] / timings['frame flatten']:.1f}x，"
+        f"写出 {timings['loop csv write'] / timings['frame csv write']:.1f}x"
+    )
+    # 读回校验：两种写法的 CSV 内容一致（列式写出的数值为强类型，按数值比较）
+    loop_write(rows, csv_path)
+    expected = pl.read_csv(csv_path, schema=frame.schema)
+    if not expected.equals(frame):
+        print("警告：逐条写出与列式展平的内容不一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+翻页压测：在本地模拟服务（pgy_mock_server）上测各抓取路径的 pages/s 与 rows/s。
+
+覆盖 collect_xsh_user.iter_pages（串行 / 并发）与 fetch_pages_async、
+xhs_orders_all.fetch_page（fetch_all_tasks）与异步版、
+xhs_heat_report_all.fetch_all_heat_reports 与异步版。
+
+用法：
+    python bench_pgy_pagination.py                           # 默认：无延迟、不限流
+    python bench_pgy_pagination.py --latency 0.05 --rps 20   # 模拟 50ms 延迟、服务端 20 rps 限流
+    python bench_pgy_pagination.py --cases iter_pages,heat --budget-rps 0 --client-rps 50
+
+每次运行在临时目录里进行，自适应限速都从初始速率起步，互不影响，也不会改动
+工作目录里的 pgy_rates.json / 缓存文件。服务端计数取自模拟服务本身。
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, Tuple
+
+import requests
+
+import collect_xsh_user
+import pgy_http
+import xhs_heat_report_all
+import xhs_orders_all
+from pgy_metrics import instrument
+from pgy_mock_server import (
+    HEAT_PATH,
+    KOL_PATH,
+    ORDER_PATH,
+    add_config_args,
+    config_from_args,
+    start,
+)
+
+# 每个用例返回本次拉到的行数；页数从模拟服务的 200 响应计数得到
+Case = Callable[[str, Dict[str, str], argparse.Namespace], int]
+
+
+def _cookies(name: str) -> Dict[str, str]:
+    # 每个用例用独立的假账号，账号预算与熔断器不互相影响
+    return {pgy_http.ACCOUNT_COOKIE: f"bench-{os.getpid()}-{name}"}
+
+
+def _collect_setup(base: str, args: argparse.Namespace) -> Dict[str, Any]:
+    cxu = collect_xsh_user
+    cxu.BASE_URL = base + KOL_PATH
+    cxu.USE_HTTP_CACHE = False
+    cxu.ADAPTIVE_RATE = args.adaptive
+    payload = dict(cxu.json_data, pageSize=args.page_size)
+    payload.pop("pageNum", None)
+    return payload
+
+
+def case_iter_pages(
+    base: str, cookies: Dict[str, str], args: argparse.Namespace
+) -> int:
+    payload = _collect_setup(base, args)
+    session = collect_xsh_user._make_session(collect_xsh_user.headers, cookies)
+    return sum(
+        1 for _ in collect_xsh_user.iter_pages(session, payload, 1, args.client_rps)
+    )
+
+
+def case_iter_pages_concurrent(
+    base: str, cookies: Dict[str, str], args: argparse.Namespace
+) -> int:
+    payload = _collect_setup(base, args)
+    session = collect_xsh_user._make_session(collect_xsh_user.headers, cookies)
+    rows = collect_xsh_user.iter_pages(session, payload, args.workers, args.client_rps)
+    return sum(1 for _ in rows)
+
+
+def case_fetch_pages_async(
+    base: str, cookies: Dict[str, str], args: argparse.Namespace
+) -> int:
+    payload = _collect_setup(base, args)
+    saved, collect_xsh_user.cookies = collect_xsh_user.cookies, cookies
+    try:
+        pages = asyncio.run(
+            collect_xsh_user.fetch_pages_async(payload, args.client_rps)
+        )
+    finally:
+        collect_xsh_user.cookies = saved
+    return sum(len(p) for p in pages)
+
+
+def _orders_setup(base: str, args: argparse.Namespace) -> None:
+    xhs_orders_all.BASE_URL = base + ORDER_PATH
+    xhs_orders_all.USE_HTTP_CACHE = False
+    xhs_orders_all.ADAPTIVE_RATE = args.adaptive
+    if args.client_rps:
+        xhs_orders_all.MAX_RPS = args.client_rps
+
+
+def case_fetch_page(
+    base: str, cookies: Dict[str, str], args: argparse.Namespace
+) -> int:
+    _orders_setup(base, args)
+    session = instrument(requests.Session())
+    session.cookies.update(cookies)
+    return len(xhs_orders_all.fetch_all_tasks(session, args.page_size))
+
+
+def case_orders_async(
+    base: str, cookies: Dict[str, str], args: argparse.Namespace
+) -> int:
+    _orders_setup(base, args)
+    tasks = asyncio.run(
+        xhs_orders_all.fetch_all_tasks_async(cookies, {}, args.page_size)
+    )
+    return len(tasks)
+
+
+def _heat_sleep(args: argparse.Namespace) -> float:
+    return 1 / args.client_rps if args.client_rps else 0.2
+
+
+def case_heat(base: str, cookies: Dict[str, str], args: argparse.Namespace) -> int:
+    rows = xhs_heat_report_all.fetch_all_heat_reports(
+        base + HEAT_PATH,
+        cookies,
+        {},
+        {},
+        page_size=args.page_size,
+        sleep_sec=_heat_sleep(args),
+        use_cache=False,
+        adaptive=args.adaptive,
+    )
+    return len(rows)
+
+
+def case_heat_async(
+    base: str, cookies: Dict[str, str], args: argparse.Namespace
+) -> int:
+    rows = asyncio.run(
+        xhs_heat_report_all.fetch_all_heat_reports_async(
+            base + HEAT_PATH,
+            cookies,
+            {},
+            {},
+            page_size=args.page_size,
+            use_cache=False,
+            adaptive=args.adaptive,
+            rps=1 / _heat_sleep(args),
+        )
+    )
+    return len(rows)
+
+
+CASES: Dict[str, Tuple[str, Case]] = {
+    "iter_pages": (KOL_PATH, case_iter_pages),
+    "iter_pages_concurrent": (KOL_PATH, case_iter_pages_concurrent),
+    "fetch_pages_async": (KOL_PATH, case_fetch_pages_async),
+    "fetch_page": (ORDER_PATH, case_fetch_page),
+    "orders_async": (ORDER_PATH, case_orders_async),
+    "heat": (HEAT_PATH, case_heat),
+    "heat_async": (HEAT_PATH, case_heat_async),
+}
+
+
+def _server_counts(stats: Any, path: str) -> Dict[str, int]:
+    out: Dict[str, int] = {}
+    for key, n in stats.items():
+        p, status = key.rsplit(" ", 1)
+        if p == path:
+            out[status] = out.get(status, 0) + n
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--cases",
+        default=",".join(CASES),
+        help=f"逗号分隔的用例，可选：{', '.join(CASES)}",
+    )
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4, help="并发用例的线程数")
+    parser.add_argument(
+        "--client-rps", type=float, default=None, help="客户端速率上限，默认用各脚本的"
+    )
+    parser.add_argument(
+        "--budget-rps",
+        type=float,
+        default=pgy_http.ACCOUNT_BUDGET_RPS,
+        help="账号级预算（次/秒），0 表示不限",
+    )
+    parser.add_argument("--no-adaptive", dest="adaptive", action="store_false")
+    parser.add_argument("--verbose", action="store_true", help="保留各脚本的日志输出")
+    add_config_args(parser)
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.cases.split(",") if n.strip()]
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        parser.error(f"未知用例：{unknown}")
+
+    pgy_http.ACCOUNT_BUDGET_RPS = args.budget_rps or None
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+    os.chdir(tempfile.mkdtemp(prefix="pgy_bench_"))
+
+    server, base = start(config_from_args(args))
+    print(f"mock server {base}  {server.state.config}")
+    print(
+        f"page_size={args.page_size} workers={args.workers} "
+        f"client_rps={args.client_rps} budget_rps={args.budget_rps} "
+        f"adaptive={args.adaptive}"
+    )
+    header = (
+        f"{'case':<24}{'pages':>7}{'rows':>8}{'sec':>8}{'pages/s':>9}{'rows/s':>10}"
+    )
+    print(header + "  server")
+    for name in names:
+        path, case = CASES[name]
+        before = _server_counts(server.state.stats, path)
+        t0 = time.perf_counter()
+        try:
+            rows = case(base, _cookies(name), args)
+        except Exception as e:  # noqa: BLE001 - 单个用例失败不影响其他用例
+            print(f"{name:<24}失败：{type(e).__name__}: {e}")
+            continue
+        elapsed = time.perf_counter() - t0
+        after = _server_counts(server.state.stats, path)
+        delta = {
+            k: v - before.get(k, 0) for k, v in after.items() if v - before.get(k, 0)
+        }
+        pages = delta.get("200", 0)
+        print(
+            f"{name:<24}{pages:>7}{rows:>8}{elapsed:>8.2f}"
+            f"{pages / elapsed:>9.1f}{rows / elapsed:>10.0f}  {delta}"
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,51 @@
 from __future__ import annotations
 
+import argparse
+import asyncio
+import hashlib
 import math
+import os
 import time
+import threading
 import json
 import logging
 
-from typing import Dict, Any, Iterable, List, Generator, Optional
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Dict, Any, Callable, Iterable, List, Generator, Optional, Tuple
 
 import requests
 import polars as pl
-from urllib3.util.retry import Retry
+import pyarrow as pa
+import pyarrow.parquet as pq
 from requests.adapters import HTTPAdapter
 
+from kol_history import KolHistory
+from pgy_aio import PgyClient, RetryPolicy, gather_pages
+from kol_store import KolStore, search_signature
+from pgy_accounts import (
+    ACCOUNTS_FILE,
+    AccountRejected,
+    SessionPool,
+    TransientError,
+    load_accounts,
+)
+from pgy_frames import decode_rows
+from pgy_http import (
+    AdaptiveRateLimiter,
+    BudgetedRetry,
+    PageSizeNegotiator,
+    PageSizeRejected,
+    RateLimiter,
+    breaker_for,
+    default_cache,
+    mount_cache,
+    run_with_page_size,
+    with_account_budget,
+)
+from pgy_metrics import instrument, json_of, timed_sleep
+
 BASE_URL = "https://pgy.xiaohongshu.com/api/solar/cooperator/blogger/v2"
 
 # ========== 可调整参数 ==========
@@ -21,6 +55,28 @@ RETRY_BACKOFF = 0.5  # 重试退避系数
 RETRY_STATUS = (429, 500, 502, 503, 504)
 SLEEP_BETWEEN_PAGES = 0.15  # 翻页间隔，适度放慢防触发风控
 MAX_PAGES: Optional[int] = None  # 为None表示不限制；也可以设一个上限避免误拉太多页
+CONCURRENCY = 1  # 第1页之后的并发翻页线程数，1 表示逐页串行
+MAX_RPS: Optional[float] = 5.0  # 并发模式下全局每秒请求上限，None 表示不限
+ADAPTIVE_RATE = (
+    True  # AIMD 自适应限速：从 MAX_RPS 起步、不超过 MAX_RPS，按 429/success=false 降速
+)
+SWEEP_SPLIT_TOTAL = 1000  # 分桶扫描：单桶 total 超过该值就继续二分价格区间
+SWEEP_WORKERS = 4  # 分桶扫描：同时拉取的分桶数
+USE_SWEEP = False  # main() 是否使用分桶扫描代替单条翻页链
+KEYWORDS: List[str] = []  # 批量模式：非空时 main() 并发搜索这些关键词
+KEYWORDS_FILE: Optional[str] = None  # 批量模式：关键词文件，每行一个，# 开头为注释
+KEYWORD_WORKERS = 4  # 批量模式：同时搜索的关键词数
+USE_CHECKPOINT = False  # main() 是否按页写断点文件，中断后重跑只补缺失页
+CHECKPOINT_DIR = "checkpoints"  # 断点文件目录，每次搜索条件一个文件
+PARQUET_PATH = "xhs_kol.parquet"  # main() 边拉边写的 Parquet 文件，每页一个 row group
+EXCEL_PATH: Optional[str] = "xhs_kol.xlsx"  # 从 Parquet 导出的 Excel，None 不导出
+AUTO_PAGE_SIZE = True  # 自动协商最大 pageSize（缓存在 pgy_page_sizes.json）
+KOL_STORE_PATH: Optional[str] = "kol_store.parquet"  # 结果并入本地 KOL 库，None 不写
+HISTORY_DIR: Optional[str] = "kol_history"  # 每次运行记一次增量快照，None 不记
+USE_HTTP_CACHE = True  # 磁盘响应缓存（pgy_http_cache.sqlite），重跑时未过期的页不再请求
+USE_ASYNC = False  # 默认模式改用 pgy_aio 异步客户端，单线程同时发出多页
+USE_ACCOUNT_POOL = False  # 页码分摊到 ACCOUNTS_FILE 里的多个账号，各账号各自限速
+TYPED_DECODE = False  # 每页直接解码成类型固定的 DataFrame（_extract_frame），快慢见 bench_kol_schema.py
 # =================================
 
 logging.basicConfig(
@@ -137,14 +193,15 @@ json_data = {
 
 
 def _make_session(headers: Dict[str, str], cookies: Dict[str, str]) -> requests.Session:
-    """创建带重试的 Session。"""
+    """创建带重试的 Session；重试次数受该账号熔断器的重试预算约束。"""
 
     s = requests.Session()
 
     s.headers.update(headers)
     s.cookies.update(cookies)
+    instrument(s)  # 请求耗时/字节数等埋点，退出时写出到 pgy_metrics/
 
-    retry = Retry(
+    retry = BudgetedRetry(
         total=RETRY_TOTAL,
         read=RETRY_TOTAL,
         connect=RETRY_TOTAL,
@@ -152,25 +209,75 @@ def _make_session(headers: Dict[str, str], cookies: Dict[str, str]) -> requests.
         status_forcelist=RETRY_STATUS,
         allowed_methods=frozenset(["POST", "GET"]),
         raise_on_status=False,
+        breaker=breaker_for(cookies),
     )
-    adapter = HTTPAdapter(max_retries=retry)
+    # 并发翻页时每个线程各占一条连接，连接池不能比线程数小
+    pool_size = max(10, CONCURRENCY, SWEEP_WORKERS, KEYWORD_WORKERS)
+    if USE_HTTP_CACHE:
+        mount_cache(s, max_retries=retry, pool_maxsize=pool_size)
+        return s
+    adapter = HTTPAdapter(max_retries=retry, pool_maxsize=pool_size)
     s.mount("https://", adapter)
     s.mount("http://", adapter)
     return s
 
 
-def _post_json(session: requests.Session, payload: Dict[str, Any]) -> Dict[str, Any]:
-    """安全POST并返回JSON，包含状态码与JSON解析的校验。"""
-    resp = session.post(BASE_URL, json=payload, timeout=REQUEST_TIMEOUT)
-    resp.raise_for_status()
+def _post_json(
+    session: requests.Session,
+    payload: Dict[str, Any],
+    limiter: Optional[RateLimiter] = None,
+) -> Dict[str, Any]:
+    """
+    安全POST并返回JSON，包含状态码与JSON解析的校验。
+    传入 limiter 时先限速，再把响应是否健康（非 429/5xx、是 JSON、success 不为 false）
+    反馈给它。
+    响应同时交给该账号的熔断器：连续出现 401/403、非 JSON、success=false 时抛
+    SessionExpired，之后的请求不再发出。
+    """
+
+    breaker = breaker_for(session.cookies)
+    breaker.before_request()
+    if limiter is not None:
+        limiter.acquire()
+        breaker.check()  # 等待期间可能已熔断
     try:
-        data = resp.json()
-    except json.JSONDecodeError as e:
-        logger.error("响应非JSON，可疑的风控/登录失效：%s", e)
+        resp = session.post(BASE_URL, json=payload, timeout=REQUEST_TIMEOUT)
+        if not resp.ok:
+            breaker.record(resp.status_code, None)  # 只有 401/403 计数
+        resp.raise_for_status()
+        try:
+            data = json_of(resp)
+        except json.JSONDecodeError as e:
+            logger.error("响应非JSON，可疑的风控/登录失效：%s", e)
+            breaker.record(resp.status_code, None)
+            raise
+    except requests.RequestException:  # 含 HTTPError 与 resp.json() 的解析失败
+        if limiter is not None:
+            limiter.feedback(False)
         raise
+    if not getattr(resp, "from_cache", False):
+        if limiter is not None:
+            limiter.feedback(data.get("success") is not False)
+        breaker.record(resp.status_code, data)
     return data
 
 
+def _page_limiter(rps: Optional[float] = None) -> RateLimiter:
+    """
+    翻页用的限速器：ADAPTIVE_RATE 时为按接口记住速率的 AIMD 限速器（rps 同时是上限），
+    否则固定 rps；再叠加同一账号在本机所有脚本共用的请求预算（pgy_http.ACCOUNT_BUDGET_RPS）。
+    """
+
+    rps = MAX_RPS if rps is None else rps
+    if ADAPTIVE_RATE and rps:
+        limiter = AdaptiveRateLimiter(BASE_URL, rps=rps, max_rps=rps)
+    elif ADAPTIVE_RATE:
+        limiter = AdaptiveRateLimiter(BASE_URL)  # 不限速时用默认上限
+    else:
+        limiter = RateLimiter(rps)
+    return with_account_budget(limiter, cookies)
+
+
 def _extract_rows(items: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """从接口返回的kol条目中提取我们需要的字段，容错缺失。"""
 
@@ -205,23 +312,189 @@ def _extract_rows(items: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
     return rows
 
 
-def iter_pages(
-    session: requests.Session, base_payload: Dict[str, Any]
-) -> Generator[Dict[str, Any], None, None]:
+PGY_HOME_URL = "https://pgy.xiaohongshu.com/solar/pre-trade/blogger-detail/"
+XSH_HOME_URL = "https://www.xiaohongshu.com/user/profile/"
+
+# 接口 kols 条目中我们用到的字段及类型，解码时按此 schema 建列（类型不符的值置空，
+# 见 pgy_frames），其余字段忽略。价格可能带小数，按 Float64 存
+KOL_PAYLOAD_SCHEMA = {
+    "userId": pl.String,
+    "name": pl.String,
+    "redId": pl.String,
+    "location": pl.String,
+    "personalTags": pl.List(pl.String),
+    "picturePrice": pl.Float64,
+    "videoPrice": pl.Float64,
+    "businessNoteCount": pl.Int64,
+    "contentTags": pl.List(pl.String),
+    "featureTags": pl.List(pl.String),
+    "gender": pl.String,
+    "tradeType": pl.String,
+    "fansNum": pl.Int64,
+    "clickMidNum": pl.Int64,
+    "videoClickMidNum": pl.Int64,
+}
+TAG_COLUMNS = ("personalTags", "contentTags", "featureTags")
+
+# _extract_frame 的输出 schema：与 _extract_rows 的列一致，标签列为 List[Categorical]
+KOL_SCHEMA = {
+    "pgy_home_url": pl.String,
+    "xsh_home_url": pl.String,
+    **KOL_PAYLOAD_SCHEMA,
+    **{c: pl.List(pl.Categorical) for c in TAG_COLUMNS},
+}
+
+
+def _kol_frame_exprs() -> List[pl.Expr]:
+    """_extract_frame 的列表达式，按 KOL_SCHEMA 的列顺序构造（模块加载时建一次）。"""
+
+    user_id = pl.col("userId").fill_null("")
+    no_tags = pl.lit([], dtype=pl.List(pl.String))
+    exprs = []
+    for name in KOL_SCHEMA:
+        if name in ("pgy_home_url", "xsh_home_url"):
+            prefix = PGY_HOME_URL if name == "pgy_home_url" else XSH_HOME_URL
+            expr = pl.when(user_id != "").then(prefix + user_id).otherwise(pl.lit(""))
+        elif name in TAG_COLUMNS:
+            expr = pl.col(name).fill_null(no_tags).cast(pl.List(pl.Categorical))
+        elif KOL_SCHEMA[name] == pl.String and name != "gender":
+            expr = pl.col(name).fill_null("")
+        else:
+            expr = pl.col(name)
+        exprs.append(expr.alias(name))
+    return exprs
+
+
+_KOL_FRAME_EXPRS = _kol_frame_exprs()
+
+
+def _extract_frame(items: List[Dict[str, Any]]) -> pl.DataFrame:
+    """
+    _extract_rows 的列式版本：按 KOL_PAYLOAD_SCHEMA 把 kols 解码成类型固定的列，
+    标签列转为 List[Categorical]（单个字符串标签包成单元素列表），主页链接用向量化表达式拼接。
+    缺失值的处理与 _extract_rows 一致。
+    """
+
+    return decode_rows(items, KOL_PAYLOAD_SCHEMA).select(_KOL_FRAME_EXPRS)
+
+
+def _concat_pages(pages: List[Any]) -> List[Dict[str, Any]] | pl.DataFrame:
+    """各页 decode 结果拼成一份：字典列表直接拼接，DataFrame 纵向拼表。"""
+
+    if all(isinstance(p, list) for p in pages):
+        return [row for page in pages for row in page]
+    return pl.concat(pages)
+
+
+def _total_pages(total: int, page_size: int) -> int:
+    """根据 total 计算总页数，并应用 MAX_PAGES 限制。"""
+
+    total_pages = math.ceil(total / page_size)
+    if MAX_PAGES is not None:
+        total_pages = min(total_pages, MAX_PAGES)
+    return total_pages
+
+
+def _fetch_page_rows(
+    session: requests.Session,
+    base_payload: Dict[str, Any],
+    page: int,
+    limiter: Optional[RateLimiter] = None,
+    decode: Callable[[List[Dict[str, Any]]], Any] = _extract_rows,
+) -> Optional[Any]:
+    """拉取单页并用 decode 提取行（默认 _extract_rows）；success=false 时返回 None。"""
+
+    payload = dict(base_payload)
+    payload["pageNum"] = page
+
+    res = _post_json(session, payload, limiter)
+    if not res.get("success"):
+        logger.warning("第%s页 success=false，跳过。详情：%s", page, res)
+        return None
+    items = (res.get("data") or {}).get("kols") or []
+    return decode(items)
+
+
+def _iter_pages_concurrent(
+    session: requests.Session,
+    base_payload: Dict[str, Any],
+    pages: Iterable[int],
+    workers: int,
+    limiter: RateLimiter,
+    decode: Callable[[List[Dict[str, Any]]], Any] = _extract_rows,
+) -> Generator[Optional[Any], None, None]:
+    """
+    用线程池并发拉取 pages，按页码顺序逐页产出结果（None 表示该页被跳过）。
+    - 同时在途的页数最多为 workers*2，避免一次性把所有页都挂进队列
+    - 全局限速由 RateLimiter 控制，单页的重试仍由 Session 的 Retry 负责
+    """
+
+    pending: deque[Future] = deque()
+    page_iter = iter(pages)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+
+        def _submit_next() -> bool:
+            page = next(page_iter, None)
+            if page is None:
+                return False
+            pending.append(
+                pool.submit(
+                    _fetch_page_rows, session, base_payload, page, limiter, decode
+                )
+            )
+            return True
+
+        for _ in range(workers * 2):
+            if not _submit_next():
+                break
+
+        try:
+            while pending:
+                rows = pending.popleft().result()
+                _submit_next()
+                yield rows
+        finally:
+            # 出错或调用方提前停止迭代时，放弃还没开始的请求
+            for fut in pending:
+                fut.cancel()
+
+
+def iter_page_batches(
+    session: requests.Session,
+    base_payload: Dict[str, Any],
+    workers: Optional[int] = None,
+    rps: Optional[float] = None,
+    limiter: Optional[RateLimiter] = None,
+    decode: Callable[[List[Dict[str, Any]]], Any] = _extract_rows,
+    strict_page_size: bool = False,
+) -> Generator[Any, None, None]:
     """
-    按页迭代返回的KOL字典。
+    按页迭代，每次产出一整页 decode 后的结果（success=false 的页不产出）。
+    - decode 默认 _extract_rows 产出字典列表，传 _extract_frame 则产出类型固定的 DataFrame
     - 自动计算总页数
     - 支持MAX_PAGES限制
+    - workers>1 时第1页之后并发拉取（默认取 CONCURRENCY / MAX_RPS），仍按页码顺序产出
+    - 传入 limiter 时与其它调用方共用同一限速（此时不再固定 sleep）；
+      ADAPTIVE_RATE 时串行翻页也改由自适应限速器控制节奏
+    - 非最后一页条数不足 pageSize 说明被服务端截断：默认告警，
+      strict_page_size=True 时抛 PageSizeRejected（第1页 success=false 同样）
     """
 
+    workers = CONCURRENCY if workers is None else workers
+    if limiter is None and (workers > 1 or ADAPTIVE_RATE):
+        limiter = _page_limiter(rps)
+
     # 确保不污染外部传入的payload
     payload = dict(base_payload)
     page_size = int(payload.get("pageSize", 20)) or 20
     payload["pageNum"] = 1
 
     # 先打一次，拿 total
-    first = _post_json(session, payload)
+    first = _post_json(session, payload, limiter)
     if not first.get("success"):
+        if strict_page_size:
+            raise PageSizeRejected(f"第1页 success=false（pageSize={page_size}）")
         raise RuntimeError(f"接口返回success=false，详情：{first}")
 
     data0 = first.get("data") or {}
@@ -231,43 +504,573 @@ def iter_pages(
         logger.info("没有匹配的结果。")
         return
 
-    # 计算总页数
-    total_pages = math.ceil(total / page_size)
-    if MAX_PAGES is not None:
-        total_pages = min(total_pages, MAX_PAGES)
-
+    total_pages = _total_pages(total, page_size)
     logger.info("共 %s 条，预计 %s 页（pageSize=%s）。", total, total_pages, page_size)
 
+    def _checked(page: int, rows: Any) -> Any:
+        if page < total_pages and len(rows) < page_size:
+            msg = f"第{page}页只返回 {len(rows)} 条（pageSize={page_size}），疑似被截断"
+            if strict_page_size:
+                raise PageSizeRejected(msg)
+            logger.warning(msg)
+        return rows
+
     # 第1页
-    for row in _extract_rows(kols):
-        yield row
+    yield _checked(1, decode(kols))
 
     # 后续页
+    pages = range(2, total_pages + 1)
+    if workers > 1:
+        results = _iter_pages_concurrent(
+            session, payload, pages, workers, limiter, decode
+        )
+        for page, rows in zip(pages, results):
+            if rows is not None:
+                yield _checked(page, rows)
+        return
+
+    for page in pages:
+        if limiter is None:
+            timed_sleep(SLEEP_BETWEEN_PAGES, "page_interval")
+
+        rows = _fetch_page_rows(session, payload, page, limiter, decode)
+        if rows is not None:
+            yield _checked(page, rows)
+
+
+def iter_pages(
+    session: requests.Session,
+    base_payload: Dict[str, Any],
+    workers: Optional[int] = None,
+    rps: Optional[float] = None,
+    limiter: Optional[RateLimiter] = None,
+) -> Generator[Dict[str, Any], None, None]:
+    """按页迭代返回的KOL字典，参数同 iter_page_batches。"""
+
+    for rows in iter_page_batches(session, base_payload, workers, rps, limiter):
+        yield from rows
 
-    for page in range(2, total_pages + 1):
-        payload["pageNum"] = page
-        time.sleep(SLEEP_BETWEEN_PAGES)
 
-        res = _post_json(session, payload)
+async def fetch_pages_async(
+    base_payload: Dict[str, Any],
+    rps: Optional[float] = None,
+    decode: Callable[[List[Dict[str, Any]]], Any] = _extract_rows,
+) -> List[Any]:
+    """
+    iter_page_batches 的 asyncio 版本：第1页拿到 total 后，其余页在一个线程里并发拉取（gather_pages）。
+    同时在途数由 PgyClient 按 host 限制，全局限速 rps（默认 MAX_RPS），
+    success=false 的页跳过。返回按页码排序的各页 decode 结果。
+    """
+
+    page_size = int(base_payload.get("pageSize", 20)) or 20
+    client = PgyClient(
+        cookies,
+        headers,
+        retry=RetryPolicy(attempts=RETRY_TOTAL, backoff=RETRY_BACKOFF),
+        limiter=_page_limiter(rps),
+        cache=default_cache() if USE_HTTP_CACHE else None,
+        timeout=REQUEST_TIMEOUT,
+    )
+
+    async def page(n: int) -> Optional[Dict[str, Any]]:
+        res = await client.post_json(BASE_URL, dict(base_payload, pageNum=n), False)
         if not res.get("success"):
-            logger.warning("第%s页 success=false，跳过。详情：%s", page, res)
+            logger.warning("第%s页 success=false，跳过。详情：%s", n, res)
+            return None
+        return res.get("data") or {}
+
+    async with client:
+        first = await page(1)
+        if first is None:
+            raise RuntimeError("接口返回success=false")
+        total_pages = _total_pages(int(first.get("total") or 0), page_size)
+        logger.info("共 %s 页（pageSize=%s），异步拉取。", total_pages, page_size)
+        rest = await gather_pages(page, range(2, total_pages + 1))
+
+    return [decode(d.get("kols") or []) for d in [first, *rest] if d is not None]
+
+
+def fetch_pages_pooled(
+    pool: SessionPool,
+    base_payload: Dict[str, Any],
+    decode: Callable[[List[Dict[str, Any]]], Any] = _extract_rows,
+) -> List[Any]:
+    """
+    多账号翻页：第1页拿到 total 后，其余页分摊到账号池里的各账号（各自的限速器）。
+    401/403、非 JSON、success=false / code != 0 视为该账号被拒，换号重试，连续被拒的账号剔除；
+    超时、连接错误、5xx（已按 RETRY_STATUS 重试过）与账号无关，重新排队但不计入被拒次数。
+    返回按页码排序的各页 decode 结果，所有账号都失败的页跳过。
+    """
+
+    page_size = int(base_payload.get("pageSize", 20)) or 20
 
+    def page(session: requests.Session, account: Any, n: int) -> Dict[str, Any]:
+        try:
+            res = _post_json(session, dict(base_payload, pageNum=n), account.limiter)
+        except requests.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            if status in (401, 403):
+                raise AccountRejected(f"第{n}页 HTTP {status}：{e}") from e
+            raise TransientError(f"第{n}页请求失败：{e}") from e
+        except requests.JSONDecodeError as e:
+            raise AccountRejected(f"第{n}页响应非 JSON：{e}") from e
+        except requests.RequestException as e:
+            raise TransientError(f"第{n}页请求失败：{e}") from e
+        if res.get("code") not in (None, 0) or not res.get("success"):
+            raise AccountRejected(
+                f"第{n}页 success=false：code={res.get('code')} {res.get('msg')}"
+            )
+        return res.get("data") or {}
+
+    first = pool.run([1], page)[0]
+    if first is None:
+        raise RuntimeError("第1页在所有账号上都失败")
+    total_pages = _total_pages(int(first.get("total") or 0), page_size)
+    logger.info(
+        "共 %s 页（pageSize=%s），分摊到 %s 个账号。",
+        total_pages,
+        page_size,
+        len(pool.healthy),
+    )
+    rest = pool.run(range(2, total_pages + 1), page)
+    return [decode(d.get("kols") or []) for d in [first, *rest] if d is not None]
+
+
+PriceRange = Tuple[int, int]
+Bucket = Tuple[PriceRange, PriceRange]  # (图文价格区间, 视频价格区间)
+
+
+@dataclass
+class BucketStat:
+    """分桶扫描中单个分桶的统计，便于看出时间花在了哪里。"""
+
+    note_price: PriceRange
+    video_price: PriceRange
+    total: int = 0
+    pages: int = 0
+    rows: int = 0
+    new_rows: int = 0  # 去重后新增的行数
+    seconds: float = 0.0
+    split: bool = False  # True 表示该桶 total 过大，已拆成子桶
+
+
+def _bucket_payload(
+    base_payload: Dict[str, Any],
+    note_price: PriceRange,
+    video_price: PriceRange,
+) -> Dict[str, Any]:
+    payload = dict(base_payload)
+    payload["notePriceLower"], payload["notePriceUpper"] = note_price
+    payload["videoPriceLower"], payload["videoPriceUpper"] = video_price
+    payload["pageNum"] = 1
+    return payload
+
+
+def _split_bucket(note_price: PriceRange, video_price: PriceRange) -> List[Bucket]:
+    """
+    把价格区间二分成两个不相交的子区间：先拆图文价格，拆不动再拆视频价格。
+    区间已经无法再拆时返回空列表。
+    """
+
+    for dim in (0, 1):
+        lo, hi = (note_price, video_price)[dim]
+        if hi - lo < 2:
             continue
-        items = (res.get("data") or {}).get("kols") or []
-        for row in _extract_rows(items):
-            yield row
+        mid = (lo + hi) // 2
+        halves = [(lo, mid), (mid + 1, hi)]
+        if dim == 0:
+            return [(h, video_price) for h in halves]
+        return [(note_price, h) for h in halves]
+    return []
+
+
+def _sweep_bucket(
+    session: requests.Session,
+    base_payload: Dict[str, Any],
+    note_price: PriceRange,
+    video_price: PriceRange,
+    split_total: int,
+    limiter: RateLimiter,
+) -> Tuple[BucketStat, List[Bucket], List[Dict[str, Any]]]:
+    """
+    拉取单个分桶：先用第1页探 total，过大则返回子桶，否则串行拉完该桶所有页。
+    返回 (统计, 子桶列表, 行)。
+    """
+
+    started = time.monotonic()
+    stat = BucketStat(note_price=note_price, video_price=video_price)
+    payload = _bucket_payload(base_payload, note_price, video_price)
+    page_size = int(payload.get("pageSize", 20)) or 20
+
+    first = _post_json(session, payload, limiter)
+    if not first.get("success"):
+        raise RuntimeError(f"接口返回success=false，详情：{first}")
+    data0 = first.get("data") or {}
+    stat.total = int(data0.get("total") or 0)
+    stat.pages = 1
+
+    if stat.total > split_total:
+        children = _split_bucket(note_price, video_price)
+        if children:
+            stat.split = True
+            stat.seconds = time.monotonic() - started
+            return stat, children, []
+        logger.warning(
+            "分桶 图文%s 视频%s 共 %s 条且无法再拆，可能被服务端翻页深度截断。",
+            note_price,
+            video_price,
+            stat.total,
+        )
+
+    rows = _extract_rows(data0.get("kols") or [])
+    for page in range(2, _total_pages(stat.total, page_size) + 1):
+        page_rows = _fetch_page_rows(session, payload, page, limiter)
+        stat.pages += 1
+        rows.extend(page_rows or [])
+
+    stat.rows = len(rows)
+    stat.seconds = time.monotonic() - started
+    return stat, [], rows
+
+
+def sweep_search(
+    session: requests.Session,
+    base_payload: Dict[str, Any],
+    split_total: Optional[int] = None,
+    workers: Optional[int] = None,
+    rps: Optional[float] = None,
+) -> Tuple[List[Dict[str, Any]], List[BucketStat]]:
+    """
+    分桶扫描：按图文/视频价格把搜索空间拆成不相交的分桶并发拉取，
+    total 过大的桶继续二分，最后按 userId 去重合并。
+    - 每个分桶的翻页链更短，也能拿到单条翻页链被服务端截断之后的结果
+    - 所有分桶共用一个全局限速器
+    - fansNumUp 只有下限，无法拆成不相交区间，因此保持调用方传入的值不变
+    返回 (去重后的行, 每个分桶的统计)。
+    """
+
+    split_total = SWEEP_SPLIT_TOTAL if split_total is None else split_total
+    workers = SWEEP_WORKERS if workers is None else workers
+    limiter = _page_limiter(rps)
+
+    root: Bucket = (
+        (
+            base_payload.get("notePriceLower", -1),
+            base_payload.get("notePriceUpper", 1500),
+        ),
+        (
+            base_payload.get("videoPriceLower", -1),
+            base_payload.get("videoPriceUpper", 1500),
+        ),
+    )
+
+    rows: List[Dict[str, Any]] = []
+    stats: List[BucketStat] = []
+    seen: set = set()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+
+        def _submit(bucket: Bucket) -> Future:
+            return pool.submit(
+                _sweep_bucket, session, base_payload, *bucket, split_total, limiter
+            )
+
+        pending = {_submit(root)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                stat, children, bucket_rows = fut.result()
+                stats.append(stat)
+                pending.update(_submit(child) for child in children)
+                for row in bucket_rows:
+                    user_id = row.get("userId")
+                    if user_id:
+                        if user_id in seen:
+                            continue
+                        seen.add(user_id)
+                    rows.append(row)
+                    stat.new_rows += 1
+
+    _log_sweep_stats(stats)
+    return rows, stats
+
+
+def _log_sweep_stats(stats: List[BucketStat]) -> None:
+    """打印每个分桶的耗时与行数。"""
+
+    for st in sorted(stats, key=lambda x: (x.note_price, x.video_price)):
+        logger.info(
+            "分桶 图文%s 视频%s | total=%s 页=%s 行=%s 新增=%s 耗时=%.2fs%s",
+            st.note_price,
+            st.video_price,
+            st.total,
+            st.pages,
+            st.rows,
+            st.new_rows,
+            st.seconds,
+            " (已拆分)" if st.split else "",
+        )
+    logger.info(
+        "分桶扫描完成：%s 个分桶，%s 次请求，去重后 %s 行。",
+        len(stats),
+        sum(st.pages for st in stats),
+        sum(st.new_rows for st in stats),
+    )
+
+
+def load_keywords(path: str) -> List[str]:
+    """读取关键词文件：每行一个，忽略空行和 # 开头的注释行，保持顺序去重。"""
+
+    keywords: List[str] = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            kw = line.strip()
+            if kw and not kw.startswith("#") and kw not in keywords:
+                keywords.append(kw)
+    return keywords
+
+
+def search_keywords(
+    session: requests.Session,
+    base_payload: Dict[str, Any],
+    keywords: Iterable[str],
+    workers: Optional[int] = None,
+    rps: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """
+    批量关键词搜索：多个关键词并发翻页，共用同一个 Session 连接池和全局限速器，
+    总耗时由限速决定，而不是关键词个数。
+    - 行在流入时按 userId 去重，同一个博主只保存一次
+    - 每行的 keywords 字段记录命中它的所有关键词（按命中先后）
+    """
+
+    workers = KEYWORD_WORKERS if workers is None else workers
+    limiter = _page_limiter(rps)
+
+    merged: Dict[str, Dict[str, Any]] = {}
+    rows: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+
+    def _collect(keyword: str) -> int:
+        payload = dict(base_payload)
+        payload["keyword"] = keyword
+        count = 0
+        for row in iter_pages(session, payload, workers=1, limiter=limiter):
+            count += 1
+            user_id = row.get("userId")
+            with lock:
+                known = merged.get(user_id) if user_id else None
+                if known is None:
+                    row["keywords"] = [keyword]
+                    rows.append(row)
+                    if user_id:
+                        merged[user_id] = row
+                elif keyword not in known["keywords"]:
+                    known["keywords"].append(keyword)
+        return count
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_collect, kw): kw for kw in dict.fromkeys(keywords)}
+        for fut in futures:
+            logger.info("关键词「%s」完成，共 %s 行。", futures[fut], fut.result())
+
+    logger.info("批量搜索完成：%s 个关键词，去重后 %s 行。", len(futures), len(rows))
+    return rows
+
+
+class PageCheckpoint:
+    """
+    单次搜索的断点文件（JSONL，追加写）：
+    - 第一行 {"meta": {...}} 记录 total / 总页数 / 搜索条件
+    - 之后每行 {"page": n, "rows": [...]} 记录一页，rows 为 null 表示该页 success=false 被跳过
+    同一页出现多次时以最后一条为准（修复后的结果会覆盖跳过记录）。
+    进程崩溃导致的末行残缺会在加载时忽略。
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.meta: Dict[str, Any] = {}
+        self.pages: Dict[int, Optional[List[Dict[str, Any]]]] = {}
+        self._lock = threading.Lock()
+        self._needs_newline = False
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self) -> None:
+        line = ""
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning("断点文件存在不完整的行，已忽略：%s", self.path)
+                    continue
+                if "meta" in rec:
+                    self.meta = rec["meta"]
+                else:
+                    self.pages[int(rec["page"])] = rec["rows"]
+            # 上次写到一半崩溃时末尾没有换行，续写前先补上
+            self._needs_newline = bool(line) and not line.endswith("\n")
+
+    def _append(self, rec: Dict[str, Any]) -> None:
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                if self._needs_newline:
+                    f.write("\n")
+                    self._needs_newline = False
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+    def set_meta(self, **meta: Any) -> None:
+        self.meta = meta
+        self._append({"meta": meta})
+
+    def record(self, page: int, rows: Optional[List[Dict[str, Any]]]) -> None:
+        self.pages[page] = rows
+        self._append({"page": page, "rows": rows})
+
+    @property
+    def missing(self) -> List[int]:
+        """还没有拉过的页。"""
+        total_pages = int(self.meta.get("total_pages") or 0)
+        return [p for p in range(1, total_pages + 1) if p not in self.pages]
+
+    @property
+    def skipped(self) -> List[int]:
+        """拉过但 success=false 的页。"""
+        return sorted(p for p, rows in self.pages.items() if rows is None)
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """按页码顺序拼接所有已完成页的行。"""
+        out: List[Dict[str, Any]] = []
+        for page in sorted(self.pages):
+            out.extend(self.pages[page] or [])
+        return out
+
+    @property
+    def complete(self) -> bool:
+        """所有页都已成功拉到（没有缺失页，也没有被跳过的页）。"""
+        return bool(self.meta) and not self.missing and not self.skipped
+
+    def remove(self) -> None:
+        """删除断点文件；下次同样的搜索会从第1页重新拉取。"""
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+def _checkpoint_path(payload: Dict[str, Any]) -> str:
+    """按搜索条件（不含 pageNum / trackId）生成断点文件路径。"""
+
+    key = {k: v for k, v in payload.items() if k not in ("pageNum", "trackId")}
+    raw = json.dumps(key, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return os.path.join(
+        CHECKPOINT_DIR, f"kol_{hashlib.sha1(raw).hexdigest()[:12]}.jsonl"
+    )
+
+
+def fetch_with_checkpoint(
+    session: requests.Session,
+    base_payload: Dict[str, Any],
+    path: Optional[str] = None,
+    workers: Optional[int] = None,
+    rps: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """
+    带断点的翻页：每拉完一页立即写入断点文件。
+    中途报错（包括 _post_json 重试耗尽）后重跑，只会补拉缺失的页。
+    success=false 的页记为跳过，可用 repair_checkpoint 单独补齐。
+    全部页都拉到后删除断点文件，之后同样的搜索会重新拉取，不会一直返回旧结果。
+    """
+
+    workers = CONCURRENCY if workers is None else workers
+    payload = dict(base_payload)
+    page_size = int(payload.get("pageSize", 20)) or 20
+    cp = PageCheckpoint(path or _checkpoint_path(payload))
+
+    if not cp.meta:
+        payload["pageNum"] = 1
+        first = _post_json(session, payload)
+        if not first.get("success"):
+            raise RuntimeError(f"接口返回success=false，详情：{first}")
+        data0 = first.get("data") or {}
+        total = int(data0.get("total") or 0)
+        cp.set_meta(
+            total=total,
+            total_pages=_total_pages(total, page_size),
+            page_size=page_size,
+            keyword=payload.get("keyword"),
+        )
+        if total:
+            cp.record(1, _extract_rows(data0.get("kols") or []))
+
+    missing = cp.missing
+    logger.info(
+        "断点 %s：共 %s 页，已完成 %s 页，待拉取 %s 页。",
+        cp.path,
+        cp.meta.get("total_pages"),
+        len(cp.pages),
+        len(missing),
+    )
+
+    limiter = _page_limiter(rps) if workers > 1 or ADAPTIVE_RATE else None
+    if workers > 1:
+        results = _iter_pages_concurrent(session, payload, missing, workers, limiter)
+        for page, rows in zip(missing, results):
+            cp.record(page, rows)
+    else:
+        for page in missing:
+            if limiter is None:
+                timed_sleep(SLEEP_BETWEEN_PAGES, "page_interval")
+            cp.record(page, _fetch_page_rows(session, payload, page, limiter))
+
+    if cp.skipped:
+        logger.warning(
+            "%s 页 success=false 被跳过：%s，可运行 repair_checkpoint 补齐。",
+            len(cp.skipped),
+            cp.skipped,
+        )
+    rows = cp.rows()
+    if cp.complete:
+        cp.remove()
+        logger.info("断点 %s 已全部完成，已删除。", cp.path)
+    return rows
+
+
+def repair_checkpoint(
+    session: requests.Session,
+    base_payload: Dict[str, Any],
+    path: Optional[str] = None,
+) -> List[int]:
+    """只重新拉取断点文件中被跳过的页，返回仍然失败的页码。"""
+
+    cp = PageCheckpoint(path or _checkpoint_path(base_payload))
+    limiter = _page_limiter() if ADAPTIVE_RATE else None
+    for page in cp.skipped:
+        if limiter is None:
+            timed_sleep(SLEEP_BETWEEN_PAGES, "page_interval")
+        rows = _fetch_page_rows(session, base_payload, page, limiter)
+        if rows is not None:
+            cp.record(page, rows)
+
+    logger.info("修复完成，仍有 %s 页失败：%s", len(cp.skipped), cp.skipped)
+    return cp.skipped
 
 
 def _to_polars_df(rows: List[Dict[str, Any]]) -> pl.DataFrame:
     """
-    列表→Polars DataFrame，并把列表型字段转为字符串，便于落地Excel。
+    列表→Polars DataFrame，已知列按 KOL_SCHEMA 建列，避免每次推断出不同的标签列类型。
     也可以根据需要改为 JSON 序列化存储。
     """
 
     if not rows:
         return pl.DataFrame()
 
-    df = pl.DataFrame(rows, strict=False)
+    df = pl.DataFrame(
+        rows,
+        schema_overrides={k: v for k, v in KOL_SCHEMA.items() if k in rows[0]},
+        strict=False,
+    )
 
     return df
 
@@ -296,7 +1099,85 @@ def write_excel_safely(df: pl.DataFrame, path: str) -> None:
             raise
 
 
-def main() -> None:
+# _extract_rows 产出的列，写 Parquet 时固定按此 schema，避免每页推断出不同类型；
+# 由 KOL_SCHEMA 推出（标签列存为普通字符串列表），两者不会不一致
+KOL_ARROW_SCHEMA = (
+    pl.DataFrame(
+        schema={**KOL_SCHEMA, **dict.fromkeys(TAG_COLUMNS, pl.List(pl.String))}
+    )
+    .to_arrow()
+    .schema
+)
+
+
+class ParquetSink:
+    """
+    流式 Parquet 写出：每次 write_rows 写一个 row group，内存只保留当前这一页。
+    schema 固定为 KOL_ARROW_SCHEMA（可追加列，如批量模式的 keywords）。
+    """
+
+    def __init__(self, path: str, schema: pa.Schema = KOL_ARROW_SCHEMA) -> None:
+        self.path = path
+        self.schema = schema
+        self.rows = 0
+        self._writer = pq.ParquetWriter(path, schema, compression="zstd")
+
+    def write_rows(self, rows: List[Dict[str, Any]] | pl.DataFrame) -> None:
+        if len(rows) == 0:
+            return
+        if isinstance(rows, pl.DataFrame):
+            table = rows.to_arrow().cast(self.schema)
+        else:
+            table = pa.Table.from_pylist(rows, schema=self.schema)
+        self._writer.write_table(table)
+        self.rows += len(rows)
+
+    def close(self) -> None:
+        self._writer.close()
+        logger.info("已写出：%s (%s 行)", self.path, self.rows)
+
+    def __enter__(self) -> "ParquetSink":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def export_excel_from_parquet(parquet_path: str, excel_path: str) -> None:
+    """可选的收尾步骤：从 Parquet 读出后写 Excel。"""
+
+    write_excel_safely(pl.read_parquet(parquet_path), excel_path)
+
+
+def _page_size_probe(
+    session: requests.Session, base_payload: Dict[str, Any]
+) -> Callable[[int], Tuple[int, Optional[int], Optional[int]]]:
+    """pageSize 协商用的探测函数：按给定 pageSize 拉第1页。"""
+
+    def probe(size: int) -> Tuple[int, Optional[int], Optional[int]]:
+        res = _post_json(session, dict(base_payload, pageNum=1, pageSize=size))
+        if not res.get("success"):
+            raise RuntimeError(f"success=false：{res.get('msg')}")
+        data = res.get("data") or {}
+        return len(data.get("kols") or []), int(data.get("total") or 0), None
+
+    return probe
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="蒲公英 KOL 搜索，边拉边写 Parquet 并导出 Excel",
+        epilog="搜索条件（json_data）与其余开关见脚本开头的「可调整参数」。",
+    )
+    parser.add_argument(
+        "--keywords-file", default=KEYWORDS_FILE, help="关键词文件，每行一个"
+    )
+    parser.add_argument("--parquet", default=PARQUET_PATH, help="边拉边写的 Parquet")
+    parser.add_argument(
+        "--excel", default=EXCEL_PATH, help="导出的 Excel，传空串不导出"
+    )
+    args = parser.parse_args(argv)
+
     session = _make_session(headers=headers, cookies=cookies)
 
     # 复制你传入的 json_data，避免在生成器中污染外部对象
@@ -305,9 +1186,79 @@ def main() -> None:
     # 强烈建议：自动用 pageSize 计算分页；pageNum 由逻辑控制
     base_payload.pop("pageNum", None)
 
-    rows = list(iter_pages(session, base_payload))
-    df = _to_polars_df(rows)
-    write_excel_safely(df, "xhs_kol.xlsx")
+    if AUTO_PAGE_SIZE:
+        negotiator = PageSizeNegotiator()
+        probe = _page_size_probe(session, base_payload)
+        base_payload["pageSize"] = negotiator.probe(
+            BASE_URL, probe, default=base_payload.get("pageSize")
+        )
+
+    decode = _extract_frame if TYPED_DECODE else _extract_rows
+    keywords = load_keywords(args.keywords_file) if args.keywords_file else KEYWORDS
+    schema = KOL_ARROW_SCHEMA
+    if keywords:
+        rows = search_keywords(session, base_payload, keywords)
+        schema = schema.append(pa.field("keywords", pa.list_(pa.string())))
+    elif USE_SWEEP:
+        rows, _ = sweep_search(session, base_payload)
+    elif USE_CHECKPOINT:
+        rows = fetch_with_checkpoint(session, base_payload)
+    elif USE_ASYNC:
+        rows = _concat_pages(
+            asyncio.run(fetch_pages_async(base_payload, decode=decode))
+        )
+    elif USE_ACCOUNT_POOL:
+        pool = SessionPool(
+            load_accounts(ACCOUNTS_FILE, default_headers=headers, rps=MAX_RPS),
+            lambda account: _make_session(account.headers, account.cookies),
+        )
+        try:
+            pages = fetch_pages_pooled(pool, base_payload, decode=decode)
+        finally:
+            pool.close()
+            logger.info(pool.summary())
+        rows = _concat_pages(pages)
+    else:
+        rows = None
+
+    def stream_to_parquet(page_size: int) -> None:
+        # 默认路径：拉到一页写一页，内存占用不随总行数增长；降档重拉时整个文件重写
+        payload = dict(base_payload, pageSize=page_size)
+        with ParquetSink(args.parquet, schema) as sink:
+            for page_rows in iter_page_batches(
+                session, payload, decode=decode, strict_page_size=AUTO_PAGE_SIZE
+            ):
+                sink.write_rows(page_rows)
+
+    if rows is not None:
+        with ParquetSink(args.parquet, schema) as sink:
+            sink.write_rows(rows)
+    elif AUTO_PAGE_SIZE:
+        run_with_page_size(
+            negotiator,
+            BASE_URL,
+            probe,
+            stream_to_parquet,
+            default=json_data.get("pageSize"),
+        )
+    else:
+        stream_to_parquet(base_payload["pageSize"])
+
+    if KOL_STORE_PATH:
+        # 批量关键词模式没有单一的搜索条件，只入库不记录拉取时间
+        KolStore(KOL_STORE_PATH).upsert(
+            pl.read_parquet(args.parquet),
+            signature=None if keywords else search_signature(base_payload),
+        )
+
+    if HISTORY_DIR:
+        KolHistory(HISTORY_DIR).record_snapshot(pl.read_parquet(args.parquet))
+
+    if args.excel:
+        export_excel_from_parquet(args.parquet, args.excel)
+
+    if USE_HTTP_CACHE:
+        logger.info(default_cache().summary())
 
 
 if __name__ == "__main__":
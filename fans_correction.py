@@ -14,15 +14,14 @@
 - 结果仅保留数字（四舍五入 4 位小数）
 """
 
+import argparse
 import re
 import csv
 import polars as pl
 from typing import Tuple, Optional, List
 
-# 你的原始数据（顺序即为输出顺序）
-raw_values = (
-    pl.read_excel("./user_info.xlsx").select("粉丝量（必填）").to_series().to_list()
-)
+INPUT_FILE = "./user_info.xlsx"  # 原始数据（顺序即为输出顺序）
+INPUT_COLUMN = "粉丝量（必填）"
 
 
 def normalize_to_wan(cell: str) -> Tuple[Optional[float], List[str]]:
@@ -96,6 +95,14 @@ def normalize_to_wan(cell: str) -> Tuple[Optional[float], List[str]]:
 
 
 def main():
+    parser = argparse.ArgumentParser(description="粉丝量统一为“万”")
+    parser.add_argument("input_file", nargs="?", default=INPUT_FILE)
+    parser.add_argument("--column", default=INPUT_COLUMN, help="粉丝量所在列")
+    args = parser.parse_args()
+
+    raw_values = (
+        pl.read_excel(args.input_file).select(args.column).to_series().to_list()
+    )
     rows = []
     warn_count = 0
     unrec_count = 0
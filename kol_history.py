@@ -0,0 +1,231 @@
+"""
+KOL 快照历史（增量存储）。
+
+每次搜索 / 博主详情拉取完成后记一次快照，按 (userId, 日期) 区分：
+- snapshots-<日期>.parquet：本次快照包含哪些 userId（未变化的记录只存这一条引用）
+- deltas-<日期>.parquet：与此前最新状态相比发生变化的字段，长表 (date, userId, field, value)
+几个月的周快照里大多数字段不变，实际只存变化的部分。查询时用 scan_parquet 惰性读取。
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import glob
+import os
+from typing import Iterable, List, Optional, Sequence, Union
+
+import polars as pl
+
+HISTORY_DIR = "kol_history"
+
+NUMERIC_FIELDS = (
+    "fansNum",
+    "clickMidNum",
+    "videoClickMidNum",
+    "picturePrice",
+    "videoPrice",
+    "businessNoteCount",
+)
+PRICE_FIELDS = (
+    "picturePrice",
+    "videoPrice",
+)  # 可能带小数，timeseries 里按 Float64 返回
+TEXT_FIELDS = ("name", "redId", "location", "gender", "tradeType")
+TAG_FIELDS = ("personalTags", "contentTags", "featureTags")
+TRACKED_FIELDS = NUMERIC_FIELDS + TEXT_FIELDS + TAG_FIELDS
+TAG_SEP = "|"  # 标签列表排序后以此拼接存储，比较时与顺序无关
+NULL_VALUE = "\x00"  # timeseries 里区分“记录的是空值”和“当天没有记录”
+
+DateLike = Union[dt.date, str]  # date 或 ISO 格式字符串
+
+
+def _as_date(d: Optional[DateLike]) -> dt.date:
+    if d is None:
+        return dt.date.today()
+    if isinstance(d, str):
+        return dt.date.fromisoformat(d)
+    return d
+
+
+class KolHistory:
+    """按日期记录 KOL 快照，只保存变化的字段。"""
+
+    def __init__(self, root: str = HISTORY_DIR) -> None:
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _files(self, kind: str) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.root, f"{kind}-*.parquet")))
+
+    def _scan(self, kind: str, before: Optional[dt.date] = None) -> pl.LazyFrame:
+        files = self._files(kind)
+        if before is not None:
+            files = [f for f in files if _file_date(f) < before]
+        if not files:
+            schema = {"date": pl.Date, "userId": pl.String}
+            if kind == "deltas":
+                schema.update(field=pl.String, value=pl.String)
+            return pl.LazyFrame(schema=schema)
+        return pl.scan_parquet(files)
+
+    def deltas(self) -> pl.LazyFrame:
+        return self._scan("deltas")
+
+    def snapshots(self) -> pl.LazyFrame:
+        return self._scan("snapshots")
+
+    # ---------- 写入 ----------
+    def record_snapshot(
+        self, df: pl.DataFrame, date: Optional[DateLike] = None
+    ) -> pl.DataFrame:
+        """
+        记录一次快照：与该日期之前的最新状态比较，只写变化的字段。
+        同一日期重复记录时覆盖当天的文件。返回本次写入的变化（长表）。
+        """
+
+        date = _as_date(date)
+        df = df.filter(pl.col("userId").is_not_null() & (pl.col("userId") != ""))
+        df = df.unique("userId", keep="last")
+        fields = [f for f in TRACKED_FIELDS if f in df.columns]
+
+        exprs = []
+        for f in fields:
+            if f in TAG_FIELDS:
+                expr = pl.col(f).cast(pl.List(pl.String)).list.sort().list.join(TAG_SEP)
+            elif df.schema[f].is_float():
+                # 整数值的小数按整数存（1500.0 → "1500"），与 Int64 列记下的历史值一致
+                x = pl.col(f)
+                expr = (
+                    pl.when(x == x.round())
+                    .then(x.cast(pl.Int64, strict=False).cast(pl.String))
+                    .otherwise(x.cast(pl.String))
+                )
+            else:
+                expr = pl.col(f).cast(pl.String)
+            exprs.append(expr.alias(f))
+        current = df.select("userId", *exprs).unpivot(
+            index="userId", variable_name="field", value_name="value"
+        )
+
+        latest = (
+            self._scan("deltas", before=date)
+            .sort("date")
+            .group_by("userId", "field")
+            .agg(
+                pl.col("value").last().alias("prev"),
+                pl.col("date").last().alias("prevDate"),
+            )
+        )
+        # prev 为空既可能是没记过该字段，也可能是上次记的就是空值（如价格缺失）；
+        # 用非空的 prevDate 区分，后者值没变就不再重复写
+        changed = (
+            current.lazy()
+            .join(latest, on=["userId", "field"], how="left")
+            .filter(
+                pl.col("prevDate").is_null()
+                | pl.col("value").ne_missing(pl.col("prev"))
+            )
+            .select(pl.lit(date).alias("date"), "userId", "field", "value")
+            .collect()
+        )
+
+        tag = date.isoformat()
+        changed.write_parquet(os.path.join(self.root, f"deltas-{tag}.parquet"))
+        df.select(pl.lit(date).alias("date"), "userId").write_parquet(
+            os.path.join(self.root, f"snapshots-{tag}.parquet")
+        )
+        return changed
+
+    # ---------- 查询 ----------
+    def changed_since(
+        self, since: DateLike, fields: Optional[Iterable[str]] = None
+    ) -> pl.DataFrame:
+        """
+        自 since（不含当天）以来发生变化的字段：userId, field, old, new, changed_at。
+        old 为 since 当天及之前的最新值，since 之后才出现的 KOL old 为空。
+        """
+
+        since = _as_date(since)
+        deltas = self.deltas()
+        if fields is not None:
+            deltas = deltas.filter(pl.col("field").is_in(list(fields)))
+        before = (
+            deltas.filter(pl.col("date") <= since)
+            .sort("date")
+            .group_by("userId", "field")
+            .agg(pl.col("value").last().alias("old"))
+        )
+        after = (
+            deltas.filter(pl.col("date") > since)
+            .sort("date")
+            .group_by("userId", "field")
+            .agg(
+                pl.col("value").last().alias("new"),
+                pl.col("date").last().alias("changed_at"),
+            )
+        )
+        return (
+            after.join(before, on=["userId", "field"], how="left")
+            .filter(pl.col("new").ne_missing(pl.col("old")))
+            .select("userId", "field", "old", "new", "changed_at")
+            .sort("userId", "field")
+            .collect()
+        )
+
+    def timeseries(
+        self, user_id: str, fields: Sequence[str] = NUMERIC_FIELDS
+    ) -> pl.DataFrame:
+        """单个 KOL 在每次快照日期上的字段值（宽表，按日期排序，未变化的日期前向填充）。"""
+
+        dates = (
+            self.snapshots()
+            .filter(pl.col("userId") == user_id)
+            .select("date")
+            .unique()
+            .sort("date")
+            .collect()
+        )
+        deltas = (
+            self.deltas()
+            .filter((pl.col("userId") == user_id) & pl.col("field").is_in(list(fields)))
+            .collect()
+        )
+        if deltas.is_empty():
+            return dates
+        # 记录下来的空值先换成占位符，前向填充只补没有记录的日期，之后再换回空值
+        wide = deltas.with_columns(pl.col("value").fill_null(NULL_VALUE)).pivot(
+            on="field", index="date", values="value", aggregate_function="last"
+        )
+        out = dates.join(wide, on="date", how="left").sort("date")
+        present = [f for f in fields if f in out.columns]
+        out = out.with_columns(pl.col(present).forward_fill().replace(NULL_VALUE, None))
+        casts = [
+            pl.col(f).cast(pl.Float64 if f in PRICE_FIELDS else pl.Int64, strict=False)
+            for f in present
+            if f in NUMERIC_FIELDS
+        ]
+        return out.with_columns(casts).select("date", *present)
+
+    def state_at(self, date: Optional[DateLike] = None) -> pl.DataFrame:
+        """还原某日（含）的全量快照：该日快照中的每个 KOL 及其当时的字段值（字符串）。"""
+
+        date = _as_date(date)
+        members = self.snapshots().filter(pl.col("date") <= date)
+        last_date = members.select(pl.col("date").max()).collect().item()
+        if last_date is None:
+            return pl.DataFrame(schema={"userId": pl.String})
+        ids = members.filter(pl.col("date") == last_date).select("userId")
+        values = (
+            self.deltas()
+            .filter(pl.col("date") <= date)
+            .sort("date")
+            .group_by("userId", "field")
+            .agg(pl.col("value").last())
+            .collect()
+            .pivot(on="field", index="userId", values="value")
+        )
+        return ids.collect().join(values, on="userId", how="left")
+
+
+def _file_date(path: str) -> dt.date:
+    return dt.date.fromisoformat(os.path.basename(path).split("-", 1)[1][:10])
@@ -0,0 +1,305 @@
+"""
+本地 KOL 库：把 collect_xsh_user 拉到的博主落地为 Parquet，并建内存索引做离线查询。
+
+- 标签列（personalTags / contentTags / featureTags）建倒排索引：标签 → 行号集合
+- location / gender 建等值索引
+- 图文价格 / 视频价格 / 粉丝数建有序索引，区间过滤用二分，Top-N 按有序索引顺序取
+- 记录每种搜索条件最近一次从接口拉取的时间，只有缺失或过期时才回源
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+from bisect import bisect_left, bisect_right
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import polars as pl
+
+logger = logging.getLogger("kol_store")
+
+KOL_STORE_PATH = "kol_store.parquet"  # 本地 KOL 库文件
+SEARCHES_SUFFIX = ".searches.json"  # 搜索条件 → 最近拉取时间，与库文件放在一起
+MAX_AGE = 7 * 24 * 3600  # 默认过期时间（秒）
+
+TAG_COLUMNS = ("personalTags", "contentTags", "featureTags")
+EQ_COLUMNS = ("location", "gender")
+SORTED_COLUMNS = ("picturePrice", "videoPrice", "fansNum")
+
+Range = Tuple[Optional[float], Optional[float]]  # 闭区间，None 表示不限
+
+
+def search_signature(payload: Dict[str, Any]) -> str:
+    """搜索条件的稳定指纹（不含 pageNum / pageSize / trackId）。"""
+
+    key = {
+        k: v for k, v in payload.items() if k not in ("pageNum", "pageSize", "trackId")
+    }
+    raw = json.dumps(key, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()[:16]
+
+
+class KolStore:
+    """
+    本地 KOL 库。数据以 userId 为主键存放在 Parquet 中，加载时建索引。
+    query 在内存索引上求交集，适合几十万行以内的规模，单次查询毫秒级。
+    """
+
+    def __init__(self, path: str = KOL_STORE_PATH) -> None:
+        self.path = path
+        self.df = pl.read_parquet(path) if os.path.exists(path) else pl.DataFrame()
+        self.searches: Dict[str, float] = {}
+        if os.path.exists(path + SEARCHES_SUFFIX):
+            with open(path + SEARCHES_SUFFIX, encoding="utf-8") as f:
+                self.searches = json.load(f)
+        self._build_indexes()
+
+    # ---------- 写入 ----------
+    def upsert(
+        self,
+        rows: Iterable[Dict[str, Any]] | pl.DataFrame,
+        signature: Optional[str] = None,
+        fetched_at: Optional[float] = None,
+    ) -> int:
+        """
+        按 userId 合并写入（新数据覆盖旧数据，已有的博主保留原来的行号，
+        新博主追加在末尾），并记录本次搜索条件的拉取时间。
+        索引只更新被覆盖和新增的行。返回写入的行数。
+        """
+
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        new = rows if isinstance(rows, pl.DataFrame) else pl.DataFrame(rows)
+        if not new.is_empty():
+            new = new.with_columns(pl.lit(fetched_at).alias("fetched_at"))
+            for col in TAG_COLUMNS:
+                if col in new.columns:
+                    new = new.with_columns(pl.col(col).cast(pl.List(pl.String)))
+            new = new.unique("userId", keep="last", maintain_order=True)
+
+            height = self.df.height
+            order = list(range(height))
+            replaced: List[int] = []
+            for j, uid in enumerate(new["userId"].to_list()):
+                i = self._row_of.get(uid)
+                if i is None:
+                    order.append(height + j)
+                else:
+                    order[i] = height + j
+                    replaced.append(i)
+            self._index_rows(replaced, add=False)
+            merged = pl.concat([self.df, new], how="diagonal_relaxed")
+            self.df = merged[order]
+            self.df.write_parquet(self.path)
+            self._index_rows(replaced + list(range(height, self.df.height)), add=True)
+
+        if signature:
+            self.searches[signature] = fetched_at
+            with open(self.path + SEARCHES_SUFFIX, "w", encoding="utf-8") as f:
+                json.dump(self.searches, f)
+        return new.height
+
+    def is_fresh(self, signature: str, max_age: float = MAX_AGE) -> bool:
+        """该搜索条件是否在 max_age 秒内拉取过。"""
+        ts = self.searches.get(signature)
+        return ts is not None and time.time() - ts <= max_age
+
+    # ---------- 索引 ----------
+    def _build_indexes(self) -> None:
+        self._all: Set[int] = set(range(self.df.height))
+        self._tag_index: Dict[str, Dict[str, Set[int]]] = {}
+        self._eq_index: Dict[str, Dict[Any, Set[int]]] = {}
+        self._sorted: Dict[str, Tuple[List[Any], List[int]]] = {}
+        self._values: Dict[str, List[Any]] = {}
+        self._row_of: Dict[Any, int] = {}
+        if "userId" in self.df.columns:
+            self._row_of = {u: i for i, u in enumerate(self.df["userId"].to_list())}
+
+        for col in TAG_COLUMNS:
+            index: Dict[str, Set[int]] = {}
+            if col in self.df.columns:
+                for i, tags in enumerate(self.df[col].to_list()):
+                    for tag in tags or ():
+                        index.setdefault(tag, set()).add(i)
+            self._tag_index[col] = index
+
+        for col in EQ_COLUMNS:
+            index = {}
+            if col in self.df.columns:
+                for i, v in enumerate(self.df[col].to_list()):
+                    index.setdefault(v, set()).add(i)
+            self._eq_index[col] = index
+
+        for col in SORTED_COLUMNS:
+            values = self.df[col].to_list() if col in self.df.columns else []
+            self._values[col] = values
+            pairs = sorted((v, i) for i, v in enumerate(values) if v is not None)
+            self._sorted[col] = ([v for v, _ in pairs], [i for _, i in pairs])
+
+    def _index_rows(self, rows: List[int], add: bool) -> None:
+        """把 self.df 中 rows 这些行加入索引（add=False 时从索引中移出）。"""
+
+        if not rows:
+            return
+        part = self.df[rows]
+        cols = set(part.columns)
+        if add:
+            self._all.update(rows)
+            self._row_of.update(zip(part["userId"].to_list(), rows))
+
+        for col in TAG_COLUMNS:
+            if col in cols:
+                index = self._tag_index[col]
+                for i, tags in zip(rows, part[col].to_list()):
+                    for tag in tags or ():
+                        _toggle(index, tag, i, add)
+
+        for col in EQ_COLUMNS:
+            if col in cols:
+                index = self._eq_index[col]
+                for i, v in zip(rows, part[col].to_list()):
+                    _toggle(index, v, i, add)
+
+        for col in SORTED_COLUMNS:
+            col_values = self._values[col]
+            if add:
+                col_values.extend([None] * (self.df.height - len(col_values)))
+            if col not in cols:
+                continue
+            values, ids = self._sorted[col]
+            for i, v in zip(rows, part[col].to_list()):
+                if add:
+                    col_values[i] = v
+                if v is None:
+                    continue
+                # 同值的行按行号排列，与 _build_indexes 的顺序一致
+                lo, hi = bisect_left(values, v), bisect_right(values, v)
+                k = bisect_left(ids, i, lo, hi)
+                if add:
+                    values.insert(k, v)
+                    ids.insert(k, i)
+                else:
+                    del values[k], ids[k]
+
+    def _range_ids(self, col: str, rng: Range) -> Set[int]:
+        values, ids = self._sorted[col]
+        lo, hi = rng
+        start = 0 if lo is None else bisect_left(values, lo)
+        end = len(values) if hi is None else bisect_right(values, hi)
+        return set(ids[start:end])
+
+    # ---------- 查询 ----------
+    def query(
+        self,
+        location: Optional[str] = None,
+        gender: Optional[str] = None,
+        personal_tags: Iterable[str] = (),
+        content_tags: Iterable[str] = (),
+        feature_tags: Iterable[str] = (),
+        picture_price: Range = (None, None),
+        video_price: Range = (None, None),
+        fans: Range = (None, None),
+        order_by: Optional[str] = None,
+        descending: bool = True,
+        limit: Optional[int] = None,
+    ) -> pl.DataFrame:
+        """
+        离线筛选 + 排序。多个标签之间为“全部包含”，价格/粉丝为闭区间。
+        order_by 为 picturePrice / videoPrice / fansNum 之一时直接沿有序索引取 Top-N。
+        """
+
+        candidates: List[Set[int]] = []
+        for col, value in (("location", location), ("gender", gender)):
+            if value is not None:
+                candidates.append(self._eq_index[col].get(value, set()))
+        for col, tags in zip(TAG_COLUMNS, (personal_tags, content_tags, feature_tags)):
+            for tag in tags:
+                candidates.append(self._tag_index[col].get(tag, set()))
+        for col, rng in zip(SORTED_COLUMNS, (picture_price, video_price, fans)):
+            if rng != (None, None):
+                candidates.append(self._range_ids(col, rng))
+
+        # 从最小的集合开始求交集
+        candidates.sort(key=len)
+        hits = set(candidates[0]) if candidates else set(self._all)
+        for ids in candidates[1:]:
+            hits &= ids
+            if not hits:
+                break
+
+        if order_by in self._sorted:
+            picked = self._top_n(order_by, hits, descending, limit)
+            return self.df[picked] if picked else self.df.clear()
+
+        out = self.df[sorted(hits)] if hits else self.df.clear()
+        if order_by in out.columns:
+            out = out.sort(order_by, descending=descending, nulls_last=True)
+        return out if limit is None else out.head(limit)
+
+    def _top_n(
+        self, col: str, hits: Set[int], descending: bool, limit: Optional[int]
+    ) -> List[int]:
+        """按有序索引取命中行的前 limit 个，排序列为空的行放在最后。"""
+
+        want = len(hits) if limit is None else min(limit, len(hits))
+        ordered = self._sorted[col][1]
+        if len(hits) * 8 < len(ordered):
+            # 命中很少时直接对命中行排序，比沿整条索引扫描更快
+            col_values = self._values[col]
+            with_value = [i for i in hits if col_values[i] is not None]
+            with_value.sort(key=col_values.__getitem__, reverse=descending)
+            picked = with_value[:want]
+        else:
+            picked = []
+            for i in reversed(ordered) if descending else ordered:
+                if len(picked) >= want:
+                    break
+                if i in hits:
+                    picked.append(i)
+        if len(picked) < want:
+            picked += sorted(hits.difference(picked))[: want - len(picked)]
+        return picked
+
+    def query_or_fetch(
+        self,
+        payload: Dict[str, Any],
+        fetch: Optional[Callable[[Dict[str, Any]], List[Dict[str, Any]]]] = None,
+        max_age: float = MAX_AGE,
+        **filters: Any,
+    ) -> pl.DataFrame:
+        """
+        先看该搜索条件（payload）是否在 max_age 内拉过：是则直接离线查询，
+        否则调用 fetch(payload) 回源拉取并写入库后再查询。
+        filters 为 query 的参数，可以比 payload 更细（例如接口不支持的标签组合）。
+        """
+
+        signature = search_signature(payload)
+        if not self.is_fresh(signature, max_age):
+            fetch = fetch or _fetch_from_api
+            logger.info("搜索条件 %s 缺失或已过期，回源拉取。", signature)
+            self.upsert(fetch(payload), signature=signature)
+        return self.query(**filters)
+
+
+def _toggle(index: Dict[Any, Set[int]], key: Any, i: int, add: bool) -> None:
+    """在 key 对应的行号集合里加入或移出 i，集合空了就删掉 key。"""
+
+    if add:
+        index.setdefault(key, set()).add(i)
+        return
+    ids = index.get(key)
+    if ids is not None:
+        ids.discard(i)
+        if not ids:
+            del index[key]
+
+
+def _fetch_from_api(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """默认回源方式：用 collect_xsh_user 的 Session 和翻页逻辑拉取。"""
+
+    import collect_xsh_user as cxu
+
+    session = cxu._make_session(headers=cxu.headers, cookies=cxu.cookies)
+    return list(cxu.iter_pages(session, payload))
@@ -1,5 +1,71 @@
-def main():
-    print("Hello from hello-python!")
+"""
+统一命令行入口：python main.py [--timing] <子命令> [参数...]
+
+子命令选中后才导入对应脚本，polars / duckdb / pandas / selenium 等重依赖随之加载；
+`python main.py --help`、拼错子命令等不会导入任何重依赖。
+子命令后面的参数原样交给脚本本身处理，例如 `python main.py salary --help`。
+"""
+
+import time
+
+_STARTED = time.perf_counter()
+
+# 先记下起始时间，启动耗时里包含下面这些导入
+import argparse
+import runpy
+import sys
+
+# 子命令 → (脚本模块, 说明)
+COMMANDS = {
+    "search": ("collect_xsh_user", "蒲公英 KOL 搜索，边拉边写 Parquet 并导出 Excel"),
+    "orders": ("xhs_orders_all", "拉取全部订单任务，展开订单后导出"),
+    "heat": ("xhs_heat_report_all", "拉取热度报告，导出 JSON/CSV"),
+    "blogger": ("pgy_user_info", "批量补全博主详情（userId 文件或 KOL 搜索结果）"),
+    "invite": ("post_invite", "按台账批量发起邀约"),
+    "notes": ("selenium_parse", "用浏览器抓取笔记数据（urls.txt）"),
+    "profiles": ("selenium_users_info", "用浏览器抓取博主主页的笔记（user_urls.txt）"),
+    "salary": ("calculate_salary", "稿费计算"),
+    "cost": ("calculate_cost", "费用明细汇总"),
+    "kpi": ("calculate_fans", "统计项目 KPI 完成情况"),
+    "fans": ("fans_correction", "粉丝量统一为“万”"),
+    "mock": ("pgy_mock_server", "启动本地模拟的蒲公英接口"),
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    width = max(map(len, COMMANDS))
+    epilog = "子命令：\n" + "\n".join(
+        f"  {name:<{width}}  {desc}" for name, (_, desc) in COMMANDS.items()
+    )
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description=__doc__.strip().splitlines()[0],
+        epilog=epilog,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--timing", action="store_true", help="在 stderr 输出启动耗时与子命令耗时"
+    )
+    parser.add_argument("command", choices=COMMANDS, metavar="command", help="子命令")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="交给子命令的参数")
+    return parser
+
+
+def main(argv=None) -> None:
+    args = build_parser().parse_args(argv)
+    module = COMMANDS[args.command][0]
+
+    started = time.perf_counter()
+    if args.timing:
+        print(f"[timing] 启动 {(started - _STARTED) * 1000:.1f}ms", file=sys.stderr)
+    # 与直接运行 python <脚本>.py 参数... 等价；sys.argv[0] 决定埋点文件名等
+    sys.argv = [f"{module}.py", *args.args]
+    try:
+        runpy.run_module(module, run_name="__main__", alter_sys=True)
+    finally:
+        if args.timing:
+            elapsed = time.perf_counter() - started
+            print(f"[timing] {args.command} 用时 {elapsed:.2f}s", file=sys.stderr)
 
 
 if __name__ == "__main__":
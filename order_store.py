@@ -0,0 +1,535 @@
+"""
+订单任务的本地 DuckDB 库：xhs_orders_all 增量同步的落地层。
+
+- tasks：每个 taskNo 一行（任务字段，不含 orderVos）
+- orders：每个 orderId 一行（展平后的订单字段 + 原始 JSON）
+- 每行存内容哈希，同步时只 upsert 哈希变化的行；一页里没有任何变化即可判定该页未变
+- orderStatus / state 的变化（含新订单的初始状态）写入 order_changes，
+  状态看板直接查变更记录，不用重拉全量
+- sync_runs 记录每次同步：全量 / 增量、翻了几页、改了多少行
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+import json
+import os
+import shutil
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import duckdb
+import polars as pl
+
+from pgy_capture import read_index
+from pgy_frames import cast_column, decode_rows
+
+ORDER_DB_PATH = "xhs_orders.duckdb"
+# 每次请求都会变、不代表订单有变化的字段，不参与内容哈希
+HASH_IGNORED_FIELDS: Tuple[str, ...] = ()
+STATUS_FIELDS = ("orderStatus", "state")  # 变化时记入 order_changes
+
+# 展平后的订单行：任务字段（列名, 任务里的字段名） + 订单字段
+TASK_FIELDS = (
+    ("taskNo", "taskNo"),
+    ("taskTitle", "title"),
+    ("reportBrandUserName", "reportBrandUserName"),
+    ("expectPublishTime", "expectPublishTime"),
+)
+ORDER_FIELDS = (
+    "orderId",
+    "totalPrice",
+    "contentPrice",
+    "createTime",
+    "notePublishTime",
+    "orderStatus",
+    "state",
+    "contentType",
+    "settlementRule",
+    "needAdsAudit",
+    "kolId",
+    "kolName",
+    "brandId",
+    "brandName",
+)
+ORDER_COLUMNS = tuple(c for c, _ in TASK_FIELDS) + ORDER_FIELDS
+PRICE_COLUMNS = ("totalPrice", "contentPrice")
+
+# flatten_orders 的输出 schema（列顺序同 ORDER_COLUMNS），
+# 解码时类型不符的值置空（见 pgy_frames）
+TASK_SCHEMA = {
+    "taskNo": pl.String,
+    "title": pl.String,
+    "reportBrandUserName": pl.String,
+    "expectPublishTime": pl.Int64,
+}
+ORDER_SCHEMA = {
+    "orderId": pl.String,
+    "totalPrice": pl.Float64,
+    "contentPrice": pl.Float64,
+    "createTime": pl.Int64,
+    "notePublishTime": pl.Int64,
+    "orderStatus": pl.Int64,
+    "state": pl.Int64,
+    "contentType": pl.Int64,
+    "settlementRule": pl.Int64,
+    "needAdsAudit": pl.Boolean,
+    "kolId": pl.String,
+    "kolName": pl.String,
+    "brandId": pl.String,
+    "brandName": pl.String,
+}
+ORDERS_FRAME_SCHEMA = {
+    **{col: TASK_SCHEMA[key] for col, key in TASK_FIELDS},
+    **ORDER_SCHEMA,
+}
+
+
+def order_row(task: Dict[str, Any], order: Dict[str, Any]) -> Dict[str, Any]:
+    """单个订单展平为一行：任务字段 + 订单字段（按 ORDER_COLUMNS 顺序）。"""
+
+    row = {col: task.get(key) for col, key in TASK_FIELDS}
+    row.update((k, order.get(k)) for k in ORDER_FIELDS)
+    return row
+
+
+def flatten_orders(tasks: List[Dict[str, Any]]) -> pl.DataFrame:
+    """
+    order_row 的列式版本，输出列固定为 ORDERS_FRAME_SCHEMA，没有订单时也保留表头；
+    没有 orderVos 的任务不出行，与逐条展平一致。
+
+    任务按 TASK_SCHEMA 解码后按订单数 repeat_by + explode 展开；全部 orderVos 拼成一个
+    列表按 ORDER_SCHEMA 一次解码，两边按行对齐拼接。解码用 pgy_frames.decode_rows，
+    类型不符的值（如 expectPublishTime 为 "2025-12-01"）置空，不会让整批导出失败。
+    展平本身与逐条拼字典耗时相当，导出变快靠的是列式写出（见 write_orders）；
+    直接按 List[Struct] 解码 orderVos 再 explode + unnest 要慢近十倍
+    （见 bench_orders_flatten.py 的 nested unnest）。
+    """
+
+    vos = [t.get("orderVos") or [] for t in tasks]
+    orders = [o for v in vos for o in v]
+    if not orders:
+        return pl.DataFrame(schema=ORDERS_FRAME_SCHEMA)
+    task_frame = (
+        decode_rows(tasks, TASK_SCHEMA)
+        .select(
+            pl.all()
+            .repeat_by(pl.Series([len(v) for v in vos], dtype=pl.UInt32))
+            .explode()
+        )
+        .rename({key: col for col, key in TASK_FIELDS})
+    )
+    order_frame = decode_rows(orders, ORDER_SCHEMA)
+    return task_frame.hstack(order_frame)
+
+
+def write_orders(frame: pl.DataFrame, path: str) -> None:
+    """
+    按扩展名写出订单表：.parquet 写 Parquet，其余写带 BOM 的 CSV（Excel 可直接打开）。
+    """
+
+    if path.endswith(".parquet"):
+        frame.write_parquet(path)
+    else:
+        frame.write_csv(path, include_bom=True)
+
+
+def _try_cast(expr: str, dtype: pl.DataType) -> str:
+    """
+    文本列 → dtype 的 SQL 表达式，规则同 pgy_frames.cast_column：转不过去的值置空，
+    整数列不接受带小数的值（TRY_CAST 会四舍五入），布尔列只认 true / false。
+    """
+
+    if dtype == pl.String:
+        return expr
+    if dtype == pl.Boolean:
+        return f"CASE lower({expr}) WHEN 'true' THEN true WHEN 'false' THEN false END"
+    if dtype == pl.Int64:
+        return (
+            f"CASE WHEN TRY_CAST({expr} AS DOUBLE) % 1 = 0 "
+            f"THEN TRY_CAST({expr} AS BIGINT) END"
+        )
+    return f"TRY_CAST({expr} AS DOUBLE)"
+
+
+def scan_captured_orders(capture: str) -> duckdb.DuckDBPyRelation:
+    """
+    flatten_orders 的惰性版本：直接在 pgy_capture 写出的压缩 NDJSON 任务文件上
+    展开 orderVos（DuckDB 流式解压、解析，不把任务读进内存）。
+    列与类型同 ORDERS_FRAME_SCHEMA。
+
+    字段一律按 VARCHAR 读入再在投影里转换，类型不符的值置空而不是整个文件读失败，
+    与 flatten_orders 一致。
+    """
+
+    columns = dict.fromkeys(TASK_SCHEMA, "VARCHAR")
+    fields = ", ".join(f"{k} VARCHAR" for k in ORDER_SCHEMA)
+    columns["orderVos"] = f"STRUCT({fields})[]"
+    select = [
+        f"{_try_cast(key, TASK_SCHEMA[key])} AS {col}" for col, key in TASK_FIELDS
+    ]
+    select += [f"{_try_cast('o.' + k, ORDER_SCHEMA[k])} AS {k}" for k in ORDER_FIELDS]
+    return duckdb.sql(
+        f"SELECT {', '.join(select)} "
+        "FROM read_json(?, format = 'newline_delimited', columns = ?), "
+        "UNNEST(orderVos) AS u(o)",
+        params=[capture, columns],
+    )
+
+
+def export_captured_orders(capture: str, path: str) -> int:
+    """
+    把任务抓取文件展平后写出（扩展名规则同 write_orders），返回订单行数。
+    由 DuckDB 流式写出；CSV 先写到临时文件，再补上 BOM 拷过去。
+    """
+
+    if not any(p["rows"] for p in read_index(capture)):
+        # 空文件不是合法的压缩流，DuckDB 读不了；只写表头
+        write_orders(pl.DataFrame(schema=ORDERS_FRAME_SCHEMA), path)
+        return 0
+    rel = scan_captured_orders(capture)
+    if path.endswith(".parquet"):
+        rel.write_parquet(path)
+        return pl.scan_parquet(path).select(pl.len()).collect().item()
+    tmp = path + ".tmp"
+    rel.write_csv(tmp, header=True)
+    try:
+        with open(tmp, "rb") as src, open(path, "wb") as dst:
+            dst.write(b"\xef\xbb\xbf")  # 与 write_orders 一致：Excel 直接打开
+            shutil.copyfileobj(src, dst, 1 << 20)
+    finally:
+        os.remove(tmp)
+    return pl.scan_csv(path).select(pl.len()).collect().item()
+
+
+def content_hash(obj: Dict[str, Any]) -> str:
+    """字段顺序无关的内容哈希（忽略 HASH_IGNORED_FIELDS）。"""
+
+    obj = {k: v for k, v in obj.items() if k not in HASH_IGNORED_FIELDS}
+    raw = json.dumps(obj, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _text(v: Any) -> Optional[str]:
+    if v is None:
+        return None
+    if isinstance(v, (dict, list)):
+        return json.dumps(v, ensure_ascii=False)
+    return str(v)
+
+
+def _price(v: Any) -> Optional[float]:
+    if v is None or isinstance(v, (int, float)):
+        return None if v is None else float(v)
+    try:
+        return float(str(v))
+    except ValueError:
+        return None
+
+
+def _order_values(row: Dict[str, Any]) -> List[Any]:
+    return [
+        _price(row[c]) if c in PRICE_COLUMNS else _text(row[c]) for c in ORDER_COLUMNS
+    ]
+
+
+@dataclass
+class ApplyResult:
+    """一批任务写入后的变化统计。"""
+
+    tasks_changed: int = 0
+    orders_new: int = 0
+    orders_changed: int = 0
+    status_changes: int = 0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.tasks_changed or self.orders_new or self.orders_changed)
+
+    def __iadd__(self, other: "ApplyResult") -> "ApplyResult":
+        self.tasks_changed += other.tasks_changed
+        self.orders_new += other.orders_new
+        self.orders_changed += other.orders_changed
+        self.status_changes += other.status_changes
+        return self
+
+
+class OrderStore:
+    """
+    订单任务库（DuckDB 单文件，同一时间只允许一个进程写）。
+
+        with OrderStore() as store:
+            result = store.apply_tasks(page["list"])
+            if not result.changed: ...
+    """
+
+    def __init__(self, path: str = ORDER_DB_PATH) -> None:
+        self.path = path
+        self.db = duckdb.connect(path)
+        # 列顺序与 ORDER_COLUMNS 一致，写入时按位置对应
+        columns = ", ".join(
+            f"{c} DOUBLE"
+            if c in PRICE_COLUMNS
+            else f"{c} VARCHAR PRIMARY KEY"
+            if c == "orderId"
+            else f"{c} VARCHAR"
+            for c in ORDER_COLUMNS
+        )
+        self.db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tasks (
+                taskNo VARCHAR PRIMARY KEY,
+                title VARCHAR,
+                reportBrandUserName VARCHAR,
+                expectPublishTime VARCHAR,
+                raw VARCHAR,
+                hash VARCHAR,
+                firstSeenAt TIMESTAMP,
+                updatedAt TIMESTAMP
+            )
+            """
+        )
+        self.db.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS orders (
+                {columns},
+                raw VARCHAR,
+                hash VARCHAR,
+                firstSeenAt TIMESTAMP,
+                updatedAt TIMESTAMP
+            )
+            """
+        )
+        self.db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS order_changes (
+                orderId VARCHAR,
+                taskNo VARCHAR,
+                field VARCHAR,
+                oldValue VARCHAR,
+                newValue VARCHAR,
+                changedAt TIMESTAMP
+            )
+            """
+        )
+        self.db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sync_runs (
+                startedAt TIMESTAMP,
+                finishedAt TIMESTAMP,
+                mode VARCHAR,
+                pages INTEGER,
+                tasksChanged INTEGER,
+                ordersNew INTEGER,
+                ordersChanged INTEGER,
+                statusChanges INTEGER
+            )
+            """
+        )
+
+    def __enter__(self) -> "OrderStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.db.close()
+
+    # ---------- 写入 ----------
+    def _existing(
+        self, table: str, key: str, ids: List[str], extra: str = ""
+    ) -> Dict[str, Tuple[Any, ...]]:
+        if not ids:
+            return {}
+        marks = ",".join("?" * len(ids))
+        rows = self.db.execute(
+            f"SELECT {key}, hash, firstSeenAt{extra} FROM {table} "
+            f"WHERE {key} IN ({marks})",
+            ids,
+        ).fetchall()
+        return {r[0]: r[1:] for r in rows}
+
+    def apply_tasks(
+        self, tasks: Iterable[Dict[str, Any]], now: Optional[dt.datetime] = None
+    ) -> ApplyResult:
+        """
+        写入一页（或任意一批）任务：哈希未变的任务/订单跳过，变化的 upsert，
+        orderStatus / state 的变化记入 order_changes。整批在一个事务里提交。
+        """
+
+        now = now or dt.datetime.now()
+        tasks = [t for t in tasks if t.get("taskNo")]
+        result = ApplyResult()
+
+        task_rows, order_rows, changes = [], [], []
+        task_hashes = {}
+        orders: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+        for task in tasks:
+            body = {k: v for k, v in task.items() if k != "orderVos"}
+            task_hashes[str(task["taskNo"])] = (body, content_hash(body))
+            orders.extend(
+                (task, o) for o in task.get("orderVos") or [] if o.get("orderId")
+            )
+
+        old_tasks = self._existing("tasks", "taskNo", list(task_hashes))
+        for task_no, (body, h) in task_hashes.items():
+            old = old_tasks.get(task_no)
+            if old is not None and old[0] == h:
+                continue
+            result.tasks_changed += 1
+            task_rows.append(
+                [
+                    task_no,
+                    _text(body.get("title")),
+                    _text(body.get("reportBrandUserName")),
+                    _text(body.get("expectPublishTime")),
+                    json.dumps(body, ensure_ascii=False),
+                    h,
+                    old[1] if old else now,
+                    now,
+                ]
+            )
+
+        status_cols = "".join(f", {c}" for c in STATUS_FIELDS)
+        old_orders = self._existing(
+            "orders", "orderId", [str(o["orderId"]) for _, o in orders], status_cols
+        )
+        for task, order in orders:
+            order_id = str(order["orderId"])
+            h = content_hash(order)
+            old = old_orders.get(order_id)
+            if old is not None and old[0] == h:
+                continue
+            row = order_row(task, order)
+            if old is None:
+                result.orders_new += 1
+            else:
+                result.orders_changed += 1
+            for field, old_value in zip(STATUS_FIELDS, old[2:] if old else (None,) * 2):
+                new_value = _text(row[field])
+                if old is None or old_value != new_value:
+                    changes.append(
+                        [
+                            order_id,
+                            _text(row["taskNo"]),
+                            field,
+                            old_value,
+                            new_value,
+                            now,
+                        ]
+                    )
+            order_rows.append(
+                _order_values(row)
+                + [
+                    json.dumps(order, ensure_ascii=False),
+                    h,
+                    old[1] if old else now,
+                    now,
+                ]
+            )
+            old_orders[order_id] = (h, old[1] if old else now)  # 同批重复的订单只写一次
+        result.status_changes = len(changes)
+
+        if task_rows or order_rows:
+            self.db.execute("BEGIN TRANSACTION")
+            try:
+                if task_rows:
+                    self.db.executemany(
+                        "INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        task_rows,
+                    )
+                if order_rows:
+                    marks = ", ".join("?" * (len(ORDER_COLUMNS) + 4))
+                    self.db.executemany(
+                        f"INSERT OR REPLACE INTO orders VALUES ({marks})", order_rows
+                    )
+                if changes:
+                    self.db.executemany(
+                        "INSERT INTO order_changes VALUES (?, ?, ?, ?, ?, ?)", changes
+                    )
+                self.db.execute("COMMIT")
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+        return result
+
+    def record_run(
+        self, started: dt.datetime, mode: str, pages: int, result: ApplyResult
+    ) -> None:
+        self.db.execute(
+            "INSERT INTO sync_runs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                started,
+                dt.datetime.now(),
+                mode,
+                pages,
+                result.tasks_changed,
+                result.orders_new,
+                result.orders_changed,
+                result.status_changes,
+            ],
+        )
+
+    # ---------- 查询 ----------
+    def run_count(self) -> int:
+        """已记录的同步次数（全量 + 增量）。"""
+
+        return self.db.execute("SELECT count(*) FROM sync_runs").fetchone()[0]
+
+    def last_full_sync(self) -> Optional[dt.datetime]:
+        """最近一次跑完的全量同步的开始时间；从未全量同步过时为 None。"""
+
+        row = self.db.execute(
+            "SELECT max(startedAt) FROM sync_runs WHERE mode = 'full'"
+        ).fetchone()
+        return row[0] if row else None
+
+    def orders_frame(self) -> pl.DataFrame:
+        """全部订单（展平后的列，按任务、订单排序），列类型同 ORDERS_FRAME_SCHEMA。"""
+
+        cols = ", ".join(ORDER_COLUMNS)
+        # 库里除价格外都存成文本，按 flatten_orders 的 schema 转回来，两条路径输出一致
+        return (
+            self.db.execute(f"SELECT {cols} FROM orders ORDER BY taskNo DESC, orderId")
+            .pl()
+            .select(cast_column(c, t).alias(c) for c, t in ORDERS_FRAME_SCHEMA.items())
+        )
+
+    def iter_tasks(self, batch: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """按原始结构还原的任务（含 orderVos），每次产出 batch 个，不把整库读进内存。"""
+
+        cur = self.db.cursor()
+        try:
+            cur.execute(
+                """
+                SELECT t.raw, list(o.raw ORDER BY o.orderId) FILTER (o.raw IS NOT NULL)
+                FROM tasks t LEFT JOIN orders o USING (taskNo)
+                GROUP BY t.taskNo, t.raw
+                ORDER BY t.taskNo DESC
+                """
+            )
+            while True:
+                rows = cur.fetchmany(batch)
+                if not rows:
+                    break
+                yield [
+                    {**json.loads(raw), "orderVos": [json.loads(o) for o in vos or []]}
+                    for raw, vos in rows
+                ]
+        finally:
+            cur.close()
+
+    def tasks(self) -> List[Dict[str, Any]]:
+        """按原始结构还原的全部任务（含 orderVos）。"""
+
+        return [task for part in self.iter_tasks() for task in part]
+
+    def changes_since(self, since: dt.datetime) -> pl.DataFrame:
+        """since 之后的 orderStatus / state 变化。"""
+
+        return self.db.execute(
+            "SELECT * FROM order_changes WHERE changedAt >= ? ORDER BY changedAt",
+            [since],
+        ).pl()
@@ -0,0 +1,332 @@
+"""
+多账号会话池：从本地账号文件加载多组 cookies/headers，把页码或 userId 分摊到各账号上。
+
+- 每个账号有自己的限速预算（pgy_http.with_account_budget，按账号跨进程共用）
+- 每个账号一个或多个 worker 从共享队列取任务，吞吐随账号数增长
+- 任务抛 AccountRejected（登录失效、风控、success=false 等）时记一次警告并换号重试
+  （拒过该任务的账号不再接手，除非可用账号都已试过），
+  同一账号连续 MAX_STRIKES 次被拒即剔除，剩余任务由其他账号接手
+- 任务抛 TransientError（超时、连接错误、5xx 等与账号无关的失败）时同样重新排队，
+  但不计入被拒次数，偶发的服务端错误不会把正常账号剔除
+- 账号熔断（pgy_http.CircuitOpen：登录失效、重试预算耗尽）时立即剔除
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    TypeVar,
+)
+
+from pgy_http import CircuitOpen, RateLimiter, with_account_budget
+
+logger = logging.getLogger("pgy_accounts")
+
+S = TypeVar("S")  # 会话类型：requests.Session 或 pgy_aio.PgyClient
+T = TypeVar("T")
+
+ACCOUNTS_FILE = "pgy_accounts.json"  # 本地账号文件，见 load_accounts
+ACCOUNT_RPS = 2.0  # 单个账号每秒请求上限（另受 ACCOUNT_BUDGET_RPS 的跨进程预算约束）
+MAX_STRIKES = 2  # 同一账号连续被拒几次后剔除
+MAX_TRIES = 3  # 单个任务最多换几个账号尝试，仍失败则结果为 None
+REQUEUE_WAIT = 0.05  # 任务留给别的账号时，放回队列后等一下再取，避免空转
+
+
+class AccountRejected(RuntimeError):
+    """当前账号的请求被拒（登录失效、风控、success=false 等），应换一个账号重试。"""
+
+
+class TransientError(RuntimeError):
+    """与账号无关的临时失败（超时、连接错误、5xx），重新排队重试，不计入被拒次数。"""
+
+
+class NoHealthyAccount(RuntimeError):
+    """所有账号都已被剔除，仍有任务没有完成。"""
+
+
+@dataclass
+class Account:
+    name: str
+    cookies: Dict[str, str]
+    headers: Dict[str, str] = field(default_factory=dict)
+    limiter: Optional[RateLimiter] = None
+    strikes: int = 0  # 连续被拒次数
+    done: int = 0  # 成功完成的任务数
+    rejected: int = 0  # 累计被拒次数
+    evicted: Optional[str] = None  # 剔除原因，None 表示仍可用
+
+
+def parse_cookie_header(raw: str) -> Dict[str, str]:
+    """把浏览器复制出来的 'a=1; b=2' 形式的 cookie 串转为字典。"""
+
+    cookies: Dict[str, str] = {}
+    for part in raw.split(";"):
+        name, sep, value = part.strip().partition("=")
+        if sep:
+            cookies[name] = value
+    return cookies
+
+
+def load_accounts(
+    path: str = ACCOUNTS_FILE,
+    default_headers: Optional[Dict[str, str]] = None,
+    rps: Optional[float] = ACCOUNT_RPS,
+) -> List[Account]:
+    """
+    读取账号文件（JSON 列表），每项：
+        {"name": "主号", "cookies": {...}}                  # cookie 字典
+        {"name": "小号", "cookie": "a=1; b=2", "headers": {...}}  # 或整串 cookie
+    headers 缺省时用 default_headers。每个账号配一个 rps 限速器并叠加账号级跨进程预算。
+    """
+
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+
+    accounts = []
+    for i, rec in enumerate(raw):
+        cookies = dict(rec.get("cookies") or parse_cookie_header(rec.get("cookie", "")))
+        if not cookies:
+            logger.warning("账号文件第%s项没有 cookies，忽略。", i + 1)
+            continue
+        accounts.append(
+            Account(
+                name=rec.get("name") or f"account{i + 1}",
+                cookies=cookies,
+                headers=dict(rec.get("headers") or default_headers or {}),
+                limiter=with_account_budget(RateLimiter(rps), cookies),
+            )
+        )
+    logger.info("加载了 %s 个账号：%s", len(accounts), [a.name for a in accounts])
+    return accounts
+
+
+class SessionPool(Generic[S]):
+    """
+    多账号会话池。factory(account) 为账号创建会话（第一次用到时才创建）。
+
+        pool = SessionPool(load_accounts(), lambda a: make_session(a.cookies))
+        results = pool.run(pages, lambda session, account, page: ...)
+
+    run / run_async 返回与 items 顺序一致的结果列表，
+    换号重试 MAX_TRIES 次仍失败的项为 None。
+    """
+
+    def __init__(
+        self,
+        accounts: List[Account],
+        factory: Callable[[Account], S],
+        per_account: int = 1,
+        max_strikes: int = MAX_STRIKES,
+    ) -> None:
+        if not accounts:
+            raise ValueError("账号列表为空")
+        self.accounts = accounts
+        self.factory = factory
+        self.per_account = per_account
+        self.max_strikes = max_strikes
+        self._sessions: Dict[str, S] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def healthy(self) -> List[Account]:
+        return [a for a in self.accounts if a.evicted is None]
+
+    def session(self, account: Account) -> S:
+        with self._lock:
+            if account.name not in self._sessions:
+                self._sessions[account.name] = self.factory(account)
+            return self._sessions[account.name]
+
+    def _skip(self, account: Account, tried: frozenset) -> bool:
+        """该账号拒过这项任务、且还有没试过的可用账号时，留给别的账号。"""
+        return account.name in tried and any(a.name not in tried for a in self.healthy)
+
+    def _report(self, account: Account, error: Optional[Exception]) -> None:
+        with self._lock:
+            if error is None:
+                account.strikes = 0
+                account.done += 1
+                return
+            account.strikes += 1
+            account.rejected += 1
+            if isinstance(error, CircuitOpen):
+                account.strikes = self.max_strikes
+            if account.evicted is None and account.strikes >= self.max_strikes:
+                account.evicted = str(error)
+                logger.warning("账号 %s 已剔除：%s", account.name, error)
+            else:
+                logger.info(
+                    "账号 %s 被拒（%s 次）：%s", account.name, account.strikes, error
+                )
+
+    def run(
+        self,
+        items: Iterable[Any],
+        fn: Callable[[S, Account, Any], T],
+        max_tries: int = MAX_TRIES,
+    ) -> List[Optional[T]]:
+        """用线程把 items 分摊到各账号执行 fn(session, account, item)。"""
+
+        items = list(items)
+        results: List[Optional[T]] = [None] * len(items)
+        tasks: "queue.Queue[tuple]" = queue.Queue()
+        for i, item in enumerate(items):
+            tasks.put((i, item, 0, frozenset()))
+        state = {"pending": len(items)}
+        errors: List[BaseException] = []
+
+        def finish() -> None:
+            with self._lock:
+                state["pending"] -= 1
+
+        def worker(account: Account) -> None:
+            session = self.session(account)
+            while account.evicted is None and state["pending"] > 0 and not errors:
+                try:
+                    i, item, tries, tried = tasks.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if self._skip(account, tried):
+                    tasks.put((i, item, tries, tried))
+                    time.sleep(REQUEUE_WAIT)
+                    continue
+                try:
+                    results[i] = fn(session, account, item)
+                except (AccountRejected, CircuitOpen) as e:
+                    self._report(account, e)
+                    if tries + 1 < max_tries:
+                        tasks.put((i, item, tries + 1, tried | {account.name}))
+                        continue
+                    logger.warning(
+                        "%r 在 %s 个账号上都失败，放弃：%s", item, max_tries, e
+                    )
+                except TransientError as e:
+                    if tries + 1 < max_tries:
+                        tasks.put((i, item, tries + 1, tried))
+                        continue
+                    logger.warning("%r 重试 %s 次仍失败，放弃：%s", item, max_tries, e)
+                except BaseException as e:  # noqa: BLE001 - 交回调用线程再抛出
+                    errors.append(e)
+                else:
+                    self._report(account, None)
+                finish()
+
+        threads = [
+            threading.Thread(target=worker, args=(a,), daemon=True)
+            for a in self.healthy
+            for _ in range(self.per_account)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        if errors:
+            raise errors[0]
+        if state["pending"] > 0:
+            raise NoHealthyAccount(
+                f"所有账号均已剔除，还有 {state['pending']} 项未完成"
+            )
+        return results
+
+    async def run_async(
+        self,
+        items: Iterable[Any],
+        fn: Callable[[S, Account, Any], Awaitable[T]],
+        max_tries: int = MAX_TRIES,
+    ) -> List[Optional[T]]:
+        """
+        asyncio 版 run：每个账号 per_account 个协程从共享队列取任务。
+        fn 抛出 AccountRejected / CircuitOpen / TransientError 以外的异常时，
+        先取消其余协程再抛出。
+        """
+
+        items = list(items)
+        results: List[Optional[T]] = [None] * len(items)
+        tasks: asyncio.Queue = asyncio.Queue()
+        for i, item in enumerate(items):
+            tasks.put_nowait((i, item, 0, frozenset()))
+        pending = len(items)
+
+        async def worker(account: Account) -> None:
+            nonlocal pending
+            session = self.session(account)
+            while account.evicted is None and pending > 0:
+                try:
+                    i, item, tries, tried = tasks.get_nowait()
+                except asyncio.QueueEmpty:
+                    # 其他 worker 可能把失败的任务放回来
+                    await asyncio.sleep(REQUEUE_WAIT)
+                    continue
+                if self._skip(account, tried):
+                    tasks.put_nowait((i, item, tries, tried))
+                    await asyncio.sleep(REQUEUE_WAIT)
+                    continue
+                try:
+                    results[i] = await fn(session, account, item)
+                except (AccountRejected, CircuitOpen) as e:
+                    self._report(account, e)
+                    if tries + 1 < max_tries:
+                        tasks.put_nowait((i, item, tries + 1, tried | {account.name}))
+                        continue
+                    logger.warning(
+                        "%r 在 %s 个账号上都失败，放弃：%s", item, max_tries, e
+                    )
+                except TransientError as e:
+                    if tries + 1 < max_tries:
+                        tasks.put_nowait((i, item, tries + 1, tried))
+                        continue
+                    logger.warning("%r 重试 %s 次仍失败，放弃：%s", item, max_tries, e)
+                else:
+                    self._report(account, None)
+                pending -= 1
+
+        workers = [
+            asyncio.create_task(worker(a))
+            for a in self.healthy
+            for _ in range(self.per_account)
+        ]
+        try:
+            await asyncio.gather(*workers)
+        except BaseException:
+            # 任一 worker 抛出意外异常：先取消其余 worker，再把异常原样抛出
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            raise
+        if pending > 0:
+            raise NoHealthyAccount(f"所有账号均已剔除，还有 {pending} 项未完成")
+        return results
+
+    def summary(self) -> str:
+        parts = []
+        for a in self.accounts:
+            status = f"已剔除（{a.evicted}）" if a.evicted else "可用"
+            parts.append(f"{a.name}: 完成 {a.done}，被拒 {a.rejected}，{status}")
+        return "账号池：" + "；".join(parts)
+
+    def close(self) -> None:
+        for s in self._sessions.values():
+            close = getattr(s, "close", None)
+            if close is not None:
+                close()
+
+    async def aclose(self) -> None:
+        for s in self._sessions.values():
+            aclose = getattr(s, "aclose", None)
+            if aclose is not None:
+                await aclose()
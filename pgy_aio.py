@@ -0,0 +1,328 @@
+"""
+蒲公英(pgy)各抓取脚本共用的 asyncio HTTP 客户端。
+
+- 一个 httpx.AsyncClient：keep-alive 连接池，装了 h2 时走 HTTP/2（多个请求复用一条连接）
+- 统一的重试/退避策略 RetryPolicy，429 时优先按 Retry-After 等待
+- 按 host 限制同时在途的请求数，可再叠加 pgy_http.RateLimiter 做全局限速
+  （传 AdaptiveRateLimiter 时每次响应的健康状况都会反馈给它调速）；时间片在临发出前
+  逐个预约，降速对还没发出的请求立即生效
+- 大响应的 JSON 解析放到线程池，不阻塞事件循环
+- 可选 pgy_http.ResponseCache 磁盘缓存（与同步脚本共用同一份缓存）
+- 按账号共用 pgy_http.CircuitBreaker：登录失效/风控时尽快失败，重试受全局预算约束
+- 每个请求的耗时、字节数、重试、JSON 解析耗时与等待时间计入 pgy_metrics
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, TypeVar
+from urllib.parse import urlsplit
+
+import httpx
+
+from pgy_http import (
+    ACCOUNT_COOKIE,
+    CircuitBreaker,
+    RateLimiter,
+    ResponseCache,
+    breaker_for,
+    cache_key,
+    is_cacheable_payload,
+    is_healthy,
+)
+from pgy_metrics import endpoint_of, metrics, timed_async_sleep
+
+logger = logging.getLogger("pgy_aio")
+
+T = TypeVar("T")
+
+REQUEST_TIMEOUT = 20  # 单次请求超时秒数
+PER_HOST_LIMIT = 8  # 每个 host 同时在途的请求数
+JSON_OFFLOAD_BYTES = 64 * 1024  # 超过该大小的响应放到线程池里解析
+# 调用方 headers 里写死的条件请求头：由缓存决定是否带上，这里统一去掉
+_CONDITIONAL_HEADERS = ("if-none-match", "if-modified-since")
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2 = True
+except ImportError:  # 没装 httpx[http2] 时退回 HTTP/1.1 keep-alive
+    HTTP2 = False
+
+
+class ApiError(RuntimeError):
+    """接口返回业务错误（code != 0 或 success=false）。"""
+
+    def __init__(self, message: str, data: Any = None) -> None:
+        super().__init__(message)
+        self.data = data
+
+
+@dataclass
+class RetryPolicy:
+    """重试/退避策略：第 n 次失败后等待 min(backoff * 2**(n-1), max_backoff) 秒。"""
+
+    attempts: int = 3
+    backoff: float = 0.8
+    max_backoff: float = 10.0
+    retry_status: tuple = (429, 500, 502, 503, 504)
+    retry_api_errors: bool = True  # code != 0 / success=false 是否重试
+    idempotent: bool = True  # False 时（如发起邀约）只重试请求确定未被处理的情况
+
+    def should_retry(self, err: Exception) -> bool:
+        if isinstance(err, httpx.HTTPStatusError):
+            status = err.response.status_code
+            return status in self.retry_status and (self.idempotent or status == 429)
+        if not self.idempotent:
+            return isinstance(
+                err, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+            )
+        if isinstance(err, ApiError):
+            return self.retry_api_errors
+        # 连接/超时错误，以及响应非 JSON（多为风控页）
+        return isinstance(err, (httpx.TransportError, ValueError))
+
+    def delay(self, attempt: int, err: Exception) -> float:
+        if isinstance(err, httpx.HTTPStatusError):
+            retry_after = err.response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.max_backoff)
+        return min(self.backoff * 2 ** (attempt - 1), self.max_backoff)
+
+
+def check_api(data: Any) -> Any:
+    """code != 0 或 success=false 时抛 ApiError，否则原样返回。"""
+
+    if isinstance(data, dict):
+        if data.get("code") not in (None, 0) or data.get("success") is False:
+            raise ApiError(
+                f"API返回异常: code={data.get('code')} msg={data.get('msg')}", data
+            )
+    return data
+
+
+class PgyClient:
+    """
+    异步 JSON 客户端。用法：
+
+        async with PgyClient(cookies, headers, limiter=RateLimiter(5)) as client:
+            data = await client.post_json(url, payload)
+
+    同一个 client 上的请求共用连接池，可以放心用 asyncio.gather 同时发出多页。
+    """
+
+    def __init__(
+        self,
+        cookies: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        *,
+        per_host: int = PER_HOST_LIMIT,
+        retry: Optional[RetryPolicy] = None,
+        limiter: Optional[RateLimiter] = None,
+        cache: Optional[ResponseCache] = None,
+        timeout: float = REQUEST_TIMEOUT,
+        http2: Optional[bool] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ) -> None:
+        cookies = dict(cookies or {})
+        headers = {
+            k: v
+            for k, v in (headers or {}).items()
+            if k.lower() not in _CONDITIONAL_HEADERS
+        }
+        self.account = cookies.get(ACCOUNT_COOKIE, "")
+        self.per_host = per_host
+        self.retry = retry or RetryPolicy()
+        self.limiter = limiter
+        self.cache = cache
+        self.breaker = breaker or breaker_for(cookies)
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self._pacing = asyncio.Lock()
+        self._client = httpx.AsyncClient(
+            cookies=cookies,
+            headers=headers,
+            timeout=timeout,
+            http2=HTTP2 if http2 is None else http2,
+            limits=httpx.Limits(max_keepalive_connections=per_host * 2),
+        )
+
+    async def __aenter__(self) -> "PgyClient":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def get_json(
+        self, url: str, params: Optional[Dict[str, Any]] = None, check: bool = True
+    ) -> Any:
+        return await self.request_json("GET", url, params=params, check=check)
+
+    async def post_json(
+        self, url: str, payload: Dict[str, Any], check: bool = True
+    ) -> Any:
+        return await self.request_json("POST", url, payload=payload, check=check)
+
+    async def request_json(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        payload: Optional[Dict[str, Any]] = None,
+        check: bool = True,
+    ) -> Any:
+        """
+        发请求并返回解析后的 JSON。按 RetryPolicy 重试，重试用尽后抛出最后一次的异常。
+        check=True 时 code != 0 / success=false 视为失败（ApiError）；
+        check=False 时原样返回，由调用方判断（例如跳过 success=false 的页）。
+        """
+
+        endpoint = endpoint_of(url)
+        key: Optional[str] = None
+        entry = None
+        if self.cache is not None:
+            full_url = str(httpx.URL(url, params=params))
+            ttl = self.cache.ttl_for(full_url)
+            if ttl is not None:
+                body = json.dumps(payload) if payload is not None else None
+                key = cache_key(method, full_url, body, self.account)
+                entry = self.cache.get(key)
+                if entry is not None and entry.age <= ttl:
+                    self.cache.stats["hit"] += 1
+                    metrics.cache_hit(endpoint)
+                    return await self._decode(entry.body, endpoint)
+
+        headers: Dict[str, str] = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        host = urlsplit(url).netloc
+        slots = self._host_slots.setdefault(host, asyncio.Semaphore(self.per_host))
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                self.breaker.before_request()
+                async with slots:
+                    await self._pace()
+                    started = time.perf_counter()
+                    resp = await self._client.request(
+                        method, url, params=params, json=payload, headers=headers
+                    )
+                metrics.observe(
+                    endpoint,
+                    resp.status_code,
+                    time.perf_counter() - started,
+                    len(resp.content),
+                    len(resp.request.content),
+                )
+                if resp.status_code == 304 and entry is not None:
+                    self._feedback(True)
+                    self.cache.stats["revalidated"] += 1
+                    self.cache.refresh(key)
+                    return await self._decode(entry.body, endpoint)
+                if resp.is_error:
+                    self.breaker.record(resp.status_code, None)  # 只有 401/403 计数
+                resp.raise_for_status()
+                try:
+                    data = await self._decode(resp.content, endpoint)
+                except ValueError:
+                    logger.warning("%s 响应非JSON，可疑的风控/登录失效", url)
+                    self.breaker.record(resp.status_code, None)
+                    raise
+                self._feedback(is_healthy(resp.status_code, data))
+                self.breaker.record(resp.status_code, data)
+                if check:
+                    check_api(data)
+            except (httpx.HTTPError, ValueError, ApiError) as e:
+                if not isinstance(e, ApiError):
+                    self._feedback(False)
+                if attempt >= self.retry.attempts or not self.retry.should_retry(e):
+                    raise
+                self.breaker.spend_retry()
+                metrics.retry(endpoint)
+                delay = self.retry.delay(attempt, e)
+                logger.info("%s 第%s次失败（%s），%.1fs 后重试", url, attempt, e, delay)
+                await timed_async_sleep(delay, "retry_backoff")
+                continue
+
+            if key is not None:
+                self.cache.stats["miss"] += 1
+                if is_cacheable_payload(data):
+                    self.cache.put(
+                        key, urlsplit(url).path, 200, dict(resp.headers), resp.content
+                    )
+            return data
+
+    async def _pace(self) -> None:
+        """
+        临发出前按 limiter 等到自己的时间片。同一时刻只有一个请求在预约并等待，
+        下一个请求在它之后才预约，期间 AdaptiveRateLimiter 的降速立即生效；
+        等待期间账号可能已熔断，等完再检查一次。
+        """
+
+        if self.limiter is not None:
+            async with self._pacing:
+                await timed_async_sleep(self.limiter.reserve(), "rate_limit")
+        self.breaker.check()
+
+    def _feedback(self, ok: bool) -> None:
+        if self.limiter is not None:
+            self.limiter.feedback(ok)
+
+    async def _decode(self, content: bytes, endpoint: str = "") -> Any:
+        started = time.perf_counter()
+        try:
+            if len(content) < JSON_OFFLOAD_BYTES:
+                return json.loads(content)
+            return await asyncio.to_thread(json.loads, content)
+        finally:
+            metrics.decoded(endpoint, time.perf_counter() - started)
+
+
+async def gather_bounded(
+    fetch: Callable[[Any], Awaitable[T]], items: Iterable[Any], workers: int
+) -> List[T]:
+    """
+    用 workers 个协程依次取 items 调 fetch，结果按 items 的顺序返回。
+    任一协程出错时取消其余协程，再把这个异常原样抛出。
+    """
+
+    todo = list(enumerate(items))
+    results: List[Any] = [None] * len(todo)
+    queue = iter(todo)
+
+    async def worker() -> None:
+        for i, item in queue:
+            results[i] = await fetch(item)
+
+    tasks = [asyncio.create_task(worker()) for _ in range(min(workers, len(todo)))]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return results
+
+
+async def gather_pages(
+    fetch: Callable[[int], Awaitable[T]],
+    pages: Iterable[int],
+    workers: int = PER_HOST_LIMIT,
+) -> List[T]:
+    """
+    拉取多页并按页码顺序返回：最多 workers 页同时在途（默认与 per_host 相同），
+    其余页等前面的页完成后再发，不会一开始就全部挂起。
+    """
+    return await gather_bounded(fetch, pages, workers)
@@ -0,0 +1,168 @@
+"""
+翻页结果的流式落盘：每拉到一页就把这一页的原始行追加到压缩的 NDJSON 文件，
+内存里不再攒全量列表，中途崩溃时已经写完的页都还在。
+
+- 扩展名决定压缩格式：.zst 用 zstd（Python 3.14 的 compression.zstd），.gz 用 gzip
+- 每页单独压缩成一个 zstd frame / gzip member 追加到文件末尾，首尾相接仍是合法的压缩流；
+  写完即 flush，崩溃最多丢正在写的那一页
+- 每行是一条原始记录，附加 _page（页码）；页索引（页码、偏移、长度、行数、写入时间）
+  逐行写到旁边的 <文件名>.pages.jsonl，可据此只解压某一页（read_page）
+- DuckDB / Polars 可直接查询压缩文件，不用先解压到磁盘：
+    duckdb.sql("SELECT count(*) FROM read_json('xhs_heat_report_all.ndjson.zst')")
+    pl.scan_ndjson("xhs_heat_report_all.ndjson.zst").filter(...).collect()
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import gzip
+import json
+import os
+from typing import Any, Dict, Iterator, List, Tuple
+
+try:
+    from compression import zstd
+except ImportError:  # Python 3.14 以前没有 compression.zstd，只能写 .gz
+    zstd = None
+
+CAPTURE_SUFFIX = ".ndjson.zst" if zstd is not None else ".ndjson.gz"
+INDEX_SUFFIX = ".pages.jsonl"
+PAGE_FIELD = "_page"  # 每行附加的页码字段
+ZSTD_LEVEL = 3
+GZIP_LEVEL = 6
+
+
+def capture_path(stem: str) -> str:
+    """按当前环境支持的压缩格式补上扩展名，例如 xhs_tasks_all → xhs_tasks_all.ndjson.zst。"""
+
+    return stem + CAPTURE_SUFFIX
+
+
+def _compress(path: str, data: bytes) -> bytes:
+    if path.endswith(".zst"):
+        if zstd is None:
+            raise RuntimeError(f"{path}：写 .zst 需要 Python 3.14+，请改用 .gz")
+        return zstd.compress(data, level=ZSTD_LEVEL)
+    if path.endswith(".gz"):
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    return data  # 不压缩的 .ndjson / .jsonl
+
+
+def _decompress(path: str, data: bytes) -> bytes:
+    if path.endswith(".zst"):
+        if zstd is None:
+            raise RuntimeError(f"{path}：读 .zst 需要 Python 3.14+，可改用 DuckDB 查询")
+        return zstd.decompress(data)
+    if path.endswith(".gz"):
+        return gzip.decompress(data)
+    return data
+
+
+def read_index(path: str) -> List[Dict[str, Any]]:
+    """页索引（按写入顺序）；最后一行没写完时忽略。"""
+
+    out: List[Dict[str, Any]] = []
+    if not os.path.exists(path + INDEX_SUFFIX):
+        return out
+    with open(path + INDEX_SUFFIX, encoding="utf-8") as f:
+        for line in f:
+            try:
+                out.append(json.loads(line))
+            except ValueError:
+                break
+    return out
+
+
+class CaptureSink:
+    """
+    压缩 NDJSON 的按页追加写出。
+
+        with CaptureSink("xhs_tasks_all.ndjson.zst") as sink:
+            sink.write_page(page_num, rows)
+
+    mode="w" 从头写（覆盖旧文件与索引）；mode="a" 接着已有文件写，
+    先把文件截断到索引里最后一个完整页的末尾，丢掉崩溃时写了一半的页。
+    """
+
+    def __init__(self, path: str, mode: str = "w") -> None:
+        if mode not in ("w", "a"):
+            raise ValueError(f"mode 只能是 'w' 或 'a'：{mode!r}")
+        self.path = path
+        self.index = read_index(path) if mode == "a" else []
+        self.pages = len(self.index)
+        self.rows = sum(p["rows"] for p in self.index)
+        end = max((p["offset"] + p["length"] for p in self.index), default=0)
+        self._f = open(path, "r+b" if mode == "a" and os.path.exists(path) else "wb")
+        self._f.truncate(end)
+        self._f.seek(end)
+        self._index = open(path + INDEX_SUFFIX, "w", encoding="utf-8")
+        for entry in self.index:
+            self._index.write(json.dumps(entry) + "\n")
+        self._index.flush()
+
+    def write_page(self, page: int, rows: List[Dict[str, Any]]) -> None:
+        """把一页原始行（附加 _page）压缩成一个 frame 追加写入，并记入页索引。"""
+
+        body = "".join(
+            json.dumps({**row, PAGE_FIELD: page}, ensure_ascii=False) + "\n"
+            for row in rows
+        )
+        data = _compress(self.path, body.encode("utf-8")) if rows else b""
+        entry = {
+            "page": page,
+            "offset": self._f.tell(),
+            "length": len(data),
+            "rows": len(rows),
+            "writtenAt": dt.datetime.now().isoformat(timespec="seconds"),
+        }
+        self._f.write(data)
+        self._f.flush()
+        self._index.write(json.dumps(entry) + "\n")
+        self._index.flush()
+        self.index.append(entry)
+        self.pages += 1
+        self.rows += len(rows)
+
+    def close(self) -> None:
+        self._f.close()
+        self._index.close()
+
+    def __enter__(self) -> "CaptureSink":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def read_page(path: str, page: int) -> List[Dict[str, Any]]:
+    """按页索引只解压某一页；同一页写过多次时取最后一次。"""
+
+    entries = [p for p in read_index(path) if p["page"] == page]
+    if not entries:
+        raise KeyError(f"{path} 中没有第 {page} 页")
+    entry = entries[-1]
+    with open(path, "rb") as f:
+        f.seek(entry["offset"])
+        data = f.read(entry["length"])
+    text = _decompress(path, data).decode("utf-8") if data else ""
+    return [json.loads(line) for line in text.splitlines()]
+
+
+def iter_pages(path: str) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+    """按写入顺序逐页解压，产出 (页码, 该页原始记录)（记录含 _page），内存里每次只有一页。"""
+
+    with open(path, "rb") as f:
+        for entry in read_index(path):
+            rows: List[Dict[str, Any]] = []
+            if entry["length"]:
+                f.seek(entry["offset"])
+                text = _decompress(path, f.read(entry["length"])).decode("utf-8")
+                rows = [json.loads(line) for line in text.splitlines()]
+            yield entry["page"], rows
+
+
+def iter_rows(path: str) -> Iterator[Dict[str, Any]]:
+    """按写入顺序逐行产出原始记录（含 _page），内存里每次只有一页。"""
+
+    for _, rows in iter_pages(path):
+        yield from rows
@@ -0,0 +1,124 @@
+"""
+接口原始记录 → 类型固定的 Polars 列。
+
+正常的记录直接按 schema 建列（pl.DataFrame(rows, schema=..., strict=False)）；
+遇到整数列里的 "2025-12-01" 这类值会整批抛 ComputeError，这时才退回字符串路径：
+先按字符串宽松解码，再逐列 cast(strict=False)，类型不符的值只把那一格置空，不影响其余行。
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Mapping, Optional
+
+import polars as pl
+
+_BOOL_TEXT = {"true": True, "false": False}
+
+
+def _text(v: Any) -> Optional[str]:
+    """标量列的宽松文本：列表 / 对象转成 JSON，其余同 Polars 的字符串化。"""
+
+    if v is None or isinstance(v, str):
+        return v
+    if isinstance(v, bool):
+        return "true" if v else "false"
+    if isinstance(v, (int, float)):
+        return str(int(v)) if isinstance(v, float) and v.is_integer() else str(v)
+    return json.dumps(v, ensure_ascii=False)
+
+
+def _as_list(v: Any) -> Any:
+    """列表列里的单个值（如字符串标签）包成单元素列表，而不是丢掉。"""
+
+    return v if v is None or isinstance(v, list) else [v]
+
+
+def cast_column(col: str, dtype: pl.DataType) -> pl.Expr:
+    """字符串列 → dtype，转不过去的值置空（Int64 也接受 "1500.0" 这种整数值的小数写法）。"""
+
+    s = pl.col(col)
+    if dtype == pl.String:
+        return s
+    if dtype == pl.Boolean:
+        return s.str.to_lowercase().replace_strict(
+            _BOOL_TEXT, default=None, return_dtype=pl.Boolean
+        )
+    if dtype == pl.Int64:
+        f = s.cast(pl.Float64, strict=False)
+        whole = pl.when(f == f.round()).then(f).cast(pl.Int64, strict=False)
+        return pl.coalesce(s.cast(pl.Int64, strict=False), whole)
+    return s.cast(dtype, strict=False)
+
+
+def _loose(rows: List[Dict[str, Any]], schema: Mapping[str, pl.DataType]) -> bool:
+    """
+    是否有直接建列时 Polars 不报错、但结果与字符串路径不同的值：列表列里的单个值会被丢掉，
+    整数列里的 1500.5 会被截断，数值列里的布尔值会被当成 0/1，布尔列里的 1 会被当成 True。
+    """
+
+    lists = [k for k, v in schema.items() if isinstance(v, pl.List)]
+    numbers = [k for k, v in schema.items() if v in (pl.Int64, pl.Float64)]
+    ints = [k for k, v in schema.items() if v == pl.Int64]
+    bools = [k for k, v in schema.items() if v == pl.Boolean]
+    for r in rows:
+        for k in lists:
+            v = r.get(k)
+            if v is not None and not isinstance(v, list):
+                return True
+        for k in numbers:
+            if isinstance(r.get(k), bool):
+                return True
+        for k in ints:
+            v = r.get(k)
+            if isinstance(v, float) and not v.is_integer():
+                return True
+        for k in bools:
+            v = r.get(k)
+            if v is not None and not isinstance(v, bool):
+                return True
+    return False
+
+
+def _decode_text(
+    rows: List[Dict[str, Any]], schema: Mapping[str, pl.DataType]
+) -> pl.DataFrame:
+    """字符串路径：标量列先按字符串解码再 cast_column，混进列表 / 对象时逐列转文本。"""
+
+    scalars = {k: v for k, v in schema.items() if not isinstance(v, pl.List)}
+    try:
+        frame = pl.DataFrame(
+            rows, schema=dict.fromkeys(scalars, pl.String), strict=False
+        )
+    except pl.exceptions.ComputeError:
+        frame = pl.DataFrame(
+            {k: [_text(r.get(k)) for r in rows] for k in scalars},
+            schema=dict.fromkeys(scalars, pl.String),
+        )
+    lists = [
+        pl.Series(k, [_as_list(r.get(k)) for r in rows], dtype=v, strict=False)
+        for k, v in schema.items()
+        if isinstance(v, pl.List)
+    ]
+    return frame.with_columns(lists).select(
+        cast_column(k, v).alias(k) if k in scalars else pl.col(k)
+        for k, v in schema.items()
+    )
+
+
+def decode_rows(
+    rows: List[Dict[str, Any]], schema: Mapping[str, pl.DataType]
+) -> pl.DataFrame:
+    """
+    按 schema 解码一批原始记录（只取 schema 里的字段，列顺序同 schema）。
+
+    先直接按 schema 建列；建列报错，或有 Polars 会静默改值的记录（见 _loose）时，
+    整批改走字符串路径，标量列逐列 cast_column，列表列把非列表值包成单元素列表。
+    """
+
+    if not _loose(rows, schema):
+        try:
+            return pl.DataFrame(rows, schema=dict(schema), strict=False)
+        except pl.exceptions.ComputeError:
+            pass
+    return _decode_text(rows, schema)
@@ -0,0 +1,928 @@
+"""
+蒲公英(pgy)各抓取脚本共用的 HTTP 工具。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Mapping,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.util.retry import Retry
+
+from pgy_metrics import endpoint_of, metrics, timed_sleep
+
+logger = logging.getLogger("pgy_http")
+
+T = TypeVar("T")
+
+
+class RateLimiter:
+    """
+    全局限速器：保证所有线程合计每秒不超过 rps 次请求。
+    rps 为 None 或 <=0 时不限速。
+    """
+
+    def __init__(self, rps: Optional[float]) -> None:
+        self.interval = 1.0 / rps if rps and rps > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+
+    def reserve(self) -> float:
+        """预约下一次请求的时间片，返回还需等待的秒数（asyncio 中自行 await）。"""
+        if self.interval <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_at - now
+            self._next_at = max(now, self._next_at) + self.interval
+        return max(wait, 0.0)
+
+    def acquire(self) -> None:
+        """阻塞直到允许发出下一次请求。"""
+        timed_sleep(self.reserve(), "rate_limit")
+
+    def feedback(self, ok: bool) -> None:
+        """反馈一次请求的结果；固定速率的限速器忽略，AdaptiveRateLimiter 据此调速。"""
+
+
+RATE_STATE_PATH = "pgy_rates.json"  # AdaptiveRateLimiter 按接口记住的速率
+
+
+def is_healthy(status: int, data: Any) -> bool:
+    """
+    一次响应是否健康：429 / 5xx、非 JSON（data 为 None）、
+    success=false 或 code != 0 都视为服务端在限流或风控。
+    """
+
+    if status == 429 or status >= 500:
+        return False
+    return data is not None and is_cacheable_payload(data)
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    """
+    AIMD 自适应限速器：
+    - 响应健康时加性增长：每秒健康流量约提高 step 次/秒
+    - 出现 429 / 5xx / 非 JSON / success=false 时乘性下降（乘 backoff），
+      cooldown 秒内的多次失败只降一次（并发时一批请求会同时失败）
+    - 学到的速率按接口写入 RATE_STATE_PATH，下次运行从该速率起步
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        rps: Optional[float] = 2.0,
+        min_rps: float = 0.2,
+        max_rps: float = 10.0,
+        step: float = 0.25,
+        backoff: float = 0.5,
+        cooldown: float = 2.0,
+        path: str = RATE_STATE_PATH,
+    ) -> None:
+        self.endpoint = endpoint
+        self.path = path
+        self.min_rps = min_rps
+        self.max_rps = max_rps
+        self.step = step
+        self.backoff = backoff
+        self.cooldown = cooldown
+        learned = _load_rates(path).get(endpoint, {}).get("rps")
+        start = learned or rps or max_rps
+        super().__init__(min(max(start, min_rps), max_rps))
+        self._last_cut = 0.0
+        self._saved_at = time.monotonic()
+        if learned:
+            logger.info("%s 沿用上次学到的速率 %.2f 次/秒", endpoint, self.rps)
+
+    @property
+    def rps(self) -> float:
+        return 1.0 / self.interval
+
+    def feedback(self, ok: bool) -> None:
+        now = time.monotonic()
+        with self._lock:
+            rps = self.rps
+            if ok:
+                rps = min(self.max_rps, rps + self.step * self.interval)
+            elif now - self._last_cut >= self.cooldown:
+                rps = max(self.min_rps, rps * self.backoff)
+                self._last_cut = now
+                # 已经排好的时间片按新间隔往后推，立刻生效
+                self._next_at = max(self._next_at, now) + 1.0 / rps
+                logger.warning("%s 触发限流信号，降速到 %.2f 次/秒", self.endpoint, rps)
+            self.interval = 1.0 / rps
+        if not ok or now - self._saved_at > 10:
+            self.save()
+
+    def save(self) -> None:
+        """把当前速率写回状态文件（与其他接口/进程的记录合并）。"""
+
+        self._saved_at = time.monotonic()
+        with _RATES_LOCK:
+            rates = _load_rates(self.path)
+            rates[self.endpoint] = {
+                "rps": round(self.rps, 3),
+                "updated_at": time.time(),
+            }
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(rates, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.path)
+
+
+_RATES_LOCK = threading.Lock()
+
+
+def _load_rates(path: str) -> Dict[str, Dict[str, float]]:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning("速率状态文件读取失败，忽略：%s", e)
+        return {}
+
+
+# ========== 账号级跨进程预算 ==========
+ACCOUNT_BUDGET_RPS: Optional[float] = 5.0  # 同一账号所有脚本合计每秒请求上限，None 不限
+ACCOUNT_BUDGET_BURST = 5.0  # 空闲后允许的突发请求数
+BUDGET_DIR = os.path.join(tempfile.gettempdir(), "pgy_budget")  # 本机各进程共用
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def _file_lock(f: IO[bytes]) -> Iterator[None]:
+    """对已打开的文件加进程间排他锁。"""
+
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class SharedTokenBucket(RateLimiter):
+    """
+    跨进程令牌桶：同一台机器上所有使用同一 key（账号）的进程共用一个预算。
+    状态（剩余令牌数, 更新时间）存放在 BUDGET_DIR 下的小文件里，每次预约时加文件锁读写。
+    令牌允许透支为负数，表示已经排队的请求，调用方按返回的等待时间 sleep。
+    """
+
+    def __init__(
+        self,
+        key: str,
+        rps: float = 5.0,
+        burst: float = ACCOUNT_BUDGET_BURST,
+        directory: str = BUDGET_DIR,
+    ) -> None:
+        super().__init__(rps)
+        self.key = key
+        self.rate = rps
+        self.burst = burst
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{key}.bucket")
+        self._f = open(self.path, "a+b")
+
+    def reserve(self) -> float:
+        with self._lock, _file_lock(self._f):
+            self._f.seek(0)
+            raw = self._f.read().split()
+            now = time.time()
+            if len(raw) == 2:
+                tokens, at = float(raw[0]), float(raw[1])
+                tokens = min(self.burst, tokens + max(now - at, 0.0) * self.rate)
+            else:
+                tokens = self.burst
+            tokens -= 1
+            self._f.seek(0)
+            self._f.truncate()
+            self._f.write(f"{tokens:.6f} {now:.6f}".encode())
+            self._f.flush()
+        return max(0.0, -tokens / self.rate)
+
+
+class CombinedLimiter(RateLimiter):
+    """同时受多个限速器约束：等待时间取最大值，结果反馈给每一个。"""
+
+    def __init__(self, *limiters: RateLimiter) -> None:
+        super().__init__(None)
+        self.limiters = limiters
+
+    def reserve(self) -> float:
+        return max((lim.reserve() for lim in self.limiters), default=0.0)
+
+    def feedback(self, ok: bool) -> None:
+        for lim in self.limiters:
+            lim.feedback(ok)
+
+
+_budgets: Dict[str, SharedTokenBucket] = {}
+SESSION_COOKIE = "solar.beaker.session.id"  # 没有账号 cookie 时用登录会话区分账号
+
+
+def account_id(cookies: Mapping[str, str]) -> str:
+    """蒲公英账号标识：优先 x-user-id-pgy，没有时取登录会话 cookie 的指纹。"""
+
+    account = cookies.get(ACCOUNT_COOKIE)
+    if account:
+        return account
+    session = cookies.get(SESSION_COOKIE)
+    if session:
+        return "s-" + hashlib.sha1(session.encode("utf-8")).hexdigest()[:16]
+    return ""
+
+
+def account_budget(cookies: Mapping[str, str]) -> Optional[SharedTokenBucket]:
+    """按 cookies 对应的蒲公英账号取共用预算；未配置预算或认不出账号时为 None。"""
+
+    account = account_id(cookies)
+    if not ACCOUNT_BUDGET_RPS or not account:
+        return None
+    if account not in _budgets:
+        _budgets[account] = SharedTokenBucket(account, ACCOUNT_BUDGET_RPS)
+    return _budgets[account]
+
+
+def with_account_budget(
+    limiter: Optional[RateLimiter], cookies: Mapping[str, str]
+) -> Optional[RateLimiter]:
+    """给限速器叠加账号级的跨进程预算；没有预算时原样返回 limiter。"""
+
+    budget = account_budget(cookies)
+    if budget is None:
+        return limiter
+    if limiter is None:
+        return budget
+    return CombinedLimiter(limiter, budget)
+
+
+# ========== 分页大小协商 ==========
+PAGE_SIZE_CACHE = "pgy_page_sizes.json"  # 各接口协商出的 pageSize 缓存
+PAGE_SIZE_CANDIDATES = (100, 50, 40, 30, 20, 10)  # 从大到小依次试探
+PAGE_SIZE_TTL = 7 * 24 * 3600  # 缓存有效期，过期后重新试探（服务端上限可能调整）
+
+# 探测函数：给定 pageSize 拉第1页，返回 (本页条数, 总条数或None, 总页数或None)；
+# 服务端拒绝该 pageSize 时抛异常
+ProbeFetch = Callable[[int], Tuple[int, Optional[int], Optional[int]]]
+
+
+class PageSizeRejected(RuntimeError):
+    """服务端拒绝或截断了当前 pageSize，调用方应以更小的 pageSize 从头重拉。"""
+
+
+def is_truncated(
+    page_size: int, n_items: int, total: Optional[int], total_pages: Optional[int]
+) -> bool:
+    """判断一页是否被服务端按更小的上限截断（只适用于非最后一页或第1页）。"""
+
+    if total is not None:
+        return n_items < min(page_size, total)
+    if total_pages is not None:
+        return total_pages > 1 and n_items < page_size
+    return False
+
+
+class PageSizeNegotiator:
+    """
+    按接口协商可用的最大 pageSize：
+    - probe：没有缓存（或缓存过期）时从大到小试探，取第一个请求成功且未被截断的值
+    - reject：运行中发现被拒绝/截断时降一档并写回缓存
+    结果按接口名缓存在 JSON 文件中，多次运行之间复用。
+    """
+
+    def __init__(
+        self,
+        path: str = PAGE_SIZE_CACHE,
+        candidates: Iterable[int] = PAGE_SIZE_CANDIDATES,
+        ttl: float = PAGE_SIZE_TTL,
+    ) -> None:
+        self.path = path
+        self.candidates = sorted(set(candidates), reverse=True)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self._cache = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning("pageSize 缓存读取失败，忽略：%s", e)
+
+    def _save(self) -> None:
+        # 多个窗口/线程各自的实例可能同时写，临时文件不能撞名
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._cache, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+
+    def _set(self, endpoint: str, size: int) -> None:
+        with self._lock:
+            self._cache[endpoint] = {"page_size": size, "probed_at": time.time()}
+            self._save()
+
+    def get(self, endpoint: str) -> Optional[int]:
+        """返回未过期的缓存值，没有则为 None。"""
+        rec = self._cache.get(endpoint)
+        if not rec or time.time() - rec.get("probed_at", 0) > self.ttl:
+            return None
+        return int(rec["page_size"])
+
+    def probe(
+        self, endpoint: str, fetch: ProbeFetch, default: Optional[int] = None
+    ) -> int:
+        """
+        取缓存值；没有则从大到小试探并缓存。
+        全部失败时退回 default（调用方原来写死的 pageSize），未给出时退回最小候选值；
+        退回的值不写缓存。
+        """
+
+        cached = self.get(endpoint)
+        if cached is not None:
+            return cached
+
+        for size in self.candidates:
+            try:
+                n_items, total, total_pages = fetch(size)
+            except CircuitOpen:
+                raise
+            except Exception as e:  # noqa: BLE001
+                logger.info("%s pageSize=%s 被拒绝：%s", endpoint, size, e)
+                continue
+            if is_truncated(size, n_items, total, total_pages):
+                logger.info("%s pageSize=%s 被截断为 %s 条", endpoint, size, n_items)
+                continue
+            logger.info("%s 协商 pageSize=%s", endpoint, size)
+            self._set(endpoint, size)
+            return size
+
+        size = default or self.candidates[-1]
+        logger.warning("%s 所有候选 pageSize 均失败，使用 %s", endpoint, size)
+        return size
+
+    def reject(self, endpoint: str, size: int) -> int:
+        """当前 size 被拒绝/截断：降到下一档候选值并缓存，返回新值。"""
+
+        smaller = [c for c in self.candidates if c < size] or [self.candidates[-1]]
+        new_size = smaller[0]
+        logger.warning("%s pageSize=%s 不再可用，降为 %s", endpoint, size, new_size)
+        self._set(endpoint, new_size)
+        return new_size
+
+
+def run_with_page_size(
+    negotiator: PageSizeNegotiator,
+    endpoint: str,
+    fetch: ProbeFetch,
+    run: Callable[[int], T],
+    default: Optional[int] = None,
+) -> T:
+    """
+    用协商出的 pageSize 执行 run(page_size)；run 抛 PageSizeRejected 时降档并从头重跑。
+    run 必须可以安全地从第1页重来。default 为试探全部失败时使用的 pageSize（见 probe）。
+    """
+
+    size = negotiator.probe(endpoint, fetch, default)
+    while True:
+        try:
+            return run(size)
+        except PageSizeRejected as e:
+            if size <= negotiator.candidates[-1]:
+                raise
+            logger.warning("pageSize=%s 运行中被拒绝（%s），降档后重拉。", size, e)
+            size = negotiator.reject(endpoint, size)
+
+
+# ========== 熔断与重试预算 ==========
+# 连续几次登录失效/风控信号后熔断；比 pageSize 试探时可能连续被拒的次数多
+BREAKER_THRESHOLD = len(PAGE_SIZE_CANDIDATES)
+RETRY_BUDGET_RATIO = 0.2  # 重试次数上限：占已发请求数的比例
+RETRY_BUDGET_MIN = 10  # 请求还很少时也允许的重试次数
+AUTH_STATUS = (401, 403)
+
+
+class CircuitOpen(Exception):
+    """熔断：继续请求已没有意义，调用方不要重试，直接向上抛出。"""
+
+
+class SessionExpired(CircuitOpen):
+    """连续收到登录失效/风控信号，cookies 多半已过期，需要重新登录后更新。"""
+
+
+class RetryBudgetExceeded(CircuitOpen):
+    """重试次数超出预算，说明失败不是偶发的，继续重试只会拖长失败时间。"""
+
+
+def auth_signal(status: int, data: Any) -> Optional[str]:
+    """
+    登录失效/风控信号：401/403、非 JSON（data 为 None）、success=false 或 code != 0，
+    返回信号描述；正常响应返回 None。429 / 5xx 等是限流或服务端问题，不在此列。
+    """
+
+    if status in AUTH_STATUS:
+        return f"HTTP {status}"
+    if data is None:
+        return "响应非JSON"
+    if not is_cacheable_payload(data):
+        return f"code={data.get('code')} msg={data.get('msg')}"
+    return None
+
+
+class CircuitBreaker:
+    """
+    按账号共用的熔断器与重试预算（线程安全，同一进程内各脚本/线程共用）：
+    - before_request()：已熔断时直接抛 SessionExpired，不再发请求
+    - check()：同上但不计请求数，限速等待之后、临发出前再确认一次
+    - record(status, data)：连续 threshold 次登录失效/风控信号即熔断并抛 SessionExpired
+    - spend_retry()：重试总数超过 max(min_retries, ratio * 请求数) 时抛
+      RetryBudgetExceeded
+    """
+
+    def __init__(
+        self,
+        name: str = "",
+        threshold: int = BREAKER_THRESHOLD,
+        ratio: float = RETRY_BUDGET_RATIO,
+        min_retries: int = RETRY_BUDGET_MIN,
+    ) -> None:
+        self.name = name or "(未识别账号)"
+        self.threshold = threshold
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.requests = 0
+        self.retries = 0
+        self.consecutive = 0  # 连续的登录失效/风控信号数，正常响应清零
+        self.last_signal: Optional[str] = None
+        self.opened = False
+        self._lock = threading.Lock()
+
+    def _expired(self) -> SessionExpired:
+        return SessionExpired(
+            f"账号 {self.name} 登录态已失效或被风控：连续 {self.consecutive} 次"
+            f"（最近一次：{self.last_signal}），请重新登录后更新 cookies"
+        )
+
+    def before_request(self) -> None:
+        with self._lock:
+            if self.opened:
+                raise self._expired()
+            self.requests += 1
+
+    def check(self) -> None:
+        with self._lock:
+            if self.opened:
+                raise self._expired()
+
+    def record(self, status: int, data: Any) -> None:
+        if status >= 400 and status not in AUTH_STATUS:
+            return  # 限流/服务端错误，既不算登录信号也不清零
+        signal = auth_signal(status, data)
+        with self._lock:
+            if signal is None:
+                self.consecutive = 0
+                return
+            self.consecutive += 1
+            self.last_signal = signal
+            if self.consecutive < self.threshold:
+                return
+            if not self.opened:
+                self.opened = True
+                logger.error("%s", self._expired())
+            raise self._expired()
+
+    def spend_retry(self) -> None:
+        with self._lock:
+            if self.opened:
+                raise self._expired()
+            allowed = max(self.min_retries, self.ratio * self.requests)
+            if self.retries + 1 > allowed:
+                raise RetryBudgetExceeded(
+                    f"账号 {self.name} 已重试 {self.retries} 次，超出预算"
+                    f"（{self.requests} 次请求的 {self.ratio:.0%}）"
+                )
+            self.retries += 1
+
+    def summary(self) -> str:
+        state = "已熔断" if self.opened else "正常"
+        return (
+            f"熔断器[{self.name}]：{state}，请求 {self.requests} 次，"
+            f"重试 {self.retries} 次，连续异常 {self.consecutive} 次"
+        )
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def breaker_for(cookies: Mapping[str, str]) -> CircuitBreaker:
+    """按 cookies 对应的蒲公英账号取共用熔断器；认不出账号的请求共用一个。"""
+
+    account = account_id(cookies)
+    with _BREAKERS_LOCK:
+        if account not in _breakers:
+            _breakers[account] = CircuitBreaker(account)
+        return _breakers[account]
+
+
+class BudgetedRetry(Retry):
+    """
+    urllib3 的 Retry：每次重试先向熔断器申请重试预算，已熔断或超预算时立即抛出。
+    重试次数与退避等待时间计入 pgy_metrics。
+    """
+
+    def __init__(
+        self, *args: Any, breaker: Optional[CircuitBreaker] = None, **kwargs: Any
+    ):
+        super().__init__(*args, **kwargs)
+        self.breaker = breaker
+
+    def new(self, **kw: Any) -> "BudgetedRetry":
+        retry = super().new(**kw)
+        retry.breaker = self.breaker
+        return retry
+
+    def increment(
+        self, method: Optional[str] = None, url: Optional[str] = None, **kwargs: Any
+    ) -> "BudgetedRetry":
+        # 次数用尽时照常抛 MaxRetryError
+        retry = super().increment(method, url, **kwargs)
+        if self.breaker is not None:
+            self.breaker.spend_retry()
+        metrics.retry(endpoint_of(url or ""))
+        return retry
+
+    def sleep(self, response: Any = None) -> None:
+        started = time.monotonic()
+        super().sleep(response)
+        metrics.slept("retry_backoff", time.monotonic() - started)
+
+
+# ========== 响应缓存 ==========
+HTTP_CACHE_PATH = "pgy_http_cache.sqlite"  # 磁盘响应缓存（SQLite，多进程可共用）
+HTTP_CACHE_MAX_BYTES = 256 * 1024 * 1024  # 缓存总大小上限，超出后按最近最少使用淘汰
+# 按接口路径前缀配置有效期（秒）；不在表中的接口（如发起邀约）一律不缓存
+CACHE_TTLS: Dict[str, float] = {
+    "/api/solar/cooperator/user/blogger/": 3 * 24 * 3600,  # 博主详情
+    "/api/solar/cooperator/blogger/v2": 6 * 3600,  # 博主搜索
+    "/api/solar/heat/data/report": 3600,  # 内容热度报表
+    "/api/solar/order/task/query": 600,  # 订单任务
+}
+CACHE_IGNORED_FIELDS = ("trackId",)  # 每次请求都会变、不影响结果的字段，不参与缓存键
+ACCOUNT_COOKIE = "x-user-id-pgy.xiaohongshu.com"  # 标识蒲公英账号的 cookie
+
+
+def account_from_cookie_header(header: Optional[str]) -> str:
+    """从 Cookie 请求头中取出蒲公英账号 id，没有则为空串。"""
+
+    for part in (header or "").split(";"):
+        name, _, value = part.strip().partition("=")
+        if name == ACCOUNT_COOKIE:
+            return value
+    return ""
+
+
+def _normalize_body(body: Any) -> str:
+    if not body:
+        return ""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    try:
+        obj = json.loads(body)
+    except ValueError:
+        return hashlib.sha1(body).hexdigest()
+    if isinstance(obj, dict):
+        obj = {k: v for k, v in obj.items() if k not in CACHE_IGNORED_FIELDS}
+    return json.dumps(obj, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+
+def cache_key(method: str, url: str, body: Any = None, account: str = "") -> str:
+    """缓存键：账号 + 方法 + 接口 + 排序后的 query + 规范化的 JSON 请求体。"""
+
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    raw = "\n".join(
+        (
+            account,
+            method.upper(),
+            parts.netloc,
+            parts.path,
+            query,
+            _normalize_body(body),
+        )
+    )
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheEntry:
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+
+class ResponseCache:
+    """
+    按 (账号, 接口, 规范化参数) 缓存响应体，存放在 SQLite 中（响应体 zlib 压缩）。
+    - 未过期：直接返回本地副本，不发请求
+    - 已过期：带 If-None-Match / If-Modified-Since 重验证，304 时沿用本地副本
+    - 总大小超过 max_bytes 时按最近访问时间淘汰
+    """
+
+    def __init__(
+        self,
+        path: str = HTTP_CACHE_PATH,
+        max_bytes: int = HTTP_CACHE_MAX_BYTES,
+        ttls: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = dict(CACHE_TTLS if ttls is None else ttls)
+        self.stats: Counter = Counter()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT,
+                status INTEGER,
+                headers TEXT,
+                body BLOB,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL,
+                accessed_at REAL,
+                size INTEGER
+            )
+            """
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)"
+        )
+        self._db.commit()
+
+    def ttl_for(self, url: str) -> Optional[float]:
+        """该 URL 的缓存有效期；返回 None 表示不缓存。"""
+        path = urlsplit(url).path
+        for prefix, ttl in self.ttls.items():
+            if path.startswith(prefix):
+                return ttl
+        return None
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, headers, body, etag, last_modified, stored_at "
+                "FROM entries WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+            self._db.commit()
+        status, headers, body, etag, last_modified, stored_at = row
+        return CacheEntry(
+            status,
+            json.loads(headers),
+            zlib.decompress(body),
+            etag,
+            last_modified,
+            stored_at,
+        )
+
+    def put(
+        self,
+        key: str,
+        endpoint: str,
+        status: int,
+        headers: Dict[str, str],
+        body: bytes,
+    ) -> None:
+        blob = zlib.compress(body, 1)
+        etag = headers.get("ETag") or headers.get("etag")
+        last_modified = headers.get("Last-Modified") or headers.get("last-modified")
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    endpoint,
+                    status,
+                    json.dumps(dict(headers), ensure_ascii=False),
+                    blob,
+                    etag,
+                    last_modified,
+                    now,
+                    now,
+                    len(blob),
+                ),
+            )
+            self._evict()
+            self._db.commit()
+        self.stats["stored"] += 1
+
+    def refresh(self, key: str) -> None:
+        """重验证得到 304：本地副本重新计时。"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE entries SET stored_at = ? WHERE key = ?", (time.time(), key)
+            )
+            self._db.commit()
+
+    def _evict(self) -> None:
+        total = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # 淘汰到上限的 90%，避免每次写入都触发淘汰
+        target = total - int(self.max_bytes * 0.9)
+        victims = []
+        for key, size in self._db.execute(
+            "SELECT key, size FROM entries ORDER BY accessed_at"
+        ):
+            victims.append((key,))
+            target -= size
+            if target <= 0:
+                break
+        self._db.executemany("DELETE FROM entries WHERE key = ?", victims)
+        self.stats["evicted"] += len(victims)
+
+    def summary(self) -> str:
+        """本次运行的缓存统计，用于运行结束时打印。"""
+
+        s = self.stats
+        hits = s["hit"] + s["revalidated"]
+        lookups = hits + s["miss"]
+        rate = hits / lookups * 100 if lookups else 0.0
+        return (
+            f"HTTP 缓存：命中 {hits}（其中 304 重验证 {s['revalidated']}），"
+            f"未命中 {s['miss']}，命中率 {rate:.0f}%，写入 {s['stored']}，"
+            f"淘汰 {s['evicted']}"
+        )
+
+
+def is_cacheable_payload(data: Any) -> bool:
+    """业务上成功的响应才缓存；success=false / code!=0（风控、登录失效等）不缓存。"""
+
+    if isinstance(data, dict):
+        if data.get("success") is False:
+            return False
+        if data.get("code") not in (None, 0):
+            return False
+    return True
+
+
+def _is_cacheable(resp: requests.Response) -> bool:
+    if resp.status_code != 200:
+        return False
+    try:
+        return is_cacheable_payload(resp.json())
+    except ValueError:
+        return False
+
+
+def _response_from_cache(
+    request: requests.PreparedRequest, entry: CacheEntry
+) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = entry.status
+    resp.reason = "OK"
+    resp.headers = CaseInsensitiveDict(entry.headers)
+    resp._content = entry.body
+    resp.encoding = get_encoding_from_headers(resp.headers)
+    resp.url = request.url or ""
+    resp.request = request
+    resp.from_cache = True  # type: ignore[attr-defined]
+    return resp
+
+
+class CachingAdapter(HTTPAdapter):
+    """
+    在 HTTPAdapter 上加一层 ResponseCache，max_retries、连接池等参数照传给 HTTPAdapter。
+    只缓存 ResponseCache.ttls 中列出的接口，其余请求原样发出。
+    """
+
+    def __init__(self, cache: ResponseCache, *args: Any, **kwargs: Any) -> None:
+        self.cache = cache
+        super().__init__(*args, **kwargs)
+
+    def send(  # type: ignore[override]
+        self, request: requests.PreparedRequest, **kwargs: Any
+    ) -> requests.Response:
+        ttl = self.cache.ttl_for(request.url or "")
+        if ttl is None or kwargs.get("stream"):
+            return super().send(request, **kwargs)
+
+        account = account_from_cookie_header(request.headers.get("Cookie"))
+        key = cache_key(
+            request.method or "GET", request.url or "", request.body, account
+        )
+        entry = self.cache.get(key)
+        if entry is not None and entry.age <= ttl:
+            self.cache.stats["hit"] += 1
+            return _response_from_cache(request, entry)
+
+        # 调用方写死的条件请求头没有对应的本地副本，拿到 304 也没法用，换成缓存里的值
+        request.headers.pop("If-None-Match", None)
+        request.headers.pop("If-Modified-Since", None)
+        if entry is not None:
+            if entry.etag:
+                request.headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                request.headers["If-Modified-Since"] = entry.last_modified
+
+        resp = super().send(request, **kwargs)
+        if resp.status_code == 304 and entry is not None:
+            self.cache.stats["revalidated"] += 1
+            self.cache.refresh(key)
+            resp.close()
+            return _response_from_cache(request, entry)
+
+        self.cache.stats["miss"] += 1
+        if _is_cacheable(resp):
+            self.cache.put(
+                key,
+                urlsplit(request.url or "").path,
+                200,
+                dict(resp.headers),
+                resp.content,
+            )
+        return resp
+
+
+_default_cache: Optional[ResponseCache] = None
+
+
+def default_cache() -> ResponseCache:
+    """进程内共用的 ResponseCache（第一次调用时打开 HTTP_CACHE_PATH）。"""
+
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResponseCache()
+    return _default_cache
+
+
+def mount_cache(
+    session: requests.Session,
+    cache: Optional[ResponseCache] = None,
+    **adapter_kwargs: Any,
+) -> CachingAdapter:
+    """给 Session 挂上带缓存的 adapter；adapter_kwargs 透传给 HTTPAdapter。"""
+
+    adapter = CachingAdapter(cache or default_cache(), **adapter_kwargs)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return adapter
@@ -0,0 +1,340 @@
+"""
+蒲公英(pgy)抓取脚本的请求级埋点。
+
+记录每个接口的请求耗时直方图、状态码、重试次数、收发字节数、JSON 解析耗时，
+以及限速/退避等各类 sleep 的总时长，进程退出时写出：
+- <METRICS_DIR>/<脚本名>.prom：Prometheus textfile 格式，node_exporter 可直接采集
+- <METRICS_DIR>/<脚本名>.json：便于人看的汇总（各接口分位数、时间花在了哪里）
+
+sleep 与请求耗时都是各线程/协程之和，并发时可能大于墙钟时间。
+每次记录只是加锁后累加几个计数，开销远小于一次 HTTP 请求，可以常开。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger("pgy_metrics")
+
+METRICS_ENABLED = True  # False 时不埋点、不写文件
+METRICS_DIR = "pgy_metrics"  # 导出目录，每个脚本一个 .prom 和一个 .json
+# 请求耗时直方图的桶上界（秒）
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_ID_SEGMENT = re.compile(r"^(?:[0-9a-f]{24}|\d+)$")  # userId / 订单号等路径参数
+
+
+def endpoint_of(url: str) -> str:
+    """URL → 接口名：只取路径，路径里的 ID 段换成 :id，避免标签基数爆炸。"""
+
+    path = urlsplit(url).path or "/"
+    return "/".join(":id" if _ID_SEGMENT.match(seg) else seg for seg in path.split("/"))
+
+
+class _Endpoint:
+    """单个接口的累计值。"""
+
+    __slots__ = (
+        "buckets",
+        "latency_sum",
+        "statuses",
+        "retries",
+        "cache_hits",
+        "bytes_in",
+        "bytes_out",
+        "decode_seconds",
+        "decodes",
+    )
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # 最后一个为 +Inf
+        self.latency_sum = 0.0
+        self.statuses: Dict[str, int] = defaultdict(int)
+        self.retries = 0
+        self.cache_hits = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.decode_seconds = 0.0
+        self.decodes = 0
+
+    @property
+    def requests(self) -> int:
+        return sum(self.buckets)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """按直方图估算分位数（取所在桶的上界），落在 +Inf 桶时为 None。"""
+
+        total = self.requests
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for bound, n in zip(LATENCY_BUCKETS, self.buckets):
+            seen += n
+            if seen >= rank:
+                return bound
+        return None
+
+
+class Metrics:
+    """
+    进程内的埋点汇总，线程安全；asyncio 与线程池里的请求共用同一份。
+    METRICS_ENABLED 为 False 时各记录方法直接返回。
+    """
+
+    def __init__(self) -> None:
+        self.started = time.time()
+        self.sleep_seconds: Dict[str, float] = defaultdict(float)
+        self._endpoints: Dict[str, _Endpoint] = defaultdict(_Endpoint)
+        self._lock = threading.Lock()
+
+    # ---------- 记录 ----------
+    def observe(
+        self,
+        endpoint: str,
+        status: int,
+        seconds: float,
+        bytes_in: int = 0,
+        bytes_out: int = 0,
+    ) -> None:
+        """记录一次实际发出的请求（不含命中本地缓存的）。"""
+
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            ep = self._endpoints[endpoint]
+            ep.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            ep.latency_sum += seconds
+            ep.statuses[str(status)] += 1
+            ep.bytes_in += bytes_in
+            ep.bytes_out += bytes_out
+
+    def cache_hit(self, endpoint: str) -> None:
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._endpoints[endpoint].cache_hits += 1
+
+    def retry(self, endpoint: str) -> None:
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._endpoints[endpoint].retries += 1
+
+    def decoded(self, endpoint: str, seconds: float) -> None:
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            ep = self._endpoints[endpoint]
+            ep.decode_seconds += seconds
+            ep.decodes += 1
+
+    def slept(self, kind: str, seconds: float) -> None:
+        if METRICS_ENABLED and seconds > 0:
+            with self._lock:
+                self.sleep_seconds[kind] += seconds
+
+    # ---------- 导出 ----------
+    @property
+    def empty(self) -> bool:
+        return not self._endpoints and not self.sleep_seconds
+
+    def prometheus(self, script: str) -> str:
+        """Prometheus textfile 格式；所有序列带 script 标签，多个脚本可写到同一目录。"""
+
+        def labels(**kv: Any) -> str:
+            kv = {"script": script, **kv}
+            return ",".join(f'{k}="{v}"' for k, v in kv.items())
+
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_: str) -> None:
+            lines.append(f"# HELP {name} {help_}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            eps = sorted(self._endpoints.items())
+            sleeps = sorted(self.sleep_seconds.items())
+
+            name = "pgy_http_request_duration_seconds"
+            family(name, "histogram", "HTTP request latency until response headers.")
+            for ep, m in eps:
+                cumulative = 0
+                for bound, n in zip(LATENCY_BUCKETS, m.buckets):
+                    cumulative += n
+                    le = labels(endpoint=ep, le=bound)
+                    lines.append(f"{name}_bucket{{{le}}} {cumulative}")
+                le = labels(endpoint=ep, le="+Inf")
+                lines.append(f"{name}_bucket{{{le}}} {m.requests}")
+                lines.append(f"{name}_sum{{{labels(endpoint=ep)}}} {m.latency_sum:.6f}")
+                lines.append(f"{name}_count{{{labels(endpoint=ep)}}} {m.requests}")
+
+            family("pgy_http_requests_total", "counter", "Requests by status code.")
+            for ep, m in eps:
+                for status, n in sorted(m.statuses.items()):
+                    lb = labels(endpoint=ep, status=status)
+                    lines.append(f"pgy_http_requests_total{{{lb}}} {n}")
+
+            counters = (
+                ("pgy_http_retries_total", "Retries.", "retries"),
+                ("pgy_http_cache_hits_total", "Local cache hits.", "cache_hits"),
+                ("pgy_http_response_bytes_total", "Bytes received.", "bytes_in"),
+                ("pgy_http_request_bytes_total", "Bytes sent.", "bytes_out"),
+                ("pgy_json_decode_seconds_total", "JSON decoding.", "decode_seconds"),
+                ("pgy_json_decodes_total", "JSON bodies decoded.", "decodes"),
+            )
+            for name, help_, attr in counters:
+                family(name, "counter", help_)
+                for ep, m in eps:
+                    value = getattr(m, attr)
+                    if isinstance(value, float):
+                        value = f"{value:.6f}"
+                    lines.append(f"{name}{{{labels(endpoint=ep)}}} {value}")
+
+            family(
+                "pgy_sleep_seconds_total", "counter", "Time spent sleeping by reason."
+            )
+            for kind, seconds in sleeps:
+                lines.append(
+                    f"pgy_sleep_seconds_total{{{labels(kind=kind)}}} {seconds:.6f}"
+                )
+
+        family("pgy_run_duration_seconds", "gauge", "Wall time of the run.")
+        duration = time.time() - self.started
+        lines.append(f"pgy_run_duration_seconds{{{labels()}}} {duration:.3f}")
+        family("pgy_run_end_timestamp_seconds", "gauge", "When metrics were written.")
+        lines.append(f"pgy_run_end_timestamp_seconds{{{labels()}}} {time.time():.3f}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, Any]:
+        """各接口的请求数、耗时分位数、重试、字节数，以及整体时间分布。"""
+
+        with self._lock:
+            endpoints = {}
+            for ep, m in sorted(self._endpoints.items()):
+                n = m.requests
+                endpoints[ep] = {
+                    "requests": n,
+                    "cache_hits": m.cache_hits,
+                    "retries": m.retries,
+                    "statuses": dict(m.statuses),
+                    "latency_mean": round(m.latency_sum / n, 4) if n else None,
+                    "latency_p50_le": m.quantile(0.5),
+                    "latency_p90_le": m.quantile(0.9),
+                    "latency_p99_le": m.quantile(0.99),
+                    "bytes_in": m.bytes_in,
+                    "bytes_out": m.bytes_out,
+                    "json_decode_seconds": round(m.decode_seconds, 4),
+                }
+            http = sum(m.latency_sum for m in self._endpoints.values())
+            decode = sum(m.decode_seconds for m in self._endpoints.values())
+            sleeps = {k: round(v, 3) for k, v in sorted(self.sleep_seconds.items())}
+        return {
+            "wall_seconds": round(time.time() - self.started, 3),
+            "http_seconds": round(http, 3),  # 各请求耗时之和，并发时可能大于墙钟时间
+            "json_decode_seconds": round(decode, 3),
+            "sleep_seconds": sleeps,
+            "endpoints": endpoints,
+        }
+
+    def export(self, directory: str = METRICS_DIR, script: Optional[str] = None) -> str:
+        """写出 <directory>/<script>.prom 与 .json，返回 .prom 路径。"""
+
+        script = script or _script_name()
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, script)
+        # 先写临时文件再替换，textfile collector 不会读到写了一半的文件
+        for path, text in (
+            (base + ".prom", self.prometheus(script)),
+            (base + ".json", json.dumps(self.summary(), ensure_ascii=False, indent=2)),
+        ):
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, path)
+        return base + ".prom"
+
+
+def _script_name() -> str:
+    name = os.path.splitext(os.path.basename(sys.argv[0] or ""))[0]
+    return name or "python"
+
+
+metrics = Metrics()
+
+
+# ---------- 埋点入口 ----------
+def timed_sleep(seconds: float, kind: str) -> None:
+    """time.sleep 并按原因（rate_limit / retry_backoff / page_interval 等）计时。"""
+
+    if seconds > 0:
+        time.sleep(seconds)
+        metrics.slept(kind, seconds)
+
+
+async def timed_async_sleep(seconds: float, kind: str) -> None:
+    """asyncio.sleep 版 timed_sleep。"""
+
+    if seconds > 0:
+        await asyncio.sleep(seconds)
+        metrics.slept(kind, seconds)
+
+
+def json_of(resp: Any) -> Any:
+    """resp.json() 并记录解析耗时（解析失败照常抛出）。"""
+
+    if not METRICS_ENABLED:
+        return resp.json()
+    t0 = time.perf_counter()
+    try:
+        return resp.json()
+    finally:
+        metrics.decoded(endpoint_of(resp.url), time.perf_counter() - t0)
+
+
+def _on_response(resp: Any, *args: Any, **kwargs: Any) -> None:
+    endpoint = endpoint_of(resp.request.url)
+    if getattr(resp, "from_cache", False):
+        metrics.cache_hit(endpoint)
+        return
+    body = resp.request.body or b""
+    # elapsed 为 requests 层耗时，包含 urllib3 内部重试（重试次数另见 BudgetedRetry）
+    metrics.observe(
+        endpoint,
+        resp.status_code,
+        resp.elapsed.total_seconds(),
+        len(resp.content),
+        len(body),
+    )
+
+
+def instrument(session: Any) -> Any:
+    """给 requests.Session 挂上响应钩子，记录每个请求的耗时、状态码和收发字节数。"""
+
+    if METRICS_ENABLED and _on_response not in session.hooks["response"]:
+        session.hooks["response"].append(_on_response)
+    return session
+
+
+@atexit.register
+def _export_at_exit() -> None:
+    if not METRICS_ENABLED or metrics.empty:
+        return
+    try:
+        path = metrics.export()
+    except OSError as e:
+        logger.warning("埋点导出失败：%s", e)
+        return
+    logger.info("请求埋点已写出：%s（及同名 .json）", path)
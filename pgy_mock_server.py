@@ -0,0 +1,482 @@
+"""
+本地模拟的蒲公英(pgy)接口，用于在没有真实 cookies 的情况下测试/压测各抓取脚本。
+
+模拟的接口（数据按 seed 确定性生成，同一页每次返回相同内容）：
+    POST /api/solar/cooperator/blogger/v2            KOL 搜索（collect_xsh_user），
+                                                     支持图文 / 视频价格区间过滤
+    GET  /api/solar/order/task/query                 订单任务（xhs_orders_all）
+    POST /api/solar/heat/data/report                 热度报告（xhs_heat_report_all），
+                                                     支持 heatStartTimeBegin / End 日期过滤
+    GET  /api/solar/cooperator/user/blogger/<userId> 博主详情（pgy_user_info）
+    POST /api/solar/invite/initiate_invite           发起邀约（post_invite），重复邀约返回 code=-1
+
+可配置响应延迟、5xx 比例、风控（success=false）比例、按 rps 限流（429）、pageSize 上限。
+200 响应带按响应体计算的 ETag，请求的 If-None-Match 与之相同时回 304（不带响应体）。
+
+用法：
+    python pgy_mock_server.py --port 8765 --latency 0.05 --error-rate 0.02 --rps 20
+然后把脚本里的 BASE_URL 等改成 http://127.0.0.1:8765/...；进程内使用见 start()。
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+KOL_PATH = "/api/solar/cooperator/blogger/v2"
+ORDER_PATH = "/api/solar/order/task/query"
+HEAT_PATH = "/api/solar/heat/data/report"
+BLOGGER_PATH = "/api/solar/cooperator/user/blogger/"
+INVITE_PATH = "/api/solar/invite/initiate_invite"
+
+TAGS = ["美食", "探店", "cos", "二次元", "穿搭", "美妆", "旅行", "宠物", "游戏", "母婴"]
+CITIES = ["上海", "北京", "广州", "杭州", "成都", ""]
+HEAT_FIRST_DAY = dt.date(2025, 11, 3)
+# KOL 搜索的价格过滤：(下限参数, 上限参数, KOL 字段)，上下限都包含在内
+PRICE_FILTERS = (
+    ("notePriceLower", "notePriceUpper", "picturePrice"),
+    ("videoPriceLower", "videoPriceUpper", "videoPrice"),
+)
+
+
+@dataclass
+class MockConfig:
+    latency: float = 0.0  # 每个响应的基础延迟（秒）
+    jitter: float = 0.0  # 在基础延迟上叠加 [0, jitter) 的随机延迟
+    error_rate: float = 0.0  # 返回 503 的比例
+    risk_rate: float = 0.0  # 返回 success=false / code=-1 的比例（模拟风控）
+    rps: Optional[float] = None  # 超过该速率返回 429（令牌桶，桶容量 burst）
+    burst: float = 5.0
+    retry_after: int = 1  # 429 响应的 Retry-After 秒数
+    page_cap: Optional[int] = None  # 服务端 pageSize 上限
+    cap_mode: str = "truncate"  # 超过上限时：truncate 按上限截断，reject 返回错误
+    kols: int = 2000  # KOL 搜索结果总数
+    tasks: int = 500  # 订单任务总数（每个任务 1~3 个订单）
+    heat_rows: int = 1000  # 热度报告总行数
+    heat_per_day: int = 20  # 每天的热度报告行数（heatStartTime 按天递增）
+    seed: int = 0
+
+
+@dataclass
+class MockState:
+    config: MockConfig
+    stats: Counter = field(default_factory=Counter)  # 按 "路径 状态" 计数
+    # 收到的邀约：(kolId, 品牌 id, 产品名) → 次数，用来检查是否重复发送
+    invites: Counter = field(default_factory=Counter)
+    # 订单任务的修改次数：任务下标 → 版本号，每升一版各订单的 orderStatus 轮换一次
+    task_versions: Counter = field(default_factory=Counter)
+    _tokens: float = 0.0
+    _at: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def __post_init__(self) -> None:
+        self._tokens = self.config.burst
+        self._at = time.monotonic()
+
+    def take_token(self) -> bool:
+        rps = self.config.rps
+        if not rps:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.config.burst, self._tokens + (now - self._at) * rps)
+            self._at = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def count(self, path: str, status: int) -> None:
+        with self._lock:
+            self.stats[f"{path} {status}"] += 1
+
+
+# ---------- 数据生成 ----------
+def _rnd(*key: Any) -> random.Random:
+    # 用字符串做种子：不受 PYTHONHASHSEED 影响，跨进程结果一致
+    return random.Random(":".join(map(str, key)))
+
+
+def _user_id(i: int) -> str:
+    return f"{i:024x}"
+
+
+def make_kol(i: int, seed: int = 0) -> Dict[str, Any]:
+    rnd = _rnd("kol", seed, i)
+    return {
+        "userId": _user_id(i),
+        "name": f"博主{i}",
+        "redId": str(100000000 + i),
+        "location": rnd.choice(CITIES),
+        "personalTags": rnd.sample(TAGS, rnd.randint(0, 3)),
+        "picturePrice": rnd.randint(100, 20000),
+        "videoPrice": rnd.randint(100, 30000),
+        "businessNoteCount": rnd.randint(0, 200),
+        "contentTags": rnd.sample(TAGS, rnd.randint(0, 4)),
+        "featureTags": rnd.sample(TAGS, rnd.randint(0, 2)),
+        "gender": rnd.choice(["男", "女"]),
+        "tradeType": "不限",
+        "fansNum": rnd.randint(1000, 2_000_000),
+        "clickMidNum": rnd.randint(0, 50000),
+        "videoClickMidNum": rnd.randint(0, 50000),
+        "headPhoto": "https://example.invalid/avatar.jpg",
+    }
+
+
+@lru_cache(maxsize=8)
+def _kol_prices(kols: int, seed: int) -> List[Tuple[int, int]]:
+    return [
+        (k["picturePrice"], k["videoPrice"])
+        for k in (make_kol(i, seed) for i in range(kols))
+    ]
+
+
+def match_kols(kols: int, seed: int, payload: Dict[str, Any]) -> List[int]:
+    """按 payload 里的价格区间过滤出的 KOL 下标；没有价格参数时为全部。"""
+
+    bounds = [(payload.get(lo), payload.get(hi)) for lo, hi, _ in PRICE_FILTERS]
+    if all(lo is None and hi is None for lo, hi in bounds):
+        return list(range(kols))
+    return [
+        i
+        for i, prices in enumerate(_kol_prices(kols, seed))
+        if all(
+            (lo is None or p >= lo) and (hi is None or p <= hi)
+            for p, (lo, hi) in zip(prices, bounds)
+        )
+    ]
+
+
+def make_task(i: int, seed: int = 0, version: int = 0) -> Dict[str, Any]:
+    rnd = _rnd("task", seed, i)
+    create = 1_700_000_000_000 + i * 3_600_000
+    orders = []
+    for j in range(rnd.randint(1, 3)):
+        price = rnd.randint(500, 50000)
+        orders.append(
+            {
+                "orderId": f"O{i:06d}{j}",
+                "totalPrice": price,
+                "contentPrice": price - rnd.randint(0, 400),
+                "createTime": create,
+                "notePublishTime": create + rnd.randint(1, 14) * 86_400_000,
+                "orderStatus": (rnd.choice([1, 2, 3, 4]) + version - 1) % 4 + 1,
+                "state": rnd.choice([10, 20, 30]),
+                "contentType": rnd.choice([1, 2]),
+                "settlementRule": 1,
+                "needAdsAudit": rnd.random() < 0.2,
+                "kolId": _user_id(rnd.randint(0, 10_000)),
+                "kolName": f"博主{rnd.randint(0, 10_000)}",
+                "brandId": "59ebefa3e8ac2b2171a39d89",
+                "brandName": "示例品牌",
+            }
+        )
+    return {
+        "taskNo": f"T{i:06d}",
+        "title": f"任务{i}",
+        "reportBrandUserName": "示例品牌",
+        "expectPublishTime": create + 7 * 86_400_000,
+        "orderVos": orders,
+    }
+
+
+def heat_day(i: int, per_day: int = 20) -> dt.date:
+    return HEAT_FIRST_DAY + dt.timedelta(days=i // per_day)
+
+
+def make_heat_row(i: int, seed: int = 0, per_day: int = 20) -> Dict[str, Any]:
+    rnd = _rnd("heat", seed, i)
+    return {
+        "noteId": f"{i + 10**6:024x}",
+        "heatStartTime": heat_day(i, per_day).isoformat(),
+        "title": f"笔记{i}",
+        "userId": _user_id(rnd.randint(0, 10_000)),
+        "publishTime": 1_700_000_000_000 + i * 600_000,
+        "impNum": rnd.randint(0, 500_000),
+        "readNum": rnd.randint(0, 100_000),
+        "likeNum": rnd.randint(0, 20_000),
+        "collectNum": rnd.randint(0, 5_000),
+        "commentNum": rnd.randint(0, 2_000),
+        "heatCost": round(rnd.uniform(0, 3000), 2),
+    }
+
+
+def _page(
+    cfg: MockConfig, total: int, page_num: Any, page_size: Any
+) -> Optional[Tuple[range, int]]:
+    """返回 (本页下标范围, 总页数)；pageSize 超上限且为 reject 模式时返回 None。"""
+
+    page_num = max(int(page_num or 1), 1)
+    page_size = max(int(page_size or 20), 1)
+    effective = page_size
+    if cfg.page_cap and page_size > cfg.page_cap:
+        if cfg.cap_mode == "reject":
+            return None
+        effective = cfg.page_cap
+    start = (page_num - 1) * page_size
+    return range(start, min(total, start + effective)), math.ceil(total / page_size)
+
+
+# ---------- 请求处理 ----------
+class MockHandler(BaseHTTPRequestHandler):
+    state: MockState  # 由 make_server 绑定
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+    def _send(
+        self, status: int, obj: Any = None, headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        body = b"" if obj is None else json.dumps(obj, ensure_ascii=False).encode()
+        if status == 200 and body:
+            etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+            headers = dict(headers or {}, ETag=etag)
+            if self.headers.get("If-None-Match") == etag:
+                status, body = 304, b""
+        # 先计数再回包，客户端拿到响应时计数已经可见；博主详情按接口合并计数
+        path = urlsplit(self.path).path
+        if path.startswith(BLOGGER_PATH):
+            path = BLOGGER_PATH
+        self.state.count(path, status)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json;charset=UTF-8")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self) -> Dict[str, Any]:
+        n = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(n) or b"{}")
+
+    def _gate(self) -> bool:
+        """统一的延迟、限流、5xx、风控模拟；返回 False 表示已经回了错误响应。"""
+
+        cfg = self.state.config
+        delay = cfg.latency + (random.random() * cfg.jitter if cfg.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        if not self.state.take_token():
+            self._send(
+                429,
+                {"code": 429, "msg": "请求过于频繁"},
+                {"Retry-After": str(cfg.retry_after)},
+            )
+            return False
+        if cfg.error_rate and random.random() < cfg.error_rate:
+            self._send(503, {"code": 503, "msg": "service unavailable"})
+            return False
+        if cfg.risk_rate and random.random() < cfg.risk_rate:
+            self._send(
+                200, {"code": -1, "success": False, "msg": "操作频繁，请稍后再试"}
+            )
+            return False
+        return True
+
+    def do_GET(self) -> None:
+        parts = urlsplit(self.path)
+        if parts.path == ORDER_PATH:
+            if self._gate():
+                self._orders(dict(parse_qsl(parts.query)))
+        elif parts.path.startswith(BLOGGER_PATH):
+            if self._gate():
+                self._blogger(parts.path[len(BLOGGER_PATH) :].strip("/"))
+        else:
+            self._send(404, {"code": 404, "msg": "not found"})
+
+    def do_POST(self) -> None:
+        path = urlsplit(self.path).path
+        payload = self._body()  # keep-alive 连接上必须先读完请求体
+        if path not in (KOL_PATH, HEAT_PATH, INVITE_PATH):
+            self._send(404, {"code": 404, "msg": "not found"})
+            return
+        if not self._gate():
+            return
+        if path == KOL_PATH:
+            self._kols(payload)
+        elif path == INVITE_PATH:
+            self._invite(payload)
+        else:
+            self._heat(payload)
+
+    def _kols(self, payload: Dict[str, Any]) -> None:
+        cfg = self.state.config
+        matched = match_kols(cfg.kols, cfg.seed, payload)
+        total = len(matched)
+        page = _page(cfg, total, payload.get("pageNum"), payload.get("pageSize"))
+        if page is None:
+            self._send(200, {"code": -1, "success": False, "msg": "pageSize 超出上限"})
+            return
+        rows, _ = page
+        kols = [make_kol(matched[i], cfg.seed) for i in rows]
+        data = {"total": total, "kols": kols}
+        self._send(200, {"code": 0, "success": True, "data": data})
+
+    def _orders(self, params: Dict[str, Any]) -> None:
+        cfg = self.state.config
+        page = _page(cfg, cfg.tasks, params.get("pageNum"), params.get("pageSize"))
+        if page is None:
+            self._send(200, {"code": -1, "success": False, "msg": "pageSize 超出上限"})
+            return
+        rows, total_page = page
+        data = {
+            "list": [make_task(i, cfg.seed, self.state.task_versions[i]) for i in rows],
+            "total": cfg.tasks,
+            "totalPage": total_page,
+        }
+        self._send(200, {"code": 0, "success": True, "data": data})
+
+    def _heat(self, payload: Dict[str, Any]) -> None:
+        cfg = self.state.config
+        # 日期过滤（含首尾两天）：行号按天连续，过滤结果仍是一段连续的行号
+        per_day = cfg.heat_per_day
+        first, last = 0, cfg.heat_rows
+        if payload.get("heatStartTimeBegin"):
+            begin = dt.date.fromisoformat(payload["heatStartTimeBegin"])
+            first = max(first, (begin - HEAT_FIRST_DAY).days * per_day)
+        if payload.get("heatStartTimeEnd"):
+            end = dt.date.fromisoformat(payload["heatStartTimeEnd"])
+            last = min(last, ((end - HEAT_FIRST_DAY).days + 1) * per_day)
+        total = max(last - first, 0)
+        page = _page(cfg, total, payload.get("pageNum"), payload.get("pageSize"))
+        if page is None:
+            self._send(200, {"code": -1, "success": False, "msg": "pageSize 超出上限"})
+            return
+        rows, total_page = page
+        data = {
+            "list": [make_heat_row(first + i, cfg.seed, per_day) for i in rows],
+            "total": total,
+            "totalPage": total_page,
+        }
+        self._send(200, {"code": 0, "success": True, "data": data})
+
+    def _blogger(self, user_id: str) -> None:
+        try:
+            i = int(user_id, 16)
+        except ValueError:
+            self._send(200, {"code": -1, "success": False, "msg": "博主不存在"})
+            return
+        kol = make_kol(i, self.state.config.seed)
+        self._send(200, {"code": 0, "success": True, "data": kol})
+
+    def _invite(self, payload: Dict[str, Any]) -> None:
+        key = (
+            payload.get("kolId"),
+            payload.get("cooperateBrandId"),
+            payload.get("productName"),
+        )
+        with self.state._lock:
+            self.state.invites[key] += 1
+            repeated = self.state.invites[key] > 1
+        if not key[0]:
+            self._send(200, {"code": -1, "success": False, "msg": "缺少 kolId"})
+        elif repeated:
+            self._send(200, {"code": -1, "success": False, "msg": "已邀约过该博主"})
+        else:
+            data = {"inviteId": hashlib.sha1(repr(key).encode()).hexdigest()[:24]}
+            self._send(200, {"code": 0, "success": True, "data": data})
+
+
+def make_server(
+    config: Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0
+) -> ThreadingHTTPServer:
+    """创建（未启动的）模拟服务；port=0 时由系统分配端口。server.state 为计数与配置。"""
+
+    state = MockState(config or MockConfig())
+    handler = type("BoundMockHandler", (MockHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = state
+    return server
+
+
+def start(config: Optional[MockConfig] = None) -> Tuple[ThreadingHTTPServer, str]:
+    """在后台线程启动模拟服务，返回 (server, base_url)；用完调用 server.shutdown()。"""
+
+    server = make_server(config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+def add_config_args(parser: argparse.ArgumentParser) -> None:
+    """MockConfig 的命令行参数，压测脚本复用。"""
+
+    d = MockConfig()
+    parser.add_argument(
+        "--latency", type=float, default=d.latency, help="响应延迟（秒）"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=d.jitter, help="随机附加延迟上限"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=d.error_rate, help="503 比例"
+    )
+    parser.add_argument("--risk-rate", type=float, default=d.risk_rate, help="风控比例")
+    parser.add_argument("--rps", type=float, default=d.rps, help="超过该速率返回 429")
+    parser.add_argument("--burst", type=float, default=d.burst)
+    parser.add_argument(
+        "--page-cap", type=int, default=d.page_cap, help="pageSize 上限"
+    )
+    parser.add_argument(
+        "--cap-mode", choices=("truncate", "reject"), default=d.cap_mode
+    )
+    parser.add_argument("--kols", type=int, default=d.kols)
+    parser.add_argument("--tasks", type=int, default=d.tasks)
+    parser.add_argument("--heat-rows", type=int, default=d.heat_rows)
+    parser.add_argument("--heat-per-day", type=int, default=d.heat_per_day)
+    parser.add_argument("--seed", type=int, default=d.seed)
+
+
+def config_from_args(args: argparse.Namespace) -> MockConfig:
+    return MockConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        risk_rate=args.risk_rate,
+        rps=args.rps,
+        burst=args.burst,
+        page_cap=args.page_cap,
+        cap_mode=args.cap_mode,
+        kols=args.kols,
+        tasks=args.tasks,
+        heat_rows=args.heat_rows,
+        heat_per_day=args.heat_per_day,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_config_args(parser)
+    args = parser.parse_args()
+
+    server = make_server(config_from_args(args), args.host, args.port)
+    print(f"mock pgy server on http://{args.host}:{args.port}  {server.state.config}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(dict(server.state.stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,25 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
 import time
-import requests
+from typing import Callable, Dict, List, Optional
+
 import polars as pl
-import logging
+
+import httpx
+
+from pgy_accounts import (
+    ACCOUNTS_FILE,
+    AccountRejected,
+    SessionPool,
+    TransientError,
+    load_accounts,
+)
+from pgy_aio import ApiError, PgyClient, gather_bounded
+from pgy_http import AdaptiveRateLimiter, default_cache, with_account_budget
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s"
@@ -85,7 +103,169 @@ def write_excel_safely(df: pl.DataFrame, path: str) -> None:
             raise
 
 
-all_rs = []
+BLOGGER_URL = "https://pgy.xiaohongshu.com/api/solar/cooperator/user/blogger/"
+MAX_RPS = 1.0  # 每秒请求上限（原来每条之后 sleep 1 秒），遇到限流自动降速
+USE_ACCOUNT_POOL = False  # userId 分摊到 ACCOUNTS_FILE 里的多个账号，各账号各自限速
+CONCURRENCY = 8  # 单个账号同时在途的详情请求数
+ENRICHED_PATH = "xhs_blogger_detail.jsonl"  # 增量结果：每拉到一个博主追加一行
+EXCEL_PATH = "xhs_blogger_detail.xlsx"  # 本次输入对应的详情，None 不导出
+REFRESH_AGE = 3 * 24 * 3600  # 该时间内已补全过的 userId 直接跳过（秒）
+
+_USER_ID = re.compile(r"[0-9a-f]{24}")
+
+
+def _blogger_row(it: dict) -> dict:
+    user_id = it.get("userId", "")
+    return {
+        "pgy_home_url": f"https://pgy.xiaohongshu.com/solar/pre-trade/blogger-detail/{user_id}"
+        if user_id
+        else "",
+        "xsh_home_url": f"https://www.xiaohongshu.com/user/profile/{user_id}"
+        if user_id
+        else "",
+        "userId": user_id,
+        "name": it.get("name", ""),
+        "redId": it.get("redId", ""),
+        "location": it.get("location", ""),
+        "personalTags": it.get("personalTags", []),
+        "picturePrice": it.get("picturePrice", None),
+        "videoPrice": it.get("videoPrice", None),
+        "businessNoteCount": it.get("businessNoteCount", None),
+        "contentTags": it.get("contentTags", []),
+        "featureTags": it.get("featureTags", []),
+        "gender": it.get("gender", None),
+        "tradeType": it.get("tradeType", ""),
+        "fansNum": it.get("fansNum", None),
+        "clickMidNum": it.get("clickMidNum", None),
+        "videoClickMidNum": it.get("videoClickMidNum", None),
+    }
+
+
+def _detail_row(user_id: str, res: dict) -> Optional[dict]:
+    """接口返回 → 结果行，附上拉取时间；没有 data（博主注销、无权限等）时返回 None。"""
+
+    data = res.get("data")
+    if not data:
+        logger.warning("%s 没有返回博主详情，跳过：%s", user_id, res)
+        return None
+    row = _blogger_row(data)
+    row["userId"] = row["userId"] or user_id
+    row["fetchedAt"] = int(time.time())
+    return row
+
+
+def load_user_ids(path: str) -> List[str]:
+    """
+    读取待补全的 userId，按首次出现的顺序去重：
+    - .parquet / .xlsx：collect_xsh_user 的 KOL 搜索结果，取 userId 列
+    - 其他文本文件：每行一个 userId 或主页链接，取行内第一个 userId
+    """
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".parquet":
+        ids = pl.read_parquet(path, columns=["userId"])["userId"].to_list()
+    elif ext == ".xlsx":
+        ids = pl.read_excel(path, columns=["userId"])["userId"].to_list()
+    else:
+        with open(path, encoding="utf-8") as f:
+            ids = [m.group() for m in map(_USER_ID.search, f) if m]
+    return list(dict.fromkeys(i for i in ids if i))
+
+
+def read_enriched(path: str = ENRICHED_PATH) -> Dict[str, dict]:
+    """读取增量结果文件，同一 userId 取最后一次拉取的那行。"""
+
+    rows: Dict[str, dict] = {}
+    if not os.path.exists(path):
+        return rows
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue  # 上次中断时写了一半的行
+            rows[row["userId"]] = row
+    return rows
+
+
+async def fetch_bloggers(
+    user_ids: list, on_row: Optional[Callable[[dict], None]] = None
+) -> list:
+    """
+    用 pgy_aio 客户端拉取博主详情：共用连接池，AIMD 自适应限速，
+    最多 CONCURRENCY 个请求同时在途；博主详情走磁盘缓存，3 天内重跑不再请求。
+    每拉到一个博主调用一次 on_row（用于增量落盘），没有详情的 userId 跳过。
+    结果顺序与 user_ids 一致。
+    """
+
+    async with PgyClient(
+        cookies,
+        headers,
+        per_host=CONCURRENCY,
+        limiter=with_account_budget(
+            AdaptiveRateLimiter(BLOGGER_URL, rps=MAX_RPS, max_rps=MAX_RPS), cookies
+        ),
+        cache=default_cache(),
+    ) as client:
+
+        async def one(user_id: str) -> Optional[dict]:
+            row = _detail_row(user_id, await client.get_json(BLOGGER_URL + user_id))
+            if row is not None and on_row is not None:
+                on_row(row)
+            return row
+
+        rows = await gather_bounded(one, user_ids, CONCURRENCY)
+    return [r for r in rows if r is not None]
+
+
+async def fetch_bloggers_pooled(
+    user_ids: list,
+    path: str = ACCOUNTS_FILE,
+    on_row: Optional[Callable[[dict], None]] = None,
+) -> list:
+    """
+    多账号版 fetch_bloggers：userId 分摊到账号池里的各账号，每个账号 MAX_RPS 限速。
+    401/403、非 JSON、code != 0 视为该账号被拒，换号重试，连续被拒的账号剔除；
+    超时、连接错误、5xx 与账号无关，重新排队但不计入被拒次数。
+    所有账号都失败的 userId 不出现在结果里。
+    """
+
+    pool = SessionPool(
+        load_accounts(path, default_headers=headers, rps=MAX_RPS),
+        lambda account: PgyClient(
+            account.cookies,
+            account.headers,
+            per_host=CONCURRENCY,
+            limiter=account.limiter,
+            cache=default_cache(),
+        ),
+        per_account=2,
+    )
+
+    async def one(client: PgyClient, account, user_id: str) -> Optional[dict]:
+        try:
+            res = await client.get_json(BLOGGER_URL + user_id)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code in (401, 403):
+                raise AccountRejected(f"{user_id}: {e}") from e
+            raise TransientError(f"{user_id}: {e}") from e
+        except httpx.HTTPError as e:
+            raise TransientError(f"{user_id}: {e}") from e
+        except (ValueError, ApiError) as e:  # 非 JSON / code != 0
+            raise AccountRejected(f"{user_id}: {e}") from e
+        row = _detail_row(user_id, res)
+        if row is not None and on_row is not None:
+            on_row(row)
+        return row
+
+    try:
+        rows = await pool.run_async(user_ids, one)
+    finally:
+        await pool.aclose()
+        logger.info(pool.summary())
+    return [r for r in rows if r is not None]
+
+
 all_urls = [
     "https://www.xiaohongshu.com/user/profile/635e9c7e000000001901f583",
     "https://www.xiaohongshu.com/user/profile/60b0ac43000000000101e199",
@@ -125,42 +305,86 @@ all_urls = [
     "https://www.xiaohongshu.com/user/profile/6017eca50000000001005e0c",
     "https://www.xiaohongshu.com/user/profile/5c1a40840000000005006b0c",
 ]
-for url in all_urls:
-    user_id = url.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1]
-    response = requests.get(
-        "https://pgy.xiaohongshu.com/api/solar/cooperator/user/blogger/" + user_id,
-        cookies=cookies,
-        headers=headers,
+
+
+def enrich(
+    user_ids: List[str],
+    out_path: str = ENRICHED_PATH,
+    refresh_age: float = REFRESH_AGE,
+    pooled: bool = USE_ACCOUNT_POOL,
+) -> List[dict]:
+    """
+    批量补全：跳过 refresh_age 秒内已在 out_path 里的 userId，其余并发拉取，
+    每拉到一个就追加写入 out_path（中断后重跑只补缺的）。
+    返回 user_ids 对应的全部详情行（含此前已补全的），顺序与 user_ids 一致。
+    """
+
+    user_ids = list(dict.fromkeys(user_ids))
+    cutoff = time.time() - refresh_age
+    done = read_enriched(out_path)
+    todo = [u for u in user_ids if done.get(u, {}).get("fetchedAt", 0) < cutoff]
+    logger.info(
+        "共 %s 个 userId，%s 个近期已补全，本次拉取 %s 个。",
+        len(user_ids),
+        len(user_ids) - len(todo),
+        len(todo),
     )
-    res = response.json()
-    it = res["data"]
-    user_id = it.get("userId", "")
-    all_rs.append(
-        {
-            "pgy_home_url": f"https://pgy.xiaohongshu.com/solar/pre-trade/blogger-detail/{user_id}"
-            if user_id
-            else "",
-            "xsh_home_url": f"https://www.xiaohongshu.com/user/profile/{user_id}"
-            if user_id
-            else "",
-            "userId": user_id,
-            "name": it.get("name", ""),
-            "redId": it.get("redId", ""),
-            "location": it.get("location", ""),
-            "personalTags": it.get("personalTags", []),
-            "picturePrice": it.get("picturePrice", None),
-            "videoPrice": it.get("videoPrice", None),
-            "businessNoteCount": it.get("businessNoteCount", None),
-            "contentTags": it.get("contentTags", []),
-            "featureTags": it.get("featureTags", []),
-            "gender": it.get("gender", None),
-            "tradeType": it.get("tradeType", ""),
-            "fansNum": it.get("fansNum", None),
-            "clickMidNum": it.get("clickMidNum", None),
-            "videoClickMidNum": it.get("videoClickMidNum", None),
-        }
+
+    if todo:
+        with open(out_path, "a", encoding="utf-8") as f:
+
+            def save(row: dict) -> None:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+                f.flush()
+                done[row["userId"]] = row
+
+            if pooled:
+                fetched = asyncio.run(fetch_bloggers_pooled(todo, on_row=save))
+            else:
+                fetched = asyncio.run(fetch_bloggers(todo, on_row=save))
+        logger.info(
+            "本次补全 %s 个，缺失 %s 个。", len(fetched), len(todo) - len(fetched)
+        )
+        logger.info(default_cache().summary())
+    return [done[u] for u in user_ids if u in done]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="批量补全蒲公英博主详情")
+    parser.add_argument(
+        "source",
+        nargs="?",
+        help="userId 来源：每行一个 userId/主页链接的文本文件，或 KOL 搜索结果 "
+        ".parquet/.xlsx；缺省用脚本内的 all_urls",
     )
-    time.sleep(1)
-print(all_rs)
-df = _to_polars_df(all_rs)
-write_excel_safely(df, "xhs_kol.xlsx")
+    parser.add_argument(
+        "--out", default=ENRICHED_PATH, help="增量结果文件（JSON Lines）"
+    )
+    parser.add_argument(
+        "--excel", default=EXCEL_PATH, help="导出的 Excel，传空串不导出"
+    )
+    parser.add_argument(
+        "--refresh-days",
+        type=float,
+        default=REFRESH_AGE / 86400,
+        help="多少天内补全过的 userId 跳过，0 表示全部重拉",
+    )
+    parser.add_argument(
+        "--pool",
+        action="store_true",
+        default=USE_ACCOUNT_POOL,
+        help=f"按 {ACCOUNTS_FILE} 多账号分摊",
+    )
+    args = parser.parse_args()
+
+    if args.source:
+        user_ids = load_user_ids(args.source)
+    else:
+        user_ids = list(dict.fromkeys(_USER_ID.search(u).group() for u in all_urls))
+    rows = enrich(user_ids, args.out, args.refresh_days * 86400, args.pool)
+    if args.excel:
+        write_excel_safely(_to_polars_df(rows), args.excel)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,17 @@
+import argparse
+import asyncio
+import csv
+import json
+import re
+import sqlite3
 import time
-import requests
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from pgy_aio import ApiError, PgyClient, RetryPolicy, gather_bounded
+from pgy_http import AdaptiveRateLimiter, CircuitOpen, with_account_budget
 
 cookies = {
     "a1": "19841b7dbc2g4lp8jzlz23cqyhhzikeupa7rpm2lr30000355340",
@@ -50,29 +62,227 @@ all_rs = [
     "62d4c63d000000000303d6c7",
     "61fa75a8000000001000696a",
 ]
-for kolId in all_rs:
-    json_data = {
-        "kolId": kolId,
-        "cooperateBrandName": "次元脉冲",
-        "cooperateBrandId": "60ddd0e9000000002002a3a6",
-        "productName": "【入坑指南向】rua娃技巧",
-        "inviteType": 2,
-        "expectedPublishTimeStart": "2025-09-15",
-        "expectedPublishTimeEnd": "2025-10-31",
-        "inviteContent": "【入坑指南向】rua娃技巧+毛绒养护教程+线下开售倒计时",
-        "contactType": 2,
-        "contactInfo": "pgy_sens_encrypt:LqnPAevmodSUg/InQWGzQWvJBXrSZrVK4rxIrb6Sf/ZzDk2IJf7DeQUzsyPusq2/1n4MVghdih6FDK0COIv6Wx/h5pvn6Nyjm/Svc0B0xqGtc9NvQq/2V2UFOBLGTOHi",
-        "contactInfoCiphertext": "pgy_sens_encrypt:LqnPAevmodSUg/InQWGzQWvJBXrSZrVK4rxIrb6Sf/ZzDk2IJf7DeQUzsyPusq2/1n4MVghdih6FDK0COIv6Wx/h5pvn6Nyjm/Svc0B0xqGtc9NvQq/2V2UFOBLGTOHi",
-        "kolType": 0,
-        "brandUserId": "60ddd0e9000000002002a3a6",
-    }
-
-    response = requests.post(
-        "https://pgy.xiaohongshu.com/api/solar/invite/initiate_invite",
-        cookies=cookies,
-        headers=headers,
-        json=json_data,
+INVITE_URL = "https://pgy.xiaohongshu.com/api/solar/invite/initiate_invite"
+MAX_RPS = 1.0  # 每秒邀约上限（原来每条之后 sleep 1 秒），遇到限流自动降速
+
+INVITE_TEMPLATE = {
+    "cooperateBrandName": "次元脉冲",
+    "cooperateBrandId": "60ddd0e9000000002002a3a6",
+    "productName": "【入坑指南向】rua娃技巧",
+    "inviteType": 2,
+    "expectedPublishTimeStart": "2025-09-15",
+    "expectedPublishTimeEnd": "2025-10-31",
+    "inviteContent": "【入坑指南向】rua娃技巧+毛绒养护教程+线下开售倒计时",
+    "contactType": 2,
+    "contactInfo": "pgy_sens_encrypt:LqnPAevmodSUg/InQWGzQWvJBXrSZrVK4rxIrb6Sf/ZzDk2IJf7DeQUzsyPusq2/1n4MVghdih6FDK0COIv6Wx/h5pvn6Nyjm/Svc0B0xqGtc9NvQq/2V2UFOBLGTOHi",
+    "contactInfoCiphertext": "pgy_sens_encrypt:LqnPAevmodSUg/InQWGzQWvJBXrSZrVK4rxIrb6Sf/ZzDk2IJf7DeQUzsyPusq2/1n4MVghdih6FDK0COIv6Wx/h5pvn6Nyjm/Svc0B0xqGtc9NvQq/2V2UFOBLGTOHi",
+    "kolType": 0,
+    "brandUserId": "60ddd0e9000000002002a3a6",
+}
+
+
+LEDGER_PATH = "pgy_invites.sqlite"  # 邀约台账，重跑时已发送的不再重发
+CONCURRENCY = 4  # 同时在途的邀约请求数（另受 MAX_RPS 约束）
+
+_USER_ID = re.compile(r"[0-9a-f]{24}")
+
+InviteKey = Tuple[str, str, str]  # (kolId, 品牌 id, 产品名)
+
+
+def invite_key(payload: Dict[str, Any]) -> InviteKey:
+    return (
+        payload["kolId"],
+        str(payload.get("cooperateBrandId") or payload.get("cooperateBrandName", "")),
+        str(payload.get("productName", "")),
+    )
+
+
+class InviteLedger:
+    """
+    邀约台账（SQLite），按 (kolId, 品牌, 产品) 记录每条邀约的最终状态：
+    - sent：接口返回成功
+    - failed：请求确定没有被处理（连接失败、限流、4xx）或接口明确拒绝，重跑时重发
+    - unknown：请求已发出但没拿到结果（超时、5xx、进程中途退出），可能已邀约成功，
+      默认不重发，确认后用 retry_unknown 重发
+    """
+
+    def __init__(self, path: str = LEDGER_PATH) -> None:
+        self.path = path
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS invites (
+                kol_id TEXT,
+                brand TEXT,
+                product TEXT,
+                status TEXT,
+                attempts INTEGER,
+                response TEXT,
+                updated_at REAL,
+                PRIMARY KEY (kol_id, brand, product)
+            )
+            """
+        )
+        self._db.commit()
+
+    def status(self, key: InviteKey) -> Optional[str]:
+        row = self._db.execute(
+            "SELECT status FROM invites WHERE kol_id=? AND brand=? AND product=?", key
+        ).fetchone()
+        return row[0] if row else None
+
+    def mark(self, key: InviteKey, status: str, response: Any = None) -> None:
+        """写入状态后立即提交；进入 unknown（即将发送）时累计一次尝试。"""
+
+        text = None if response is None else json.dumps(response, ensure_ascii=False)
+        self._db.execute(
+            """
+            INSERT INTO invites VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (kol_id, brand, product) DO UPDATE SET
+                status = excluded.status,
+                attempts = attempts + excluded.attempts,
+                response = COALESCE(excluded.response, response),
+                updated_at = excluded.updated_at
+            """,
+            (*key, status, int(status == "unknown"), text, time.time()),
+        )
+        self._db.commit()
+
+    def summary(self) -> str:
+        counts = dict(
+            self._db.execute("SELECT status, COUNT(*) FROM invites GROUP BY status")
+        )
+        return f"邀约台账 {self.path}：{counts}"
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def load_invites(path: str) -> List[Dict[str, Any]]:
+    """
+    读取邀约 CSV：必须有 kolId 列（userId 或主页链接均可），其余列名与 INVITE_TEMPLATE
+    的字段相同（cooperateBrandName、productName、inviteContent 等），空单元格沿用模板。
+    同一 (kolId, 品牌, 产品) 只保留第一行。
+    """
+
+    invites: Dict[InviteKey, Dict[str, Any]] = {}
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        for line_no, rec in enumerate(csv.DictReader(f), start=2):
+            raw = (rec.pop("kolId", None) or "").strip()
+            m = _USER_ID.search(raw)
+            if not m:
+                print(f"第{line_no}行没有有效的 kolId，跳过：{raw!r}")
+                continue
+            payload = dict(INVITE_TEMPLATE, kolId=m.group())
+            for k, v in rec.items():
+                if not k or v is None or not v.strip():
+                    continue
+                template = INVITE_TEMPLATE.get(k)
+                payload[k] = int(v) if isinstance(template, int) else v.strip()
+            invites.setdefault(invite_key(payload), payload)
+    return list(invites.values())
+
+
+async def dispatch_invites(
+    invites: List[Dict[str, Any]],
+    ledger: InviteLedger,
+    rps: float = MAX_RPS,
+    retry_unknown: bool = False,
+) -> Counter:
+    """
+    按台账批量发起邀约：sent 的跳过，unknown 的默认跳过，其余最多 CONCURRENCY 个同时在途，
+    不超过 rps（遇到限流信号自动降速）。每条发出前记 unknown、拿到结果后改为
+    sent / failed，进程中途退出也不会重复邀约。登录失效（CircuitOpen）时停止全部发送。
+    返回本次各结果的计数（含 skipped_sent / skipped_unknown）。
+    """
+
+    counts: Counter = Counter()
+    todo = []
+    for payload in invites:
+        status = ledger.status(invite_key(payload))
+        if status == "sent":
+            counts["skipped_sent"] += 1
+        elif status == "unknown" and not retry_unknown:
+            counts["skipped_unknown"] += 1
+            print(
+                f"{payload['kolId']} 上次结果未知，跳过（确认未邀约后加 --retry-unknown）"
+            )
+        else:
+            todo.append(payload)
+    print(f"共 {len(invites)} 条邀约，本次发送 {len(todo)} 条。")
+
+    # 邀约不是幂等操作：只在连接失败和 429 时重试
+    retry = RetryPolicy(idempotent=False)
+    async with PgyClient(
+        cookies,
+        headers,
+        per_host=CONCURRENCY,
+        limiter=with_account_budget(
+            AdaptiveRateLimiter(INVITE_URL, rps=rps, max_rps=rps), cookies
+        ),
+        retry=retry,
+    ) as client:
+
+        async def one(payload: Dict[str, Any]) -> None:
+            key = invite_key(payload)
+            ledger.mark(key, "unknown")
+            try:
+                res = await client.post_json(INVITE_URL, payload)
+            except ApiError as e:
+                status, detail = "failed", e.data
+            except CircuitOpen as e:
+                # 熔断时请求要么没发出，要么被 401/403 拒绝
+                ledger.mark(key, "failed", {"error": str(e)})
+                raise
+            except httpx.HTTPStatusError as e:
+                code = e.response.status_code
+                status = "unknown" if code >= 500 else "failed"
+                detail = {"error": f"HTTP {code}"}
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                status, detail = "failed", {"error": repr(e)}
+            except (httpx.HTTPError, ValueError) as e:
+                status, detail = "unknown", {"error": repr(e)}
+            else:
+                status, detail = "sent", res
+            ledger.mark(key, status, detail)
+            counts[status] += 1
+            print(payload["kolId"], status, detail)
+
+        await gather_bounded(one, todo, CONCURRENCY)
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="按台账批量发起蒲公英邀约")
+    parser.add_argument(
+        "csv",
+        nargs="?",
+        help="邀约 CSV（kolId 列 + 可选的 INVITE_TEMPLATE 字段列）；缺省用脚本内的 all_rs",
     )
-    print(response.status_code)
-    print(response.text)
-    time.sleep(1)
+    parser.add_argument("--ledger", default=LEDGER_PATH, help="邀约台账（SQLite）")
+    parser.add_argument("--rps", type=float, default=MAX_RPS, help="每秒邀约上限")
+    parser.add_argument(
+        "--retry-unknown",
+        action="store_true",
+        help="重发上次结果未知的邀约（先在蒲公英后台确认它们没有发出去）",
+    )
+    args = parser.parse_args()
+
+    if args.csv:
+        invites = load_invites(args.csv)
+    else:
+        invites = [dict(INVITE_TEMPLATE, kolId=k) for k in dict.fromkeys(all_rs)]
+    ledger = InviteLedger(args.ledger)
+    try:
+        counts = asyncio.run(
+            dispatch_invites(invites, ledger, args.rps, args.retry_unknown)
+        )
+        print(f"本次结果：{dict(counts)}")
+    finally:
+        print(ledger.summary())
+        ledger.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+collect_xsh_user 对本地模拟服务（pgy_mock_server，系统分配端口）的测试：
+- iter_pages：注入随机延迟让并发的页乱序返回，结果仍须按页码顺序、与串行翻页一致
+- sweep_search：按价格分桶扫描，叶子分桶不相交且合起来覆盖原搜索条件
+- fetch_with_checkpoint / repair_checkpoint：中断后只补拉缺失的页，被跳过的页单独修复
+- 熔断与重试预算：连续风控响应后不再发请求，持续 5xx 时重试总数不超过预算
+"""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+import requests
+
+import collect_xsh_user
+import pgy_http
+import pgy_metrics
+from pgy_mock_server import KOL_PATH, MockConfig, make_kol, match_kols, start
+
+KOLS = 230  # 12 页，最后一页不满
+PAGE_SIZE = 20
+
+
+@pytest.fixture
+def mock_kols(monkeypatch, tmp_path):
+    server, base = start(MockConfig(kols=KOLS, latency=0.01, jitter=0.05))
+    monkeypatch.chdir(tmp_path)  # 限速记录、断点等文件都写到临时目录
+    monkeypatch.setattr(collect_xsh_user, "BASE_URL", base + KOL_PATH)
+    monkeypatch.setattr(collect_xsh_user, "USE_HTTP_CACHE", False)
+    monkeypatch.setattr(pgy_http, "ACCOUNT_BUDGET_RPS", None)
+    monkeypatch.setattr(pgy_metrics, "METRICS_ENABLED", False)
+    # 熔断器按账号在进程内共用，每个测试重建
+    monkeypatch.setattr(pgy_http, "_breakers", {})
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _session():
+    return collect_xsh_user._make_session(
+        collect_xsh_user.headers, collect_xsh_user.cookies
+    )
+
+
+def _user_ids(workers: int) -> list:
+    session = _session()
+    payload = {"pageSize": PAGE_SIZE}
+    rows = collect_xsh_user.iter_pages(session, payload, workers=workers, rps=200)
+    return [r["userId"] for r in rows]
+
+
+@pytest.mark.parametrize("adaptive", [True, False])
+def test_iter_pages_keeps_page_order_under_concurrency(
+    mock_kols, monkeypatch, adaptive
+):
+    monkeypatch.setattr(collect_xsh_user, "ADAPTIVE_RATE", adaptive)
+
+    concurrent = _user_ids(workers=4)
+
+    assert concurrent == [make_kol(i)["userId"] for i in range(KOLS)]
+    assert concurrent == _user_ids(workers=1)
+    pages = -(-KOLS // PAGE_SIZE)
+    assert mock_kols.state.stats == {f"{KOL_PATH} 200": 2 * pages}
+
+
+@pytest.mark.parametrize("note_upper", [20000, 5000])
+def test_sweep_buckets_partition_the_search(mock_kols, note_upper):
+    payload = {
+        "pageSize": PAGE_SIZE,
+        "notePriceLower": 0,
+        "notePriceUpper": note_upper,
+        "videoPriceLower": 0,
+        "videoPriceUpper": 30000,
+    }
+    expected = [make_kol(i)["userId"] for i in match_kols(KOLS, 0, payload)]
+
+    rows, stats = collect_xsh_user.sweep_search(
+        _session(), payload, split_total=50, workers=4, rps=200
+    )
+
+    assert sorted(r["userId"] for r in rows) == sorted(expected)
+    leaves = [st for st in stats if not st.split]
+    # 叶子分桶互不相交：各自的 total 加起来正好是原条件的总数，没有行被去重掉
+    assert sum(st.total for st in leaves) == len(expected)
+    assert sum(st.new_rows for st in leaves) == sum(st.rows for st in leaves)
+    assert all(st.total <= 50 for st in leaves)
+    assert any(st.split for st in stats)
+    posts = sum(st.pages for st in stats)
+    assert mock_kols.state.stats == {f"{KOL_PATH} 200": posts}
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_checkpoint_resumes_and_repairs(mock_kols, monkeypatch, tmp_path, workers):
+    monkeypatch.setattr(collect_xsh_user, "SLEEP_BETWEEN_PAGES", 0)
+    session = _session()
+    payload = {"pageSize": PAGE_SIZE}
+    path = tmp_path / "kol.jsonl"
+    pages = -(-KOLS // PAGE_SIZE)
+
+    # 上次运行：拉完 1~4 页，第5页 success=false 被跳过，写第6页时进程崩溃
+    meta = {"total": KOLS, "total_pages": pages, "page_size": PAGE_SIZE}
+    lines = [{"meta": meta}]
+    for n in range(1, 5):
+        rows = collect_xsh_user._fetch_page_rows(session, payload, n)
+        lines.append({"page": n, "rows": rows})
+    lines.append({"page": 5, "rows": None})
+    text = "".join(json.dumps(rec, ensure_ascii=False) + "\n" for rec in lines)
+    path.write_text(text + '{"page": 6, "rows": [', encoding="utf-8")
+    mock_kols.state.stats.clear()
+
+    rows = collect_xsh_user.fetch_with_checkpoint(
+        session, payload, path=str(path), workers=workers, rps=200
+    )
+    assert mock_kols.state.stats == {f"{KOL_PATH} 200": pages - 5}
+    assert len(rows) == KOLS - PAGE_SIZE
+    assert path.exists()  # 还有被跳过的页，断点保留
+
+    assert collect_xsh_user.repair_checkpoint(session, payload, path=str(path)) == []
+    assert mock_kols.state.stats == {f"{KOL_PATH} 200": pages - 4}
+
+    rows = collect_xsh_user.fetch_with_checkpoint(session, payload, path=str(path))
+    assert [r["userId"] for r in rows] == [make_kol(i)["userId"] for i in range(KOLS)]
+    assert mock_kols.state.stats == {f"{KOL_PATH} 200": pages - 4}
+    assert not path.exists()  # 全部完成后删除，下次同样的搜索重新拉取
+
+
+def test_breaker_stops_requests_after_repeated_rejections(mock_kols):
+    mock_kols.state.config.risk_rate = 1.0
+    session = _session()
+    payload = {"pageNum": 1, "pageSize": PAGE_SIZE}
+
+    for _ in range(pgy_http.BREAKER_THRESHOLD - 1):
+        assert collect_xsh_user._post_json(session, payload)["success"] is False
+    with pytest.raises(pgy_http.SessionExpired):
+        collect_xsh_user._post_json(session, payload)
+    # 已熔断：同一账号的新 Session 也不再发出请求
+    with pytest.raises(pgy_http.SessionExpired):
+        collect_xsh_user._post_json(_session(), payload)
+    posts = pgy_http.BREAKER_THRESHOLD
+    assert mock_kols.state.stats == {f"{KOL_PATH} 200": posts}
+
+
+def test_retry_budget_caps_retries_on_persistent_errors(mock_kols, monkeypatch):
+    monkeypatch.setattr(collect_xsh_user, "RETRY_BACKOFF", 0)
+    mock_kols.state.config.error_rate = 1.0
+    session = _session()
+    payload = {"pageNum": 1, "pageSize": PAGE_SIZE}
+
+    calls = 0
+    with pytest.raises(pgy_http.RetryBudgetExceeded):
+        for _ in range(10):
+            calls += 1
+            with pytest.raises(requests.HTTPError):
+                collect_xsh_user._post_json(session, payload)
+
+    breaker = pgy_http.breaker_for(collect_xsh_user.cookies)
+    assert breaker.retries == pgy_http.RETRY_BUDGET_MIN
+    assert mock_kols.state.stats == {f"{KOL_PATH} 503": calls + breaker.retries}
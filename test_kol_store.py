@@ -0,0 +1,61 @@
+"""
+KolStore.upsert 的增量索引：多次合并写入后，索引与从库文件重新加载建出的一致，
+已有博主覆盖后保留原来的行号，查询结果随之更新。
+"""
+
+from __future__ import annotations
+
+import random
+
+from kol_store import KolStore
+
+TAGS = ["美妆", "母婴", "穿搭", "美食", "旅行"]
+
+
+def _kol(i: int, rnd: random.Random) -> dict:
+    return {
+        "userId": f"u{i}",
+        "name": f"博主{i}",
+        "location": rnd.choice(["上海", "北京", "广州", None]),
+        "gender": rnd.choice(["男", "女"]),
+        "personalTags": rnd.sample(TAGS, rnd.randint(0, 2)),
+        "contentTags": rnd.sample(TAGS, rnd.randint(0, 2)),
+        "featureTags": [],
+        "picturePrice": rnd.choice([None, 1000, 2000, rnd.randint(500, 5000)]),
+        "videoPrice": rnd.randint(1000, 9000),
+        "fansNum": rnd.randint(1000, 100000),
+    }
+
+
+def _indexes(store: KolStore) -> tuple:
+    return (
+        store._all,
+        store._row_of,
+        store._tag_index,
+        store._eq_index,
+        store._sorted,
+        store._values,
+    )
+
+
+def test_upsert_updates_indexes_incrementally(tmp_path):
+    path = str(tmp_path / "kols.parquet")
+    rnd = random.Random(0)
+    store = KolStore(path)
+    store.upsert([_kol(i, rnd) for i in range(50)], fetched_at=1.0)
+    for batch in range(5):
+        # 一半覆盖已有博主，一半是新博主；同一批里重复的以最后一条为准
+        ids = rnd.sample(range(50 + batch * 20), 20) + list(
+            range(50 + batch * 20, 70 + batch * 20)
+        )
+        store.upsert([_kol(i, rnd) for i in ids + ids[:3]], fetched_at=2.0 + batch)
+
+    assert store.df.height == 150
+    assert store.df["userId"].to_list() == [f"u{i}" for i in range(150)]
+    assert _indexes(store) == _indexes(KolStore(path))
+
+    store.upsert([{"userId": "u3", "location": "成都", "fansNum": 10**7}])
+    assert store.query(location="成都")["userId"].to_list() == ["u3"]
+    top = store.query(order_by="fansNum", limit=1)
+    assert top["userId"].to_list() == ["u3"]
+    assert store.df.height == 150
@@ -0,0 +1,94 @@
+"""
+SessionPool 的换号重试与出错取消：被某个账号拒过的任务交给没试过的账号，
+run_async 里任一协程抛出意外异常时其余协程被取消。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+
+from pgy_accounts import Account, AccountRejected, SessionPool
+
+
+def _pool(*names: str, per_account: int = 1) -> SessionPool:
+    accounts = [Account(name, {}) for name in names]
+    # 被拒次数不剔除账号，只看任务换到了哪个账号
+    return SessionPool(accounts, lambda a: a.name, per_account, max_strikes=100)
+
+
+class Tries:
+    """记录每项任务依次落在了哪些账号上；"bad" 账号拒绝所有偶数项。"""
+
+    def __init__(self) -> None:
+        self.by_item: dict = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, session: str, account: Account, item: int) -> int:
+        with self._lock:
+            self.by_item.setdefault(item, []).append(account.name)
+        if account.name == "bad" and item % 2 == 0:
+            raise AccountRejected(f"{item} 被拒")
+        return item * 10
+
+
+def _assert_retried_elsewhere(tries: Tries, results: list) -> None:
+    assert results == [i * 10 for i in range(20)]
+    for item, names in tries.by_item.items():
+        # 被拒后换到别的账号，不会再落回拒过它的账号
+        assert names.count("bad") <= 1, (item, names)
+
+
+@pytest.mark.parametrize("per_account", [1, 3])
+def test_run_retries_on_accounts_that_have_not_tried(per_account):
+    tries = Tries()
+    results = _pool("bad", "good", per_account=per_account).run(range(20), tries)
+    _assert_retried_elsewhere(tries, results)
+
+
+@pytest.mark.parametrize("per_account", [1, 3])
+def test_run_async_retries_on_accounts_that_have_not_tried(per_account):
+    tries = Tries()
+
+    async def fn(session, account, item):
+        await asyncio.sleep(0.001)
+        return tries(session, account, item)
+
+    pool = _pool("bad", "good", per_account=per_account)
+    results = asyncio.run(pool.run_async(range(20), fn))
+    _assert_retried_elsewhere(tries, results)
+
+
+def test_run_falls_back_to_tried_accounts_when_none_left():
+    def reject_once(session, account, item):
+        if not calls:
+            calls.append(account.name)
+            raise AccountRejected("被拒")
+        calls.append(account.name)
+        return item
+
+    calls: list = []
+    assert _pool("only").run([7], reject_once) == [7]
+    assert calls == ["only", "only"]  # 只有一个账号时仍在它上面重试
+
+
+def test_run_async_cancels_other_workers_on_error():
+    cancelled = []
+
+    async def fn(session, account, item):
+        try:
+            if item == 0:
+                await asyncio.sleep(0.01)
+                raise ValueError(item)
+            await asyncio.sleep(10)
+            return item
+        except asyncio.CancelledError:
+            cancelled.append(item)
+            raise
+
+    pool = _pool("a", "b", "c")
+    with pytest.raises(ValueError):
+        asyncio.run(asyncio.wait_for(pool.run_async(range(3), fn), 2))
+    assert sorted(cancelled) == [1, 2]
@@ -0,0 +1,114 @@
+"""
+PgyClient 的限速与熔断时机、gather_bounded 的并发上限，对本地模拟服务（pgy_mock_server）测试。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+import pgy_metrics
+from pgy_aio import PgyClient, gather_bounded, gather_pages
+from pgy_http import CircuitBreaker, RateLimiter, SessionExpired
+from pgy_mock_server import KOL_PATH, MockConfig, start
+
+
+class RecordingLimiter(RateLimiter):
+    """记下每次预约时间片的时刻。"""
+
+    def __init__(self, rps: float) -> None:
+        super().__init__(rps)
+        self.reserved_at: list = []
+
+    def reserve(self) -> float:
+        self.reserved_at.append(time.monotonic())
+        return super().reserve()
+
+
+@pytest.fixture
+def mock_kols(monkeypatch):
+    server, base = start(MockConfig(kols=200, latency=0.01))
+    monkeypatch.setattr(pgy_metrics, "METRICS_ENABLED", False)
+    yield server, base + KOL_PATH
+    server.shutdown()
+    server.server_close()
+
+
+def _posts(server) -> int:
+    return sum(server.state.stats.values())
+
+
+def test_slots_are_reserved_right_before_each_send(mock_kols):
+    server, url = mock_kols
+    limiter = RecordingLimiter(rps=40)
+
+    async def run():
+        async with PgyClient(limiter=limiter, breaker=CircuitBreaker()) as client:
+            return await gather_pages(
+                lambda n: client.post_json(url, {"pageNum": n, "pageSize": 10}),
+                range(1, 13),
+            )
+
+    pages = asyncio.run(run())
+
+    assert [p["data"]["kols"][0]["name"] for p in pages] == [
+        f"博主{(n - 1) * 10}" for n in range(1, 13)
+    ]
+    # 逐个预约：后一个请求等前一个的时间片到了才预约，而不是开始时一次订完
+    # （第一个时间片不用等，第二个请求紧接着预约）
+    at = limiter.reserved_at[1:]
+    assert min(b - a for a, b in zip(at, at[1:])) > limiter.interval * 0.5
+    assert _posts(server) == 12
+
+
+def test_breaker_is_checked_again_after_the_wait(mock_kols):
+    server, url = mock_kols
+    breaker = CircuitBreaker()
+
+    async def run():
+        async with PgyClient(limiter=RateLimiter(2), breaker=breaker) as client:
+
+            async def fetch(n):
+                data = await client.post_json(url, {"pageNum": n, "pageSize": 10})
+                breaker.opened = True  # 第一页之后账号被判定失效
+                return data
+
+            return await gather_bounded(fetch, [1, 2], workers=2)
+
+    with pytest.raises(SessionExpired):
+        asyncio.run(run())
+    assert _posts(server) == 1  # 第二页等完时间片后不再发出
+
+
+def test_gather_bounded_limits_workers_and_cancels_on_error():
+    running, peak, cancelled = 0, 0, []
+
+    async def fetch(i):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        try:
+            await asyncio.sleep(0.01 if i != 5 else 0)
+            if i == 5:
+                raise ValueError(i)
+            await asyncio.sleep(1)
+            return i
+        except asyncio.CancelledError:
+            cancelled.append(i)
+            raise
+        finally:
+            running -= 1
+
+    async def ok(i):
+        await asyncio.sleep(0.001)
+        return i * 2
+
+    assert asyncio.run(gather_bounded(ok, range(10), workers=3)) == [
+        i * 2 for i in range(10)
+    ]
+    with pytest.raises(ValueError):
+        asyncio.run(gather_bounded(fetch, range(10), workers=3))
+    assert peak <= 3
+    assert cancelled and running == 0
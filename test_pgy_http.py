@@ -0,0 +1,185 @@
+"""
+PageSizeNegotiator / run_with_page_size 对本地模拟服务（pgy_mock_server）
+pageSize 上限的测试：协商取不超过上限的最大候选值并缓存，运行中被截断时降档重拉，
+全部失败时退回调用方原来的 pageSize。
+ResponseCache / mount_cache：有效期内不发请求，过期后按 ETag 重验证。
+SharedTokenBucket：多个进程共用同一账号的预算，合计速率不超过服务端限流。
+"""
+
+from __future__ import annotations
+
+import json
+import multiprocessing
+import time
+
+import pytest
+import requests
+
+import pgy_metrics
+from pgy_http import (
+    PageSizeNegotiator,
+    PageSizeRejected,
+    ResponseCache,
+    SharedTokenBucket,
+    is_truncated,
+    mount_cache,
+    run_with_page_size,
+)
+from pgy_mock_server import KOL_PATH, MockConfig, start
+
+KOLS = 230
+
+
+@pytest.fixture
+def mock_kols():
+    server, base = start(MockConfig(kols=KOLS, page_cap=45))
+    yield server, base + KOL_PATH
+    server.shutdown()
+    server.server_close()
+
+
+def _post(url: str, page_num: int, size: int) -> dict:
+    r = requests.post(url, json={"pageNum": page_num, "pageSize": size}, timeout=5)
+    r.raise_for_status()
+    res = r.json()
+    if not res.get("success"):
+        raise RuntimeError(res.get("msg"))
+    return res["data"]
+
+
+def _probe(url: str):
+    def probe(size: int):
+        data = _post(url, 1, size)
+        return len(data["kols"]), int(data["total"]), None
+
+    return probe
+
+
+def _negotiator(tmp_path) -> PageSizeNegotiator:
+    return PageSizeNegotiator(path=str(tmp_path / "page_sizes.json"))
+
+
+@pytest.mark.parametrize("cap_mode", ["truncate", "reject"])
+def test_probe_picks_largest_size_under_cap(mock_kols, tmp_path, cap_mode):
+    server, url = mock_kols
+    server.state.config.cap_mode = cap_mode
+
+    assert _negotiator(tmp_path).probe(url, _probe(url), default=20) == 40
+
+    # 结果按接口缓存，新实例直接复用、不再试探
+    with open(tmp_path / "page_sizes.json", encoding="utf-8") as f:
+        assert json.load(f)[url]["page_size"] == 40
+    posts = sum(server.state.stats.values())
+    assert _negotiator(tmp_path).probe(url, _probe(url)) == 40
+    assert sum(server.state.stats.values()) == posts
+
+
+def test_probe_falls_back_to_default_when_every_size_fails(mock_kols, tmp_path):
+    server, url = mock_kols
+    server.state.config.page_cap = 5
+    server.state.config.cap_mode = "reject"
+    negotiator = _negotiator(tmp_path)
+
+    assert negotiator.probe(url, _probe(url), default=20) == 20
+    assert negotiator.probe(url, _probe(url)) == negotiator.candidates[-1]
+    assert negotiator.get(url) is None  # 退回值不写缓存
+
+
+def test_run_with_page_size_steps_down_when_truncated(mock_kols, tmp_path):
+    server, url = mock_kols
+    negotiator = _negotiator(tmp_path)
+    sizes = []
+
+    def run(size: int) -> list:
+        sizes.append(size)
+        if len(sizes) == 1:
+            server.state.config.page_cap = 25  # 协商之后服务端把上限调小了
+        ids, page_num = [], 1
+        while len(ids) < KOLS:
+            data = _post(url, page_num, size)
+            if is_truncated(size, len(data["kols"]), KOLS - len(ids), None):
+                raise PageSizeRejected(f"page {page_num} 只返回 {len(data['kols'])} 条")
+            ids += [k["userId"] for k in data["kols"]]
+            page_num += 1
+        return ids
+
+    ids = run_with_page_size(negotiator, url, _probe(url), run, default=20)
+
+    assert sizes == [40, 30, 20]
+    assert len(ids) == len(set(ids)) == KOLS
+    assert negotiator.get(url) == 20
+
+
+def test_cache_hits_then_revalidates_with_etag(mock_kols, tmp_path):
+    server, url = mock_kols
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), ttls={KOL_PATH: 60})
+    session = requests.Session()
+    mount_cache(session, cache)
+
+    def post(track_id: str) -> dict:
+        payload = {"pageNum": 2, "pageSize": 20, "trackId": track_id}
+        return session.post(url, json=payload, timeout=5).json()
+
+    first = post("a")
+    assert post("b") == first  # trackId 不参与缓存键，有效期内不发请求
+    assert server.state.stats == {f"{KOL_PATH} 200": 1}
+
+    cache.ttls[KOL_PATH] = 0  # 本地副本过期：带 If-None-Match 重验证
+    assert post("c") == first
+    assert server.state.stats == {f"{KOL_PATH} 200": 1, f"{KOL_PATH} 304": 1}
+
+    server.state.config.seed = 1  # 服务端数据变了：ETag 不再匹配，换成新响应
+    changed = post("d")
+    assert changed != first
+    assert server.state.stats[f"{KOL_PATH} 200"] == 2
+    cache.ttls[KOL_PATH] = 60
+    assert post("e") == changed
+    assert sum(server.state.stats.values()) == 3
+    assert (cache.stats["hit"], cache.stats["revalidated"]) == (2, 1)
+
+
+def test_cache_skips_rejected_responses(mock_kols, tmp_path):
+    server, url = mock_kols
+    server.state.config.risk_rate = 1.0
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), ttls={KOL_PATH: 60})
+    session = requests.Session()
+    mount_cache(session, cache)
+
+    for _ in range(2):
+        res = session.post(url, json={"pageNum": 1, "pageSize": 20}, timeout=5)
+        assert res.json()["success"] is False
+    assert server.state.stats == {f"{KOL_PATH} 200": 2}  # 风控响应不缓存
+    assert cache.stats["stored"] == 0
+
+
+def _spend_budget(url: str, directory: str, n: int) -> list:
+    """子进程：按共用预算发 n 个请求，返回各请求的发出时刻与状态码。"""
+
+    pgy_metrics.METRICS_ENABLED = False
+    bucket = SharedTokenBucket("acct", rps=12, burst=5, directory=directory)
+    session = requests.Session()
+    sent = []
+    for page in range(1, n + 1):
+        bucket.acquire()
+        at = time.time()
+        r = session.post(url, json={"pageNum": page, "pageSize": 10}, timeout=5)
+        sent.append((at, r.status_code))
+    return sent
+
+
+def test_shared_bucket_paces_all_processes(tmp_path):
+    # 服务端每秒 20 次、突发 5 次；3 个进程各自不限速时合计会远超
+    server, base = start(MockConfig(kols=100, rps=20, burst=5))
+    try:
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(3) as pool:
+            args = [(base + KOL_PATH, str(tmp_path), 8)] * 3
+            sent = sorted(s for part in pool.starmap(_spend_budget, args) for s in part)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert [status for _, status in sent] == [200] * 24
+    assert server.state.stats == {f"{KOL_PATH} 200": 24}
+    # 合计按 12 次/秒放行：除去起始的 5 次突发，其余请求至少要花 19/12 秒
+    assert sent[-1][0] - sent[0][0] >= 19 / 12 * 0.9
@@ -0,0 +1,57 @@
+"""
+dispatch_invites 对本地模拟服务（pgy_mock_server，系统分配端口）的重跑测试：
+同一台账重跑时 sent / unknown 的邀约跳过，同一条邀约不会发出两次。
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+import pgy_http
+import pgy_metrics
+import post_invite
+from pgy_mock_server import INVITE_PATH, MockConfig, make_kol, start
+from post_invite import INVITE_TEMPLATE, InviteLedger, dispatch_invites, invite_key
+
+
+@pytest.fixture
+def mock_invites(monkeypatch, tmp_path):
+    # 约三成请求返回 503：邀约不重试，这些记为 unknown
+    server, base = start(MockConfig(error_rate=0.3, latency=0.01, jitter=0.02))
+    monkeypatch.chdir(tmp_path)  # 限速记录写到临时目录
+    monkeypatch.setattr(post_invite, "INVITE_URL", base + INVITE_PATH)
+    monkeypatch.setattr(pgy_http, "ACCOUNT_BUDGET_RPS", None)
+    monkeypatch.setattr(pgy_metrics, "METRICS_ENABLED", False)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _posts(server) -> int:
+    return sum(n for k, n in server.state.stats.items() if k.startswith(INVITE_PATH))
+
+
+def test_rerun_skips_sent_and_unknown(mock_invites, tmp_path):
+    invites = [dict(INVITE_TEMPLATE, kolId=make_kol(i)["userId"]) for i in range(20)]
+    ledger = InviteLedger(str(tmp_path / "invites.sqlite"))
+    # 上次运行在发出第一条后中断：结果未知，不应再发
+    ledger.mark(invite_key(invites[0]), "unknown")
+    try:
+        first = asyncio.run(dispatch_invites(invites, ledger, rps=200))
+        assert first["skipped_unknown"] == 1
+        assert first["sent"] + first["unknown"] + first["failed"] == 19
+        assert _posts(mock_invites) == 19
+
+        mock_invites.state.config.error_rate = 0.0
+        second = asyncio.run(dispatch_invites(invites, ledger, rps=200))
+    finally:
+        ledger.close()
+
+    assert second["skipped_sent"] == first["sent"]
+    assert second["skipped_unknown"] == first["unknown"] + 1
+    assert second["sent"] == first["failed"]  # 只有确定没发出去的才重发
+    assert _posts(mock_invites) == 19 + first["failed"]
+    assert invite_key(invites[0]) not in mock_invites.state.invites
+    assert set(mock_invites.state.invites.values()) <= {1}
@@ -0,0 +1,96 @@
+"""
+fetch_heat_reports_windowed 对本地模拟服务（pgy_mock_server，系统分配端口）的
+窗口增量测试：已稳定的窗口不再请求，未稳定的窗口与新增的窗口重拉，
+合并结果与整段拉取一致。
+pageSize 协商的试探请求与翻页一样经过限速器。
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+
+import pytest
+
+import pgy_http
+import pgy_metrics
+from pgy_mock_server import HEAT_PATH, MockConfig, make_heat_row, start
+from pgy_http import RateLimiter
+from xhs_heat_report_all import fetch_all_heat_reports, fetch_heat_reports_windowed
+
+PER_DAY = 20
+PAGE_SIZE = 50  # 每个 7 天窗口 140 行，3 页
+
+
+@pytest.fixture
+def mock_heat(monkeypatch, tmp_path):
+    server, base = start(MockConfig(heat_rows=1000, heat_per_day=PER_DAY))
+    monkeypatch.chdir(tmp_path)  # 窗口文件、限速记录写到临时目录
+    monkeypatch.setattr(pgy_http, "ACCOUNT_BUDGET_RPS", None)
+    monkeypatch.setattr(pgy_http, "_breakers", {})
+    monkeypatch.setattr(pgy_metrics, "METRICS_ENABLED", False)
+    yield server, base + HEAT_PATH
+    server.shutdown()
+    server.server_close()
+
+
+def test_windows_are_fetched_once_settled(mock_heat):
+    server, url = mock_heat
+
+    def fetch(end: str, today: dt.date):
+        server.state.stats.clear()
+        payload = {"heatStartTimeBegin": "2025-11-03", "heatStartTimeEnd": end}
+        rows = fetch_heat_reports_windowed(
+            url, {}, {}, payload, today=today, sleep_sec=0.005, page_size=PAGE_SIZE
+        )
+        return rows, server.state.stats[f"{HEAT_PATH} 200"]
+
+    def note_ids(days: int) -> set:
+        return {
+            make_heat_row(i, per_day=PER_DAY)["noteId"] for i in range(days * PER_DAY)
+        }
+
+    # 11-03（周一）起 5 周；12-09 时最后一周刚结束 2 天，还没稳定
+    rows, posts = fetch("2025-12-07", dt.date(2025, 12, 9))
+    assert posts == 5 * 3
+    assert len(rows) == 35 * PER_DAY
+    assert {r["noteId"] for r in rows} == note_ids(35)
+
+    rows, posts = fetch("2025-12-07", dt.date(2025, 12, 9))
+    assert posts == 3  # 只重拉未稳定的最后一周
+    assert len(rows) == 35 * PER_DAY
+
+    # 范围延长一周：新窗口 + 上次拉取时未稳定的窗口
+    rows, posts = fetch("2025-12-14", dt.date(2026, 1, 31))
+    assert posts == 2 * 3
+    assert {r["noteId"] for r in rows} == note_ids(42)
+
+    rows, posts = fetch("2025-12-14", dt.date(2026, 1, 31))
+    assert posts == 0
+    assert len(rows) == 42 * PER_DAY
+
+
+class CountingLimiter(RateLimiter):
+    def __init__(self) -> None:
+        super().__init__(None)
+        self.reserved = 0
+
+    def reserve(self) -> float:
+        self.reserved += 1
+        return 0.0
+
+
+def test_page_size_probe_goes_through_the_limiter(mock_heat):
+    server, url = mock_heat
+    server.state.config.page_cap = 40
+    server.state.config.cap_mode = "reject"
+    limiter = CountingLimiter()
+    payload = {"heatStartTimeBegin": "2025-11-03", "heatStartTimeEnd": "2025-11-09"}
+
+    rows = fetch_all_heat_reports(
+        url, {}, {}, payload, page_size=None, use_cache=False, limiter=limiter
+    )
+
+    assert len(rows) == 7 * PER_DAY
+    # 100 / 50 被拒，40 通过；之后按 40 从第1页翻完 4 页
+    assert server.state.stats == {f"{HEAT_PATH} 200": 3 + 4}
+    assert limiter.reserved == 3 + 4
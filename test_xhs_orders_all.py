@@ -0,0 +1,102 @@
+"""
+sync_orders 对本地模拟服务（pgy_mock_server，系统分配端口）的增量同步测试：
+首次全量入库，之后连续 SYNC_STOP_AFTER 页没有变化、抽查一页后面的页也没有变化
+就停止翻页；前几页的状态变化增量即可同步到，后面的页有变化时由抽查或全量发现。
+main_incremental 从库里分批导出任务抓取文件与订单表。
+"""
+
+from __future__ import annotations
+
+import polars as pl
+import pytest
+import requests
+
+import pgy_http
+import pgy_metrics
+import xhs_orders_all
+from order_store import OrderStore
+from pgy_capture import iter_rows
+from pgy_mock_server import ORDER_PATH, MockConfig, make_task, start
+from xhs_orders_all import sync_orders
+
+TASKS = 200  # 10 页
+PAGE_SIZE = 20
+
+
+@pytest.fixture
+def mock_orders(monkeypatch, tmp_path):
+    server, base = start(MockConfig(tasks=TASKS))
+    monkeypatch.chdir(tmp_path)  # 限速记录写到临时目录
+    monkeypatch.setattr(xhs_orders_all, "BASE_URL", base + ORDER_PATH)
+    monkeypatch.setattr(xhs_orders_all, "MAX_RPS", 200)
+    monkeypatch.setattr(pgy_http, "ACCOUNT_BUDGET_RPS", None)
+    monkeypatch.setattr(pgy_http, "_breakers", {})
+    monkeypatch.setattr(pgy_metrics, "METRICS_ENABLED", False)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _sync(server, store, full=None):
+    """同步一次，返回 (变化统计, 本次请求的页数)。"""
+
+    server.state.stats.clear()
+    result = sync_orders(requests.Session(), store, PAGE_SIZE, full)
+    return result, server.state.stats[f"{ORDER_PATH} 200"]
+
+
+def _orders(i: int) -> int:
+    return len(make_task(i)["orderVos"])
+
+
+def test_sync_orders_incremental(mock_orders, tmp_path):
+    pages = TASKS // PAGE_SIZE
+    with OrderStore(str(tmp_path / "orders.duckdb")) as store:
+        result, posts = _sync(mock_orders, store)  # 从未全量同步过：跑全量
+        total = sum(_orders(i) for i in range(TASKS))
+        assert (result.orders_new, posts) == (total, pages)
+        assert store.last_full_sync() is not None
+
+        stop = xhs_orders_all.SYNC_STOP_AFTER + 1  # 连续没变化的页 + 抽查的一页
+        result, posts = _sync(mock_orders, store)
+        assert not result.changed
+        assert posts == stop
+
+        mock_orders.state.task_versions[3] += 1  # 第1页的任务状态变了
+        result, posts = _sync(mock_orders, store)
+        assert result.orders_changed == result.status_changes == _orders(3)
+        assert posts == 1 + stop
+
+        mock_orders.state.task_versions[150] += 1  # 第8页：增量翻不到，全量兜底
+        result, _ = _sync(mock_orders, store, full=True)
+        assert result.orders_changed == _orders(150)
+        assert store.orders_frame().height == total
+
+
+def test_main_incremental_streams_tasks_from_store(mock_orders, monkeypatch):
+    monkeypatch.setattr(xhs_orders_all, "ORDERS_PATH", "orders.parquet")
+    xhs_orders_all.main_incremental({}, {})
+
+    tasks = list(iter_rows(xhs_orders_all.TASKS_CAPTURE_PATH))
+    assert sorted(t["taskNo"] for t in tasks) == sorted(
+        make_task(i)["taskNo"] for i in range(TASKS)
+    )
+    assert tasks[0]["orderVos"] == make_task(TASKS - 1)["orderVos"]  # 按 taskNo 倒序
+    total = sum(_orders(i) for i in range(TASKS))
+    assert pl.read_parquet("orders.parquet").height == total
+
+
+def test_spot_check_catches_changes_deep_in_the_list(mock_orders, tmp_path):
+    with OrderStore(str(tmp_path / "orders.duckdb")) as store:
+        _sync(mock_orders, store)
+        # 第4页以后的任务都变了，但前几页没变：列表并不是按更新时间排序的
+        for i in range(3 * PAGE_SIZE, TASKS):
+            mock_orders.state.task_versions[i] += 1
+        result, posts = _sync(mock_orders, store)
+        assert result.orders_changed == sum(
+            _orders(i) for i in range(3 * PAGE_SIZE, TASKS)
+        )
+        assert posts == TASKS // PAGE_SIZE + 1  # 抽查的那页之后又按顺序翻了一遍
+        assert store.db.execute(
+            "SELECT mode FROM sync_runs ORDER BY startedAt"
+        ).fetchall() == [("full",), ("full",)]
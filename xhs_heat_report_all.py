@@ -1,7 +1,84 @@
+import argparse
+import asyncio
+import datetime as dt
+import hashlib
+import os
 import requests
 import json
-import time
-from typing import List, Dict, Any, Optional
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+import polars as pl
+
+from pgy_aio import PgyClient, RetryPolicy, gather_pages
+from pgy_capture import (
+    INDEX_SUFFIX,
+    PAGE_FIELD,
+    CaptureSink,
+    capture_path,
+    iter_pages,
+    iter_rows,
+    read_index,
+)
+from pgy_frames import decode_rows
+from pgy_http import (
+    AdaptiveRateLimiter,
+    CircuitOpen,
+    PageSizeNegotiator,
+    PageSizeRejected,
+    RateLimiter,
+    breaker_for,
+    default_cache,
+    is_truncated,
+    mount_cache,
+    run_with_page_size,
+    with_account_budget,
+)
+from pgy_metrics import endpoint_of, instrument, json_of, metrics, timed_sleep
+
+MAX_RPS = 1 / 0.2  # 每秒请求上限（原来每页 sleep 0.2 秒），自适应限速遇到限流自动降速
+WINDOW_DIR = "heat_windows"  # 按日期窗口保存的抓取文件，每组筛选条件一个子目录
+WINDOW_DAYS = 7  # 窗口长度（天）：1 按天，7 按周（周一起）
+REFRESH_DAYS = 7  # 窗口结束后这么多天内热度数据仍可能变化，期间每次运行都重拉
+WINDOW_WORKERS = 4  # 同时拉取的窗口数（共用一个限速器与账号预算）
+# 合并各窗口时去重的主键。字段名取自 pgy_mock_server，未对照真实响应核对；
+# 真实数据缺少这些字段时 merge_windows 告警并跳过去重
+HEAT_KEY_FIELDS = ("noteId", "heatStartTime")
+WINDOW_ANCHOR = dt.date(2000, 1, 3)  # 周一；窗口按它对齐，延长日期范围时已有窗口不变
+
+# 热度报告 data.list 条目里已知字段的类型，导出时这些列按此建列，类型不符的值置空
+# （见 pgy_frames）。字段名与类型取自 pgy_mock_server 的模拟数据，还没有对照真实响应核对过，
+# 所以只用来给响应里实际出现的字段定类型：导出的列与列顺序以响应为准，不会凭空多出全空的列；
+# 未声明的字段按字符串导出（嵌套值转成 JSON）并告警一次，拿到真实响应后据此补全 / 修正。
+HEAT_SCHEMA = {
+    "noteId": pl.String,
+    "title": pl.String,
+    "userId": pl.String,
+    "heatStartTime": pl.String,
+    "publishTime": pl.Int64,
+    "impNum": pl.Int64,
+    "readNum": pl.Int64,
+    "likeNum": pl.Int64,
+    "collectNum": pl.Int64,
+    "commentNum": pl.Int64,
+    "heatCost": pl.Float64,
+}
+_warned_fields: set = set()
+logger = logging.getLogger("xhs_heat_report")
+
+
+def _make_limiter(
+    url: str, cookies: dict, rps: float, adaptive: bool = True
+) -> Optional[RateLimiter]:
+    """
+    自适应限速（rps 同时是起步速率和上限）+ 同账号本机所有脚本共用的预算；
+    adaptive=False 时只有账号预算，翻页间隔由 sleep_sec 控制。
+    """
+
+    limiter = AdaptiveRateLimiter(url, rps=rps, max_rps=rps) if adaptive else None
+    return with_account_budget(limiter, cookies)
 
 
 def fetch_all_heat_reports(
@@ -9,19 +86,179 @@ def fetch_all_heat_reports(
     cookies: dict,
     headers: dict,
     base_payload: dict,
-    page_size: int = 50,
+    page_size: Optional[int] = 50,
     sleep_sec: float = 0.2,
     timeout: int = 20,
     max_retries: int = 3,
+    use_cache: bool = True,
+    adaptive: bool = True,
+    capture: Optional[str] = None,
+    limiter: Optional[RateLimiter] = None,
 ) -> List[Dict[str, Any]]:
     """
     分页拉取全部数据，返回聚合后的 data.list
+    page_size=None 时自动协商接口能接受的最大 pageSize（按接口缓存），被拒绝/截断时自动降档重拉
+    use_cache=True 时走磁盘响应缓存（pgy_http_cache.sqlite），有效期内重跑不再请求
+    adaptive=True 时用 AIMD 自适应限速取代固定的 sleep_sec（1/sleep_sec 为起步速率和上限）
+    capture 为文件路径（.ndjson.zst / .ndjson.gz）时每页拉到即写入该文件（见 pgy_capture），
+    不在内存里聚合，返回空列表；降档重拉时从头覆盖
+    limiter 传入时直接使用（多个窗口同时拉取时共用一个），adaptive / sleep_sec 不再生效
     """
 
     s = requests.Session()
 
     s.cookies.update(cookies)
+    instrument(s)  # 请求耗时/字节数等埋点，退出时写出到 pgy_metrics/
+    if use_cache:
+        mount_cache(s)
+    if limiter is None:
+        limiter = _make_limiter(url, cookies, 1 / sleep_sec, adaptive)
+
+    def run(size: int, strict: bool = False) -> List[Dict[str, Any]]:
+        with CaptureSink(capture) if capture else nullcontext() as sink:
+            return _fetch_all(
+                s,
+                url,
+                headers,
+                base_payload,
+                size,
+                sleep_sec,
+                timeout,
+                max_retries,
+                strict=strict,
+                limiter=limiter,
+                sink=sink,
+            )
+
+    if page_size:
+        return run(page_size)
+
+    def probe(size: int):
+        # 与翻页共用限速器和熔断器
+        payload = dict(base_payload, pageNum=1, pageSize=size)
+        data, _ = _post_page(s, url, headers, payload, timeout, limiter)
+        return len(data.get("list") or []), None, int(data.get("totalPage") or 0)
+
+    return run_with_page_size(
+        PageSizeNegotiator(),
+        url,
+        probe,
+        lambda size: run(size, strict=True),
+        default=base_payload.get("pageSize"),
+    )
+
+
+async def fetch_all_heat_reports_async(
+    url: str,
+    cookies: dict,
+    headers: dict,
+    base_payload: dict,
+    page_size: int = 50,
+    timeout: int = 20,
+    max_retries: int = 3,
+    use_cache: bool = True,
+    adaptive: bool = True,
+    capture: Optional[str] = None,
+    rps: float = MAX_RPS,
+) -> List[Dict[str, Any]]:
+    """
+    fetch_all_heat_reports 的 asyncio 版本：第1页拿到 totalPage 后，其余页在同一连接池上并发拉取
+    （同时在途数与重试退避由 PgyClient 控制），按页码顺序返回聚合后的 data.list
+    rps 为自适应限速的起步速率和上限（与同步版 1/sleep_sec 相同）
+    capture 同 fetch_all_heat_reports：全部页到齐后按页码写入该文件，返回空列表
+    """
+
+    async with PgyClient(
+        cookies,
+        headers,
+        retry=RetryPolicy(attempts=max_retries),
+        limiter=_make_limiter(url, cookies, rps, adaptive),
+        cache=default_cache() if use_cache else None,
+        timeout=timeout,
+    ) as client:
+
+        async def page(page_num: int) -> Dict[str, Any]:
+            payload = dict(base_payload, pageNum=page_num, pageSize=page_size)
+            resp = await client.post_json(url, payload)
+            return resp.get("data") or {}
+
+        first = await page(1)
+        total_page = int(first.get("totalPage") or 0)
+        rest = await gather_pages(page, range(2, total_page + 1))
+
+    all_rows: List[Dict[str, Any]] = []
+    if capture is not None:
+        with CaptureSink(capture) as sink:
+            for page_num, data in enumerate([first, *rest], start=1):
+                sink.write_page(page_num, data.get("list") or [])
+        print(f"✅ 共 {total_page} 页  累计 {sink.rows} 条  已写入 {capture}")
+        return all_rows
+    for data in [first, *rest]:
+        all_rows.extend(data.get("list") or [])
+    print(f"✅ 共 {total_page} 页  累计 {len(all_rows)} 条")
+    return all_rows
 
+
+def _post_page(
+    s: requests.Session,
+    url: str,
+    headers: dict,
+    payload: dict,
+    timeout: int,
+    limiter: Optional[RateLimiter] = None,
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    发一页请求，返回 (data, 是否命中本地缓存)；HTTP 错误、非 JSON、业务失败都抛异常。
+    先过账号熔断器，传入 limiter 时限速并在成功后反馈；响应交给熔断器计数。
+    """
+
+    breaker = breaker_for(s.cookies)
+    breaker.before_request()
+    if limiter is not None:
+        limiter.acquire()
+        breaker.check()  # 等待期间可能已熔断
+    r = s.post(url, headers=headers, json=payload, timeout=timeout)
+    try:
+        resp = json_of(r)
+    except ValueError:
+        resp = None  # 非 JSON，多为风控页或登录跳转
+    from_cache = getattr(r, "from_cache", False)
+    if not from_cache:
+        breaker.record(r.status_code, resp)
+    r.raise_for_status()
+    if resp is None:
+        raise ValueError("响应非JSON，可疑的风控/登录失效")
+    if resp.get("code") != 0 or not resp.get("success", False):
+        raise RuntimeError(
+            f"API返回异常: code={resp.get('code')} msg={resp.get('msg')}"
+        )
+    if limiter is not None and not from_cache:
+        limiter.feedback(True)
+    return resp.get("data") or {}, from_cache
+
+
+def _fetch_all(
+    s: requests.Session,
+    url: str,
+    headers: dict,
+    base_payload: dict,
+    page_size: int,
+    sleep_sec: float,
+    timeout: int,
+    max_retries: int,
+    strict: bool = False,
+    limiter: Optional[RateLimiter] = None,
+    sink: Optional[CaptureSink] = None,
+) -> List[Dict[str, Any]]:
+    """
+    按固定 page_size 翻页拉取。
+    strict=True 时第1页被拒绝或中间页被截断都抛 PageSizeRejected，由调用方降档重拉。
+    传入 limiter 时翻页节奏由它控制（不再 sleep_sec），每次请求的健康状况都反馈给它。
+    重试受账号熔断器的重试预算约束；连续登录失效/风控时直接抛 SessionExpired。
+    传入 sink 时每页写入 sink，不在内存里累积（返回空列表）。
+    """
+
+    breaker = breaker_for(s.cookies)
     all_rows: List[Dict[str, Any]] = []
     page_num = 1
 
@@ -36,37 +273,54 @@ def fetch_all_heat_reports(
         last_err = None
         for attempt in range(1, max_retries + 1):
             try:
-                r = s.post(url, headers=headers, json=payload, timeout=timeout)
-                r.raise_for_status()
-                resp = r.json()
-
-                if resp.get("code") != 0 or not resp.get("success", False):
-                    raise RuntimeError(
-                        f"API返回异常: code={resp.get('code')} msg={resp.get('msg')}"
-                    )
-
-                data = resp.get("data") or {}
+                data, from_cache = _post_page(
+                    s, url, headers, payload, timeout, limiter
+                )
 
                 if total_page is None:
                     total_page = int(data.get("totalPage") or 0)
 
                 rows = data.get("list") or []
-                all_rows.extend(rows)
+                if sink is None:
+                    all_rows.extend(rows)
+                    total_rows = len(all_rows)
+                else:
+                    sink.write_page(page_num, rows)
+                    total_rows = sink.rows
 
                 print(
-                    f"✅ page {page_num}/{total_page}  本页 {len(rows)} 条  累计 {len(all_rows)} 条"
+                    f"✅ page {page_num}/{total_page}  本页 {len(rows)} 条  累计 {total_rows} 条"
                 )
                 break  # 成功，退出重试
+            except CircuitOpen:
+                raise
             except Exception as e:
                 last_err = e
+                if limiter is not None:
+                    limiter.feedback(False)
                 print(f"⚠️ page {page_num} 第{attempt}次失败: {e}")
-                time.sleep(0.8 * attempt)
+                if attempt < max_retries:
+                    breaker.spend_retry()
+                    metrics.retry(endpoint_of(url))
+                    timed_sleep(0.8 * attempt, "retry_backoff")
 
         else:
+            if strict and page_num == 1:
+                raise PageSizeRejected(str(last_err)) from last_err
             raise RuntimeError(
                 f"❌ page {page_num} 拉取失败，已重试{max_retries}次: {last_err}"
             )
 
+        if (
+            strict
+            and total_page is not None
+            and page_num < total_page
+            and is_truncated(page_size, len(rows), None, total_page)
+        ):
+            raise PageSizeRejected(
+                f"page {page_num} 只返回 {len(rows)} 条（pageSize={page_size}）"
+            )
+
         # 结束条件：到最后一页，或本页无数据（保险）
         if total_page is not None and page_num >= total_page:
             break
@@ -75,26 +329,298 @@ def fetch_all_heat_reports(
             break
 
         page_num += 1
-        time.sleep(sleep_sec)
+        if not from_cache and limiter is None:
+            timed_sleep(sleep_sec, "page_interval")
 
     return all_rows
 
 
-def save_json(path: str, rows: List[Dict[str, Any]]):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(rows, f, ensure_ascii=False, indent=2)
+def split_windows(
+    begin: str, end: str, days: int = WINDOW_DAYS
+) -> List[Tuple[dt.date, dt.date]]:
+    """
+    把 [begin, end]（含首尾，YYYY-MM-DD）切成按 WINDOW_ANCHOR 对齐的 days 天窗口，
+    首尾窗口按范围截断。对齐到固定起点，范围往后延长时前面的窗口保持不变。
+    """
+
+    start = dt.date.fromisoformat(begin)
+    last = dt.date.fromisoformat(end)
+    windows = []
+    while start <= last:
+        offset = (start - WINDOW_ANCHOR).days % days
+        stop = min(start + dt.timedelta(days=days - 1 - offset), last)
+        windows.append((start, stop))
+        start = stop + dt.timedelta(days=1)
+    return windows
+
+
+def _window_dir(base_payload: dict) -> str:
+    # 日期以外的筛选条件（标题、排序等）不同的查询不能共用窗口
+    key = {
+        k: v
+        for k, v in base_payload.items()
+        if k not in ("pageNum", "pageSize", "heatStartTimeBegin", "heatStartTimeEnd")
+    }
+    raw = json.dumps(key, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return os.path.join(WINDOW_DIR, hashlib.sha1(raw).hexdigest()[:12])
+
 
+def _load_manifest(path: str) -> Dict[str, Dict[str, Any]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
 
-def save_csv(path: str, rows: List[Dict[str, Any]]):
-    # 用 pandas 更省事；如果你不想依赖 pandas，可以我再给你纯 csv 的版本
-    import pandas as pd
 
-    df = pd.DataFrame(rows)
+def _save_manifest(path: str, manifest: Dict[str, Dict[str, Any]]) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
 
-    df.to_csv(path, index=False, encoding="utf-8-sig")
+def _window_stale(
+    entry: Optional[Dict[str, Any]], folder: str, refresh_days: int
+) -> bool:
+    """没拉过、文件丢了，或上次拉取时窗口还没稳定（结束不满 refresh_days 天）就要重拉。"""
+
+    if entry is None or not os.path.exists(os.path.join(folder, entry["file"])):
+        return True
+    settled = dt.date.fromisoformat(entry["end"]) + dt.timedelta(days=refresh_days)
+    return dt.date.fromisoformat(entry["fetchedOn"]) < settled
+
+
+def _fetch_window(
+    url: str,
+    cookies: dict,
+    headers: dict,
+    base_payload: dict,
+    window: Tuple[dt.date, dt.date],
+    folder: str,
+    limiter: Optional[RateLimiter],
+    **kwargs: Any,
+) -> Tuple[str, int]:
+    """拉一个窗口写入抓取文件，返回 (文件名, 行数)。先写临时文件，拉完整了才替换旧文件。"""
+
+    name = capture_path(f"{window[0]}_{window[1]}")
+    path = os.path.join(folder, name)
+    part = os.path.join(folder, capture_path(f"{window[0]}_{window[1]}.part"))
+    payload = dict(
+        base_payload,
+        heatStartTimeBegin=window[0].isoformat(),
+        heatStartTimeEnd=window[1].isoformat(),
+    )
+    fetch_all_heat_reports(
+        url,
+        cookies,
+        headers,
+        payload,
+        use_cache=False,
+        capture=part,
+        limiter=limiter,
+        **kwargs,
+    )
+    os.replace(part + INDEX_SUFFIX, path + INDEX_SUFFIX)
+    os.replace(part, path)
+    return name, sum(p["rows"] for p in read_index(path))
+
+
+def merge_windows(folder: str, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    按窗口日期顺序读回各窗口的行（去掉 _page），按 HEAT_KEY_FIELDS 去重：
+    同一条出现在多个窗口时保留日期靠后窗口里的版本。
+    有行缺少主键字段时（例如真实响应里没有这些字段）告警并整体不去重：
+    宁可保留重复行，也不把主键不全、实际不同的行误合并。
+    """
+
+    rows: List[Dict[str, Any]] = []
+    for entry in sorted(entries, key=lambda e: e["begin"]):
+        for row in iter_rows(os.path.join(folder, entry["file"])):
+            row.pop(PAGE_FIELD, None)
+            rows.append(row)
+    incomplete = [r for r in rows if any(r.get(k) is None for k in HEAT_KEY_FIELDS)]
+    if incomplete:
+        missing = sorted(
+            {k for r in incomplete for k in HEAT_KEY_FIELDS if r.get(k) is None}
+        )
+        logger.warning(
+            "%s/%s 行缺少主键字段 %s，合并窗口时不去重",
+            len(incomplete),
+            len(rows),
+            missing,
+        )
+        return rows
+    merged = {tuple(r[k] for k in HEAT_KEY_FIELDS): r for r in rows}
+    return list(merged.values())
+
+
+def fetch_heat_reports_windowed(
+    url: str,
+    cookies: dict,
+    headers: dict,
+    base_payload: dict,
+    window_days: int = WINDOW_DAYS,
+    refresh_days: int = REFRESH_DAYS,
+    workers: int = WINDOW_WORKERS,
+    today: Optional[dt.date] = None,
+    sleep_sec: float = 0.2,
+    adaptive: bool = True,
+    **kwargs: Any,
+) -> List[Dict[str, Any]]:
+    """
+    按日期窗口增量拉取 heatStartTimeBegin..heatStartTimeEnd，返回合并去重后的 data.list
+    - 范围按 split_windows 切成 window_days 天的窗口，每个窗口单独翻页、单独存一个抓取文件
+      （WINDOW_DIR 下，窗口清单记在 windows.json）
+    - 已存且已稳定的窗口不再请求；新窗口、结束不满 refresh_days 天的窗口、
+      以及上次拉取时尚未稳定的窗口重拉
+    - 要拉的窗口由 workers 个线程同时拉取，共用一个限速器与账号预算；
+      个别窗口失败时其余窗口照常保存，最后抛错，重跑只补失败的窗口
+    - 不走 HTTP 响应缓存：窗口文件本身就是缓存，重拉的窗口要的正是最新数据
+    其余参数（page_size / timeout / max_retries）原样交给 fetch_all_heat_reports。
+    """
+
+    today = today or dt.date.today()
+    folder = _window_dir(base_payload)
+    os.makedirs(folder, exist_ok=True)
+    manifest_path = os.path.join(folder, "windows.json")
+    manifest = _load_manifest(manifest_path)
+
+    windows = split_windows(
+        base_payload["heatStartTimeBegin"],
+        base_payload["heatStartTimeEnd"],
+        window_days,
+    )
+    keys = {w: f"{w[0]}_{w[1]}" for w in windows}
+    todo = [
+        w for w in windows if _window_stale(manifest.get(keys[w]), folder, refresh_days)
+    ]
+    print(
+        f"📅 共 {len(windows)} 个窗口（{window_days} 天），"
+        f"本次拉取 {len(todo)} 个，沿用 {len(windows) - len(todo)} 个"
+    )
+
+    limiter = _make_limiter(url, cookies, 1 / sleep_sec, adaptive)
+    failed: List[Tuple[Tuple[dt.date, dt.date], Exception]] = []
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        futures = {
+            pool.submit(
+                _fetch_window,
+                url,
+                cookies,
+                headers,
+                base_payload,
+                w,
+                folder,
+                limiter,
+                sleep_sec=sleep_sec,
+                **kwargs,
+            ): w
+            for w in todo
+        }
+        for fut in as_completed(futures):
+            w = futures[fut]
+            try:
+                name, rows = fut.result()
+            except Exception as e:  # noqa: BLE001 - 其余窗口照常保存，最后统一报错
+                print(f"⚠️ 窗口 {keys[w]} 拉取失败: {e}")
+                failed.append((w, e))
+                continue
+            manifest[keys[w]] = {
+                "begin": w[0].isoformat(),
+                "end": w[1].isoformat(),
+                "file": name,
+                "rows": rows,
+                "fetchedOn": today.isoformat(),
+            }
+            _save_manifest(manifest_path, manifest)
+            print(f"✅ 窗口 {keys[w]}  {rows} 条")
+
+    if failed:
+        names = ", ".join(keys[w] for w, _ in failed)
+        raise RuntimeError(
+            f"❌ {len(failed)} 个窗口拉取失败：{names}；重跑只会补拉这些窗口"
+        ) from failed[0][1]
+    rows = merge_windows(folder, [manifest[keys[w]] for w in windows])
+    print(f"🧩 合并 {len(windows)} 个窗口，共 {len(rows)} 条")
+    return rows
+
+
+def _extra_text(v: Any) -> Optional[str]:
+    if v is None or isinstance(v, str):
+        return v
+    return json.dumps(v, ensure_ascii=False)
+
+
+def heat_frame(rows: List[Dict[str, Any]]) -> pl.DataFrame:
+    """
+    一批 data.list 条目建成列式表：列与列顺序取自条目里实际出现的字段（_page 不导出），
+    HEAT_SCHEMA 里声明过的按声明的类型解码（类型不符的值置空，如 publishTime 为
+    "2025-11-03 10:00"），未声明的转成字符串列。
+    """
+
+    fields = [k for k in dict.fromkeys(k for r in rows for k in r) if k != PAGE_FIELD]
+    known = {k: HEAT_SCHEMA[k] for k in fields if k in HEAT_SCHEMA}
+    extra = [k for k in fields if k not in known]
+    if set(extra) - _warned_fields:
+        logger.warning("HEAT_SCHEMA 未声明的字段按字符串导出：%s", extra)
+        _warned_fields.update(extra)
+    return (
+        decode_rows(rows, known)
+        .with_columns(
+            pl.Series(k, [_extra_text(r.get(k)) for r in rows], dtype=pl.String)
+            for k in extra
+        )
+        .select(fields)
+    )
+
+
+def heat_frame_from_capture(path: str) -> pl.DataFrame:
+    """从 pgy_capture 抓取文件逐页建列再拼接，不经过整份 list[dict]。"""
+
+    frames = [heat_frame(rows) for _, rows in iter_pages(path) if rows]
+    if not frames:
+        return pl.DataFrame()
+    return pl.concat(frames, how="diagonal")
+
+
+def export_heat(
+    data: Iterable[Dict[str, Any]] | pl.DataFrame,
+    csv_path: Optional[str] = None,
+    parquet_path: Optional[str] = None,
+) -> pl.DataFrame:
+    """
+    热度报告导出：建一次列式表，按需写 CSV（带 BOM，Excel 直接打开）和/或 Parquet。
+    data 可以是 data.list 条目或已建好的表（heat_frame / heat_frame_from_capture）。
+    """
+
+    frame = data if isinstance(data, pl.DataFrame) else heat_frame(list(data))
+    if csv_path:
+        frame.write_csv(csv_path, include_bom=True)
+    if parquet_path:
+        frame.write_parquet(parquet_path)
+    return frame
+
+
+def save_csv(path: str, rows: List[Dict[str, Any]]):
+    export_heat(rows, csv_path=path)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="拉取热度报告，导出 CSV/Parquet")
+    parser.add_argument(
+        "--windows",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help=f"按日期窗口增量拉取（窗口文件在 {WINDOW_DIR}/）",
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="不分窗口时用 pgy_aio 异步客户端同时拉取各页",
+    )
+    args = parser.parse_args()
+
     cookies = {
         "abRequestId": "62ddc872-6aa4-52be-a801-9bdc7df8569b",
         "a1": "19768a94168phvedmkahlx6lxrfyua04srms8cggo50000220309",
@@ -182,19 +708,62 @@ if __name__ == "__main__":
     }
     url = "https://pgy.xiaohongshu.com/api/solar/heat/data/report"
 
-    rows = fetch_all_heat_reports(
-        url=url,
-        cookies=cookies,
-        headers=headers,
-        base_payload=json_data,
-        page_size=50,  # 建议调大一点，减少请求次数
-        sleep_sec=0.2,
-        timeout=20,
-        max_retries=3,
+    # 按日期窗口增量拉取：只拉新窗口和近期可能变化的窗口，多个窗口同时拉，最后合并去重
+    use_windows = args.windows
+    use_async = args.use_async  # True 时用 pgy_aio 异步客户端同时拉取各页
+    # 每页随拉随写进压缩 NDJSON，不在内存里攒全量；导出 CSV 时再逐页读回
+    capture = capture_path("xhs_heat_report_all")
+
+    if use_windows:
+        rows = fetch_heat_reports_windowed(
+            url=url,
+            cookies=cookies,
+            headers=headers,
+            base_payload=json_data,
+            page_size=None,
+            sleep_sec=0.2,
+            timeout=20,
+            max_retries=3,
+        )
+        print(f"原始数据：{WINDOW_DIR}/")
+    elif use_async:
+        rows = asyncio.run(
+            fetch_all_heat_reports_async(
+                url=url,
+                cookies=cookies,
+                headers=headers,
+                base_payload=json_data,
+                page_size=50,
+                timeout=20,
+                max_retries=3,
+                capture=capture,
+            )
+        )
+    else:
+        rows = fetch_all_heat_reports(
+            url=url,
+            cookies=cookies,
+            headers=headers,
+            base_payload=json_data,
+            page_size=None,  # None 表示自动协商最大 pageSize，减少请求次数
+            sleep_sec=0.2,
+            timeout=20,
+            max_retries=3,
+            capture=capture,
+        )
+
+    if use_windows:
+        frame = heat_frame(rows)
+    else:
+        frame = heat_frame_from_capture(capture)
+        print(f"原始数据：{capture}")
+
+    export_heat(
+        frame,
+        csv_path="xhs_heat_report_all.csv",
+        parquet_path="xhs_heat_report_all.parquet",
     )
 
-    save_json("xhs_heat_report_all.json", rows)
-
-    save_csv("xhs_heat_report_all.csv", rows)
-
-    print(f"\n🎉 完成：共保存 {len(rows)} 条")
+    print(f"\n🎉 完成：共保存 {frame.height} 条")
+    if not use_windows:  # 按窗口拉取不走响应缓存，不必为打印统计打开缓存库
+        print(default_cache().summary())
@@ -1,10 +1,51 @@
-import time
+import argparse
+import asyncio
+import datetime as dt
 import json
-import csv
 import requests
+from typing import Optional
 from urllib.parse import urlencode
 
+from pgy_aio import PgyClient, gather_pages
+from pgy_http import (
+    AdaptiveRateLimiter,
+    CircuitOpen,
+    PageSizeNegotiator,
+    PageSizeRejected,
+    RateLimiter,
+    breaker_for,
+    default_cache,
+    is_truncated,
+    mount_cache,
+    run_with_page_size,
+    with_account_budget,
+)
+from pgy_metrics import endpoint_of, instrument, json_of, metrics, timed_sleep
+from order_store import (
+    ORDER_DB_PATH,
+    ApplyResult,
+    OrderStore,
+    export_captured_orders,
+    flatten_orders,
+    write_orders,
+)
+from pgy_capture import CaptureSink, capture_path
+
 BASE_URL = "https://pgy.xiaohongshu.com/api/solar/order/task/query"
+AUTO_PAGE_SIZE = True  # 自动协商最大 pageSize（缓存在 pgy_page_sizes.json）
+USE_HTTP_CACHE = True  # 磁盘响应缓存（pgy_http_cache.sqlite），重跑时未过期的页不再请求
+USE_ASYNC = False  # 用 pgy_aio 异步客户端：拿到 totalPage 后其余页同时发出
+ADAPTIVE_RATE = True  # AIMD 自适应限速，取代固定的翻页 sleep（速率存 pgy_rates.json）
+MAX_RPS = 1 / 0.6  # 每秒请求上限（原来每页 sleep 0.6 秒），遇到限流自动降速
+USE_INCREMENTAL = False  # 增量同步到 ORDER_DB_PATH（DuckDB），再从库里导出 JSON/CSV
+# 增量同步：连续几页没有任何变化就停止翻页。前提是接口按最近更新倒序返回任务，
+# 这一点没有文档保证，所以停止前再抽查一页后面的页（见 sync_orders）
+SYNC_STOP_AFTER = 2
+FULL_SYNC_AGE = dt.timedelta(days=7)  # 距上次全量同步超过该时长时改跑全量
+ORDERS_PATH = "xhs_orders_all.csv"  # 展平后的订单表，改成 .parquet 结尾则写 Parquet
+# 每页 task 随拉随写进压缩 NDJSON（见 pgy_capture），不再在内存里攒全量、最后写 xhs_tasks_all.json
+STREAM_CAPTURE = True
+TASKS_CAPTURE_PATH = capture_path("xhs_tasks_all")
 
 
 # 你原来的查询参数，建议用 params 传，别拼到 url 里
@@ -28,136 +69,351 @@ BASE_PARAMS = {
 
 
 def fetch_page(
-    session: requests.Session, page_num: int, retries: int = 3, sleep_sec: float = 0.6
+    session: requests.Session,
+    page_num: int,
+    retries: int = 3,
+    sleep_sec: float = 0.6,
+    page_size: Optional[int] = None,
+    limiter: Optional[RateLimiter] = None,
 ):
+    """
+    拉取单页，失败递增退避重试。
+    传入 limiter 时由它控制节奏（不再固定 sleep），并把每次请求的健康状况反馈给它。
+    重试受账号熔断器的重试预算约束；连续登录失效/风控时直接抛 SessionExpired。
+    """
     params = dict(BASE_PARAMS)
     params["pageNum"] = page_num
+    if page_size:
+        params["pageSize"] = page_size
 
+    breaker = breaker_for(session.cookies)
     last_err = None
     for attempt in range(1, retries + 1):
         try:
+            breaker.before_request()
+            if limiter is not None:
+                limiter.acquire()
+                breaker.check()  # 等待期间可能已熔断
             resp = session.get(BASE_URL, params=params, timeout=20)
+            try:
+                data = json_of(resp)
+            except ValueError:
+                data = None  # 非 JSON，多为风控页或登录跳转
+            if not getattr(resp, "from_cache", False):
+                breaker.record(resp.status_code, data)
             resp.raise_for_status()
-            data = resp.json()
+            if data is None:
+                raise ValueError("响应非JSON，可疑的风控/登录失效")
             if data.get("code") != 0:
                 raise RuntimeError(
                     f"API code != 0, code={data.get('code')}, msg={data.get('msg')}"
                 )
-            # 轻微限速，避免太快触发风控
+            # 轻微限速，避免太快触发风控（命中本地缓存的不用等）
 
-            time.sleep(sleep_sec)
+            if getattr(resp, "from_cache", False):
+                pass
+            elif limiter is not None:
+                limiter.feedback(True)
+            else:
+                timed_sleep(sleep_sec, "page_interval")
             return data
+        except CircuitOpen:
+            raise
         except Exception as e:
             last_err = e
+            if limiter is not None:
+                limiter.feedback(False)
 
-            # 递增退避
-            time.sleep(sleep_sec * attempt)
+            # 递增退避（最后一次失败后不再等待）
+            if attempt < retries:
+                breaker.spend_retry()
+                metrics.retry(endpoint_of(BASE_URL))
+                timed_sleep(sleep_sec * attempt, "retry_backoff")
 
     raise last_err
 
 
-def main(cookies: dict, headers: dict):
-    session = requests.Session()
-    session.cookies.update(cookies)
-    session.headers.update(headers)
+def _make_limiter(cookies):
+    # 自适应限速 + 同一账号在本机所有脚本共用的请求预算（没有时退回固定 sleep）
+    limiter = (
+        AdaptiveRateLimiter(BASE_URL, rps=MAX_RPS, max_rps=MAX_RPS)
+        if ADAPTIVE_RATE
+        else None
+    )
+    return with_account_budget(limiter, cookies)
+
+
+def _check_page(strict, page_num, total_page, page_size, page_payload):
+    """strict 模式下，非最后一页条数不足 page_size 视为被服务端截断。"""
+    n_items = len(page_payload.get("list") or [])
+    if (
+        strict
+        and page_num < total_page
+        and is_truncated(page_size, n_items, None, total_page)
+    ):
+        raise PageSizeRejected(
+            f"page {page_num} 只返回 {n_items} 条（pageSize={page_size}）"
+        )
+
+
+def _collect(all_tasks: list, sink: Optional[CaptureSink], page_num, page_payload):
+    """一页 task 写入 sink（有的话）或追加到 all_tasks，返回累计条数。"""
+
+    tasks = page_payload.get("list") or []
+    if sink is None:
+        all_tasks.extend(tasks)
+        return len(all_tasks)
+    sink.write_page(page_num, tasks)
+    return sink.rows
+
+
+def fetch_all_tasks(
+    session: requests.Session,
+    page_size: int,
+    strict: bool = False,
+    sink: Optional[CaptureSink] = None,
+):
+    """
+    按 page_size 拉取全部 task。
+    strict=True 时发现被服务端截断的页会抛 PageSizeRejected，由调用方降档重拉。
+    传入 sink 时每页拉到即写入 sink，不在内存里累积（返回空列表）。
+    """
+    limiter = _make_limiter(session.cookies)
 
     # 先拉第一页，拿 totalPage
-    first = fetch_page(session, 1)
+    try:
+        first = fetch_page(session, 1, page_size=page_size, limiter=limiter)
+    except RuntimeError as e:
+        # 缓存的 pageSize 可能已不被接受（code != 0），交给调用方降档
+        if strict:
+            raise PageSizeRejected(str(e)) from e
+        raise
     payload = first.get("data") or {}
     total_page = int(payload.get("totalPage") or 1)
 
     all_tasks = []
-    all_tasks.extend(payload.get("list") or [])
+    _collect(all_tasks, sink, 1, payload)
+    _check_page(strict, 1, total_page, page_size, payload)
 
     # 拉剩余页
     for p in range(2, total_page + 1):
-        page_data = fetch_page(session, p)
+        page_data = fetch_page(session, p, page_size=page_size, limiter=limiter)
         page_payload = page_data.get("data") or {}
 
-        all_tasks.extend(page_payload.get("list") or [])
-        print(f"Fetched page {p}/{total_page}, tasks_total={len(all_tasks)}")
+        total = _collect(all_tasks, sink, p, page_payload)
+        print(f"Fetched page {p}/{total_page}, tasks_total={total}")
+        _check_page(strict, p, total_page, page_size, page_payload)
+
+    return all_tasks
+
+
+async def fetch_all_tasks_async(
+    cookies: dict,
+    headers: dict,
+    page_size: int,
+    strict: bool = False,
+    sink: Optional[CaptureSink] = None,
+):
+    """
+    fetch_all_tasks 的 asyncio 版本：先拉第1页拿 totalPage，其余页在同一连接池上并发拉取。
+    重试/退避由 PgyClient 统一处理，截断检查与 fetch_all_tasks 相同。
+    传入 sink 时全部页到齐后按页码写入 sink（各页同时在途，内存占用不会因此减少）。
+    """
+
+    cache = default_cache() if USE_HTTP_CACHE else None
+    limiter = _make_limiter(cookies)
+    async with PgyClient(cookies, headers, cache=cache, limiter=limiter) as client:
+
+        async def page(page_num):
+            params = dict(BASE_PARAMS, pageNum=page_num, pageSize=page_size)
+            return (await client.get_json(BASE_URL, params=params)).get("data") or {}
+
+        try:
+            first = await page(1)
+        except RuntimeError as e:
+            if strict:
+                raise PageSizeRejected(str(e)) from e
+            raise
+        total_page = int(first.get("totalPage") or 1)
+        rest = await gather_pages(page, range(2, total_page + 1))
+
+    all_tasks = []
+    total = 0
+    for p, page_payload in enumerate([first, *rest], start=1):
+        total = _collect(all_tasks, sink, p, page_payload)
+        _check_page(strict, p, total_page, page_size, page_payload)
+    print(f"Fetched {total_page} pages, tasks_total={total}")
+    return all_tasks
+
+
+def sync_orders(
+    session: requests.Session,
+    store: OrderStore,
+    page_size: int = BASE_PARAMS["pageSize"],
+    full: Optional[bool] = None,
+) -> ApplyResult:
+    """
+    增量同步：逐页拉取并写入 store，只 upsert 内容哈希变化的任务/订单。
+    假设接口按最近更新倒序返回任务：连续 SYNC_STOP_AFTER 页没有变化时，后面的页
+    也不会有变化。停止前从没翻到的页里轮流抽查一页（每次运行换一页），抽查页有变化
+    说明假设不成立，改为翻完全部页。
+    full=True 时翻完全部页。full=None 时按 FULL_SYNC_AGE 自动决定——
+    抽查只能发现部分漏掉的变化，定期全量兜底。
+    session 不要挂响应缓存，否则缓存命中的页会被误判为没有变化。
+    """
+
+    if full is None:
+        last = store.last_full_sync()
+        full = last is None or dt.datetime.now() - last > FULL_SYNC_AGE
+    mode = "full" if full else "incremental"
+    started = dt.datetime.now()
+    limiter = _make_limiter(session.cookies)
+
+    def sync_page(page_num):
+        data = fetch_page(session, page_num, page_size=page_size, limiter=limiter)
+        payload = data.get("data") or {}
+        result = store.apply_tasks(payload.get("list") or [])
+        return result, int(payload.get("totalPage") or 1)
+
+    total = ApplyResult()
+    unchanged = 0
+    page_num, total_page = 0, 1
+    while page_num < total_page:
+        page_num += 1
+        result, total_page = sync_page(page_num)
+        total += result
+        print(
+            f"Synced page {page_num}/{total_page}: {result.tasks_changed} tasks, "
+            f"{result.orders_new} new / {result.orders_changed} changed orders"
+        )
+        unchanged = 0 if result.changed else unchanged + 1
+        if full or unchanged < SYNC_STOP_AFTER:
+            continue
+        if page_num < total_page:
+            spot = page_num + 1 + store.run_count() % (total_page - page_num)
+            result, _ = sync_page(spot)
+            total += result
+            if result.changed:
+                print(f"抽查第 {spot} 页有变化：列表并非按更新排序，改为翻完全部页。")
+                full, mode = True, "full"
+                continue
+        print(f"连续 {unchanged} 页没有变化，停止翻页。")
+        break
+
+    store.record_run(started, mode, page_num, total)
+    print(
+        f"{mode} sync done: {page_num} pages, {total.tasks_changed} tasks changed, "
+        f"{total.orders_new} new / {total.orders_changed} changed orders, "
+        f"{total.status_changes} status changes"
+    )
+    return total
+
+
+def main_incremental(cookies: dict, headers: dict, full: Optional[bool] = None):
+    """
+    增量同步到 ORDER_DB_PATH，再从库里导出与 main() 相同的任务文件与订单表。
+    STREAM_CAPTURE 时任务分批从库里读出写进抓取文件，不在内存里攒全量。
+    """
+
+    session = requests.Session()
+    session.cookies.update(cookies)
+    session.headers.update(headers)
+    instrument(session)
+    page_size = (
+        PageSizeNegotiator().get(BASE_URL) if AUTO_PAGE_SIZE else None
+    ) or BASE_PARAMS["pageSize"]
+
+    with OrderStore(ORDER_DB_PATH) as store:
+        sync_orders(session, store, page_size, full)
+        if STREAM_CAPTURE:
+            with CaptureSink(TASKS_CAPTURE_PATH) as sink:
+                for page, tasks in enumerate(store.iter_tasks(), 1):
+                    sink.write_page(page, tasks)
+            tasks_path, n_tasks = TASKS_CAPTURE_PATH, sink.rows
+        else:
+            all_tasks = store.tasks()
+            with open("xhs_tasks_all.json", "w", encoding="utf-8") as f:
+                json.dump(all_tasks, f, ensure_ascii=False, indent=2)
+            tasks_path, n_tasks = "xhs_tasks_all.json", len(all_tasks)
+        orders = store.orders_frame()
+
+    write_orders(orders, ORDERS_PATH)
+    print(
+        f"\nDone.\n- tasks saved to: {tasks_path} ({n_tasks} tasks)"
+        f"\n- orders saved to: {ORDERS_PATH} ({orders.height} rows)"
+        f"\n- store: {ORDER_DB_PATH}"
+    )
+
+
+def main(cookies: dict, headers: dict):
+    session = requests.Session()
+    session.cookies.update(cookies)
+    session.headers.update(headers)
+    instrument(session)  # 请求耗时/字节数等埋点，退出时写出到 pgy_metrics/
+    if USE_HTTP_CACHE:
+        mount_cache(session)
+
+    def fetch_all(size, strict=False, sink=None):
+        if USE_ASYNC:
+            coro = fetch_all_tasks_async(cookies, headers, size, strict, sink)
+            return asyncio.run(coro)
+        return fetch_all_tasks(session, size, strict, sink)
+
+    def capture_all(size, strict=False):
+        # 降档重拉时从头覆盖抓取文件
+        with CaptureSink(TASKS_CAPTURE_PATH) as sink:
+            fetch_all(size, strict, sink)
+        return sink
+
+    run = capture_all if STREAM_CAPTURE else fetch_all
+
+    if AUTO_PAGE_SIZE:
+
+        def probe(size):
+            data = fetch_page(session, 1, retries=1, page_size=size).get("data") or {}
+            return len(data.get("list") or []), None, int(data.get("totalPage") or 1)
+
+        result = run_with_page_size(
+            PageSizeNegotiator(),
+            BASE_URL,
+            probe,
+            lambda size: run(size, strict=True),
+            default=BASE_PARAMS["pageSize"],
+        )
+    else:
+        result = run(BASE_PARAMS["pageSize"])
+
+    if STREAM_CAPTURE:
+        # 原始 task 已逐页写入抓取文件，订单表直接从抓取文件流式展平
+        n_orders = export_captured_orders(TASKS_CAPTURE_PATH, ORDERS_PATH)
+        print(
+            f"\nDone.\n- tasks saved to: {TASKS_CAPTURE_PATH} "
+            f"({result.rows} tasks, {result.pages} pages)"
+            f"\n- orders saved to: {ORDERS_PATH} ({n_orders} rows)"
+        )
+        if USE_HTTP_CACHE:
+            print(default_cache().summary())
+        return
+
+    all_tasks = result
 
     # 1) 保存原始 task 列表结构
     with open("xhs_tasks_all.json", "w", encoding="utf-8") as f:
         json.dump(all_tasks, f, ensure_ascii=False, indent=2)
 
-    # 2) 展平 orderVos，保存 CSV
-    rows = []
-    for task in all_tasks:
-        task_no = task.get("taskNo")
-
-        title = task.get("title")
-
-        report_brand_user_name = task.get("reportBrandUserName")
-        expect_publish_time = task.get("expectPublishTime")
-
-        for order in task.get("orderVos") or []:
-            row = {
-                "taskNo": task_no,
-                "taskTitle": title,
-                "reportBrandUserName": report_brand_user_name,
-                "expectPublishTime": expect_publish_time,
-                # order 字段（按需增删）
-                "orderId": order.get("orderId"),
-                "totalPrice": order.get("totalPrice"),
-                "contentPrice": order.get("contentPrice"),
-                "createTime": order.get("createTime"),
-                "notePublishTime": order.get("notePublishTime"),
-                "orderStatus": order.get("orderStatus"),
-                "state": order.get("state"),
-                "contentType": order.get("contentType"),
-                "settlementRule": order.get("settlementRule"),
-                "needAdsAudit": order.get("needAdsAudit"),
-                "kolId": order.get("kolId"),
-                "kolName": order.get("kolName"),
-                "brandId": order.get("brandId"),
-                "brandName": order.get("brandName"),
-            }
-            rows.append(row)
-
-    csv_path = "xhs_orders_all.csv"
-    if rows:
-        with open(csv_path, "w", newline="", encoding="utf-8-sig") as f:
-            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
-
-            writer.writeheader()
-            writer.writerows(rows)
-    else:
-        # 没有 orderVos 的话也生成空表头文件
-        with open(csv_path, "w", newline="", encoding="utf-8-sig") as f:
-            f.write("")
+    # 2) 展平 orderVos，保存 CSV / Parquet
+    # 列与类型见 order_store.ORDERS_FRAME_SCHEMA（按需增删）；没有订单时只写表头
+    orders = flatten_orders(all_tasks)
+    write_orders(orders, ORDERS_PATH)
 
     print(
-        f"\nDone.\n- tasks saved to: xhs_tasks_all.json ({len(all_tasks)} tasks)\n- orders saved to: {csv_path} ({len(rows)} rows)"
+        f"\nDone.\n- tasks saved to: xhs_tasks_all.json ({len(all_tasks)} tasks)\n- orders saved to: {ORDERS_PATH} ({orders.height} rows)"
     )
+    if USE_HTTP_CACHE:
+        print(default_cache().summary())
 
 
-cookies = {
-    "abRequestId": "62ddc872-6aa4-52be-a801-9bdc7df8569b",
-    "a1": "19768a94168phvedmkahlx6lxrfyua04srms8cggo50000220309",
-    "webId": "86ef5f0e778ead5fe706f55202a2faf5",
-    "gid": "yjWKY0j2JiM0yjWKY0j4yFSkKYUxhdf6T0x16klCK1CFiM28v7084Y888JJ8q8j8Djfdj2f0",
-    "x-user-id-creator.xiaohongshu.com": "618f62ac000000001000d08b",
-    "customerClientId": "135290779466254",
-    "x-user-id-zhaoshang.xiaohongshu.com": "6676ec440000000007006f9e",
-    "x-user-id-pro.xiaohongshu.com": "618f62ac000000001000d08b",
-    "x-user-id-ad.xiaohongshu.com": "59ebefa3e8ac2b2171a39d89",
-    "web_session": "040069b0fb21e41280dd4eb3053b4bd730c1f1",
-    "x-user-id-ark.xiaohongshu.com": "6676ec440000000007006f9e",
-    "access-token-ark.xiaohongshu.com": "customer.ark.AT-68c5175828067488533217313tlj0kh8ud9qb6m5",
-    "x-user-id-school.xiaohongshu.com": "6676ec440000000007006f9e",
-    "customer-sso-sid": "68c517584714448772071428dga5kvvbjxsqctdi",
-    "x-user-id-pgy.xiaohongshu.com": "59ebefa3e8ac2b2171a39d89",
-    "solar.beaker.session.id": "AT-68c517584714448772055043ydedmb876fqcofkh",
-    "access-token-pgy.xiaohongshu.com": "customer.pgy.AT-68c517584714448772055043ydedmb876fqcofkh",
-    "access-token-pgy.beta.xiaohongshu.com": "customer.pgy.AT-68c517584714448772055043ydedmb876fqcofkh",
-    "acw_tc": "0a4252f017660202812401339e015623b1ea51bf4f9661a60c5530d562ab98",
-    "websectiga": "16f444b9ff5e3d7e258b5f7674489196303a0b160e16647c6c2b4dcb609f4134",
-    "sec_poison_id": "850f0bd6-5311-4371-9268-ed2e073b609a",
-    "xsecappid": "ratlin",
-    "loadts": "1766020309833",
-}
-
+# 其他账号的 cookies 写进 pgy_accounts.json（见 pgy_accounts.load_accounts）
 cookies = {
     "abRequestId": "68c22f1e-0b84-5747-ab8d-561388a02aaf",
     "a1": "19777849453hjdlpofzpcrg02hhxzgf11dg1g11li50000112937",
@@ -201,4 +457,20 @@ headers = {
 }
 
 # 你已在外部准备好了 cookies / headers 的话，直接调用：
-main(cookies=cookies, headers=headers)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="拉取全部订单任务，展开订单后导出")
+    parser.add_argument(
+        "--incremental",
+        action=argparse.BooleanOptionalAction,
+        default=USE_INCREMENTAL,
+        help=f"增量同步到 {ORDER_DB_PATH}，再从库里导出",
+    )
+    parser.add_argument(
+        "--full", action="store_true", default=None, help="增量模式下强制全量同步"
+    )
+    args = parser.parse_args()
+
+    if args.incremental:
+        main_incremental(cookies=cookies, headers=headers, full=args.full)
+    else:
+        main(cookies=cookies, headers=headers)